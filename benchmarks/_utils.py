@@ -0,0 +1,193 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# NOTE: benchmarks seed their own data (under SEED_GUILD) into the database
+# from config.json, deleting any previous seed data first. Point config.json
+# at a throwaway database before running them.
+
+from __future__ import annotations
+
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from starboard.config import CONFIG
+from starboard.database import Database, Override, Starboard
+
+SEED_GUILD = 1
+SEED_USER_OFFSET = 1_000
+SEED_MESSAGE_OFFSET = 1_000_000
+SEED_CHANNEL = 10
+
+
+@dataclass
+class Seed:
+    guild_id: int
+    starboard_ids: list[int]
+    channel_chain: list[int]
+    user_ids: list[int]
+    message_ids: list[int]
+
+
+async def connect(**connect_kwargs: Any) -> Database:
+    if not connect_kwargs:
+        connect_kwargs = {
+            "host": CONFIG.db_host,
+            "database": CONFIG.db_name,
+            "user": CONFIG.db_user,
+            "password": CONFIG.db_password,
+        }
+
+    db = Database()
+    await db.connect(migrate=True, **connect_kwargs)
+    return db
+
+
+async def seed(
+    db: Database,
+    *,
+    users: int = 1_000,
+    messages: int = 10_000,
+    votes_per_message: int = 10,
+    starboards: int = 3,
+) -> Seed:
+    print("Seeding...")
+    uid_end = SEED_USER_OFFSET + users - 1
+    mid_end = SEED_MESSAGE_OFFSET + messages - 1
+
+    await db.execute("DELETE FROM guilds WHERE guild_id=$1", [SEED_GUILD])
+    await db.execute(
+        "DELETE FROM users WHERE user_id BETWEEN $1 AND $2",
+        [SEED_USER_OFFSET, uid_end],
+    )
+
+    await db.execute(
+        "INSERT INTO guilds (guild_id, premium_end) VALUES ($1, NULL)",
+        [SEED_GUILD],
+    )
+    await db.execute(
+        """INSERT INTO users
+            (user_id, is_bot, credits, donated_cents, patreon_status)
+        SELECT u, false, 0, 0, 0 FROM generate_series($1::int, $2::int) u""",
+        [SEED_USER_OFFSET, uid_end],
+    )
+    await db.execute(
+        """INSERT INTO members (user_id, guild_id, xp, autoredeem_enabled)
+        SELECT u, $1, (u::bigint * 7919) % 1000, false
+        FROM generate_series($2::int, $3::int) u""",
+        [SEED_GUILD, SEED_USER_OFFSET, uid_end],
+    )
+
+    sbids: list[int] = []
+    for x in range(starboards):
+        sb = await Starboard(
+            name=f"starboard-{x}",
+            channel_id=SEED_CHANNEL + 100 + x,
+            guild_id=SEED_GUILD,
+        ).create()
+        sbids.append(sb.id)
+
+    # a thread in a channel in a category
+    chain = [SEED_CHANNEL + 2, SEED_CHANNEL + 1, SEED_CHANNEL]
+    for x, sbid in enumerate(sbids):
+        await Override(
+            guild_id=SEED_GUILD,
+            name=f"override-{x}",
+            starboard_id=sbid,
+            channel_ids=[chain[x % len(chain)]],
+        ).create()
+
+    await db.execute(
+        """INSERT INTO messages (message_id, guild_id, channel_id, author_id,
+            is_nsfw, forced_to, trashed, trash_reason, frozen)
+        SELECT m, $1, $2, $3 + (m % $4), false, '{}', false, NULL, false
+        FROM generate_series($5::bigint, $6::bigint) m""",
+        [
+            SEED_GUILD,
+            chain[0],
+            SEED_USER_OFFSET,
+            users,
+            SEED_MESSAGE_OFFSET,
+            mid_end,
+        ],
+    )
+    await db.execute(
+        """INSERT INTO votes (message_id, starboard_id, user_id,
+            target_author_id, is_downvote, created_at)
+        SELECT m, sb, $1 + ((m + v) % $2), $1 + (m % $2), v % 5 = 0,
+            -- spread over the last 90 days
+            now() - ((m * 7 + v) % 2160) * interval '1 hour'
+        FROM generate_series($3::bigint, $4::bigint) m,
+            unnest($5::int[]) sb,
+            generate_series(1, $6) v""",
+        [
+            SEED_USER_OFFSET,
+            users,
+            SEED_MESSAGE_OFFSET,
+            mid_end,
+            sbids,
+            votes_per_message,
+        ],
+    )
+    await db.execute(
+        """INSERT INTO sb_messages (message_id, starboard_id, sb_message_id,
+            last_known_point_count)
+        SELECT m, $1, CASE WHEN m % 10 = 0 THEN m + $2 END, m % 50
+        FROM generate_series($3::bigint, $4::bigint) m""",
+        [sbids[0], messages, SEED_MESSAGE_OFFSET, mid_end],
+    )
+    await db.execute("ANALYZE", [])
+    print("Seeded.")
+
+    return Seed(
+        guild_id=SEED_GUILD,
+        starboard_ids=sbids,
+        channel_chain=chain,
+        user_ids=list(range(SEED_USER_OFFSET, uid_end + 1)),
+        message_ids=list(range(SEED_MESSAGE_OFFSET, mid_end + 1)),
+    )
+
+
+async def timeit(
+    func: Callable[[int], Awaitable[Any]], runs: int = 1_000, warmup: int = 50
+) -> list[float]:
+    for x in range(warmup):
+        await func(x)
+
+    times: list[float] = []
+    for x in range(runs):
+        start = time.perf_counter()
+        await func(x)
+        times.append((time.perf_counter() - start) * 1_000)
+    return times
+
+
+def summarize(times: list[float]) -> str:
+    times = sorted(times)
+    p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+    return (
+        f"mean {statistics.fmean(times):.3f}ms "
+        f"p50 {statistics.median(times):.3f}ms "
+        f"p99 {p99:.3f}ms"
+    )
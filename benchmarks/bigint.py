@@ -0,0 +1,147 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Compares NUMERIC and BIGINT snowflake columns: table and index size, and
+# query time for the hot vote queries, including converting the results to
+# ints (which is what the old DecimalC converter did).
+#
+# Usage: python -m benchmarks.bigint [rows]
+
+from __future__ import annotations
+
+import asyncio
+import random
+import sys
+
+import asyncpg
+
+from ._utils import connect, summarize, timeit
+
+# roughly the size of a snowflake from 2022
+SNOWFLAKE = 950_000_000_000_000_000
+SPACING = 1 << 22
+TYPES = ("numeric", "bigint")
+
+
+async def _create(con: asyncpg.Connection, type_: str, rows: int) -> None:
+    table = f"_bench_votes_{type_}"
+    print(f"Creating {table} ({rows} rows)...")
+    await con.execute(f"DROP TABLE IF EXISTS {table}")
+    await con.execute(
+        f"""CREATE TABLE {table} (
+            message_id {type_} NOT NULL,
+            starboard_id int NOT NULL,
+            user_id {type_} NOT NULL,
+            target_author_id {type_} NOT NULL,
+            is_downvote boolean NOT NULL,
+            PRIMARY KEY (message_id, starboard_id, user_id)
+        )"""
+    )
+    await con.execute(
+        f"""INSERT INTO {table}
+        SELECT $1::bigint + (x % $3) * $2::bigint, 1,
+            $1::bigint + (x / $3) * $2,
+            $1::bigint + (x % $4) * $2,
+            x % 5 = 0
+        FROM generate_series(0::bigint, $5 - 1) x""",
+        SNOWFLAKE,
+        SPACING,
+        rows // 10,
+        rows // 100,
+        rows,
+    )
+    await con.execute(
+        f"CREATE INDEX ON {table} (message_id, starboard_id, is_downvote)"
+    )
+    await con.execute(
+        f"CREATE INDEX ON {table} "
+        "(target_author_id, starboard_id, is_downvote)"
+    )
+    await con.execute(f"VACUUM ANALYZE {table}")
+
+
+async def _report(con: asyncpg.Connection, type_: str, rows: int) -> None:
+    table = f"_bench_votes_{type_}"
+    size, index_size = await con.fetchrow(
+        "SELECT pg_table_size($1::regclass), pg_indexes_size($1::regclass)",
+        table,
+    )
+    print(
+        f"\n{type_}: table {size / 1024 ** 2:.1f}MiB, "
+        f"indexes {index_size / 1024 ** 2:.1f}MiB"
+    )
+
+    def mid() -> int:
+        return SNOWFLAKE + random.randrange(rows // 10) * SPACING
+
+    def uid() -> int:
+        return SNOWFLAKE + random.randrange(rows // 100) * SPACING
+
+    async def points(x: int) -> None:
+        await con.fetchval(
+            f"""SELECT count(*) FILTER (WHERE NOT is_downvote)
+                - count(*) FILTER (WHERE is_downvote)
+            FROM {table} WHERE message_id=$1 AND starboard_id=1""",
+            mid(),
+        )
+
+    async def xp(x: int) -> None:
+        await con.fetchval(
+            f"""SELECT count(*) FILTER (WHERE NOT is_downvote)
+                - count(*) FILTER (WHERE is_downvote)
+            FROM {table} WHERE target_author_id=$1""",
+            uid(),
+        )
+
+    async def fetch(x: int) -> None:
+        for r in await con.fetch(
+            f"SELECT * FROM {table} WHERE target_author_id=$1", uid()
+        ):
+            int(r["message_id"])
+            int(r["user_id"])
+            int(r["target_author_id"])
+
+    print(f"  points:      {summarize(await timeit(points))}")
+    print(f"  xp:          {summarize(await timeit(xp))}")
+    print(f"  fetch + int: {summarize(await timeit(fetch))}")
+
+
+async def main(rows: int) -> None:
+    db = await connect()
+    assert db.pool
+
+    async with db.pool.acquire() as con:
+        try:
+            for t in TYPES:
+                await _create(con.con, t, rows)
+            for t in TYPES:
+                await _report(con.con, t, rows)
+        finally:
+            for t in TYPES:
+                await con.con.execute(f"DROP TABLE IF EXISTS _bench_votes_{t}")
+
+    await db.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
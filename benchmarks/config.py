@@ -0,0 +1,126 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Compares resolving starboard settings through overrides on every attribute
+# access (how StarboardConfig used to work) with StarboardConfig, which
+# resolves them once. Doesn't need a database.
+#
+# Usage: python -m benchmarks.config [overrides]
+
+from __future__ import annotations
+
+import json
+import sys
+import timeit
+from typing import Any, Callable, Iterable
+
+from starboard.core.config import StarboardConfig
+from starboard.database import Override, Starboard
+
+# the settings read while handling a single vote
+HOT = (
+    "enabled",
+    "upvote_emojis",
+    "downvote_emojis",
+    "remove_invalid",
+    "self_vote",
+    "allow_bots",
+    "cooldown_enabled",
+    "newer_than",
+    "older_than",
+    "required",
+    "required_remove",
+    "link_deletes",
+    "require_image",
+    "autoreact_upvote",
+    "autoreact_downvote",
+    "link_edits",
+)
+
+
+class LegacyConfig:
+    def __init__(
+        self, starboard: Starboard, overrides: Iterable[Override] | None
+    ) -> None:
+        self.starboard = starboard
+        self.overrides = overrides or []
+
+    def __getattr__(self, key: str) -> Any:
+        for ov in self.overrides:
+            if key in ov.overrides:
+                return ov.overrides[key]
+        return getattr(self.starboard, key)
+
+
+def _overrides(count: int) -> list[Override]:
+    return [
+        Override._from_raw(
+            id=x,
+            guild_id=1,
+            name=f"ov{x}",
+            starboard_id=1,
+            channel_ids=[x],
+            _overrides=json.dumps({"required": x + 2, "color": x}),
+        )
+        for x in range(count)
+    ]
+
+
+def _bench(name: str, func: Callable[[], Any], ops: int) -> None:
+    number, total = timeit.Timer(func).autorange()
+    best = min(timeit.repeat(func, number=number, repeat=5))
+    print(f"  {name}: {best / number / ops * 1e9:.0f}ns/op")
+
+
+def main(count: int) -> None:
+    sb = Starboard(id=1, name="starboard", channel_id=1, guild_id=1)
+
+    for cls in (LegacyConfig, StarboardConfig):
+        print(f"{cls.__name__} ({count} overrides):")
+
+        def resolve() -> None:
+            # overrides are fetched for every vote, so json is parsed again
+            config = cls(sb, _overrides(count))
+            for key in HOT:
+                getattr(config, key)
+
+        config = cls(sb, _overrides(count))
+
+        def read() -> None:
+            for key in HOT:
+                getattr(config, key)
+
+        attr = (
+            "upvote_emoji_set" if cls is StarboardConfig else "upvote_emojis"
+        )
+
+        def emoji() -> None:
+            "⭐" in getattr(config, attr)
+
+        _bench("resolve + read hot settings", resolve, 1)
+        _bench("read a setting", read, len(HOT))
+        _bench("emoji lookup", emoji, 1)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,188 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Compares the query builder against the prepared statements in
+# starboard.database.queries for each of the hot queries.
+#
+# Usage: python -m benchmarks.queries [runs]
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from typing import Any, Awaitable, Callable
+
+from apgorm import join, raw, sql
+
+from starboard.database import (
+    Member,
+    Message,
+    Override,
+    PermRole,
+    PermRoleStarboard,
+    SBMessage,
+    Starboard,
+    Vote,
+    queries,
+)
+
+from ._utils import Seed, connect, seed, summarize, timeit
+
+_Case = Callable[[int], Awaitable[Any]]
+
+
+def _cases(s: Seed) -> dict[str, tuple[_Case, _Case]]:
+    def mid(x: int) -> int:
+        return s.message_ids[x % len(s.message_ids)]
+
+    def uid(x: int) -> int:
+        return s.user_ids[x % len(s.user_ids)]
+
+    def sbid(x: int) -> int:
+        return s.starboard_ids[x % len(s.starboard_ids)]
+
+    async def starboards_builder(x: int) -> Any:
+        return (
+            await Starboard.fetch_query()
+            .where(guild_id=s.guild_id)
+            .fetchmany()
+        )
+
+    async def overrides_builder(x: int) -> Any:
+        chain = s.channel_chain[x % len(s.channel_chain) :]
+        return (
+            await Override.fetch_query()
+            .where(starboard_id=sbid(x))
+            .where(
+                sql(
+                    Override.channel_ids,
+                    raw("&& array["),
+                    join(raw(","), *chain),
+                    raw("]::bigint[]"),
+                )
+            )
+            .fetchmany()
+        )
+
+    async def overrides_prepared(x: int) -> Any:
+        chain = s.channel_chain[x % len(s.channel_chain) :]
+        return await queries.CHANNEL_OVERRIDES.fetchmany(sbid(x), chain)
+
+    async def points_builder(x: int) -> Any:
+        up = await Vote.count(
+            message_id=mid(x), starboard_id=sbid(x), is_downvote=False
+        )
+        down = await Vote.count(
+            message_id=mid(x), starboard_id=sbid(x), is_downvote=True
+        )
+        return up - down
+
+    async def xp_builder(x: int) -> Any:
+        total = 0.0
+        for sb in (
+            await Starboard.fetch_query()
+            .where(guild_id=s.guild_id)
+            .fetchmany()
+        ):
+            up = await Vote.count(
+                starboard_id=sb.id, target_author_id=uid(x), is_downvote=False
+            )
+            down = await Vote.count(
+                starboard_id=sb.id, target_author_id=uid(x), is_downvote=True
+            )
+            total += (up - down) * sb.xp_multiplier
+        return total
+
+    async def permroles_builder(x: int) -> Any:
+        for r in (
+            await PermRole.fetch_query().where(guild_id=s.guild_id).fetchmany()
+        ):
+            await PermRoleStarboard.fetch_query().where(
+                permrole_id=r.role_id
+            ).fetchmany()
+
+    async def permroles_prepared(x: int) -> Any:
+        pr = await queries.PERMROLES.fetchmany(s.guild_id)
+        await queries.PERMROLE_STARBOARDS.fetchmany([r.role_id for r in pr])
+
+    async def leaderboard_builder(x: int) -> Any:
+        q = Member.fetch_query()
+        q.where(guild_id=s.guild_id)
+        q.where(Member.xp.gt(0))
+        q.order_by(Member.xp, reverse=True)
+        return await q.fetchmany(limit=10)
+
+    return {
+        "starboards": (
+            starboards_builder,
+            lambda x: queries.STARBOARDS.fetchmany(s.guild_id),
+        ),
+        "channel_overrides": (overrides_builder, overrides_prepared),
+        "message": (
+            lambda x: Message.exists(message_id=mid(x)),
+            lambda x: queries.MESSAGE.fetchone(mid(x)),
+        ),
+        "sbmessage": (
+            lambda x: SBMessage.exists(
+                message_id=mid(x), starboard_id=sbid(x)
+            ),
+            lambda x: queries.SBMESSAGE.fetchone(mid(x), sbid(x)),
+        ),
+        "sbmessage_by_sb_message_id": (
+            lambda x: SBMessage.exists(sb_message_id=mid(x)),
+            lambda x: queries.SBMESSAGE_BY_SB_MESSAGE_ID.fetchone(mid(x)),
+        ),
+        "message_points": (
+            points_builder,
+            lambda x: queries.MESSAGE_POINTS.fetchval(mid(x), sbid(x)),
+        ),
+        "author_xp": (
+            xp_builder,
+            lambda x: queries.AUTHOR_XP.fetchval(s.guild_id, uid(x)),
+        ),
+        "member": (
+            lambda x: Member.exists(guild_id=s.guild_id, user_id=uid(x)),
+            lambda x: queries.MEMBER.fetchone(s.guild_id, uid(x)),
+        ),
+        "permroles": (permroles_builder, permroles_prepared),
+        "leaderboard": (
+            leaderboard_builder,
+            lambda x: queries.LEADERBOARD.fetchmany(s.guild_id, 10),
+        ),
+    }
+
+
+async def main(runs: int) -> None:
+    db = await connect()
+    s = await seed(db)
+
+    for name, (builder, prepared) in _cases(s).items():
+        print(f"{name}:")
+        print(f"  builder:  {summarize(await timeit(builder, runs))}")
+        print(f"  prepared: {summarize(await timeit(prepared, runs))}")
+
+    await db.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000))
@@ -0,0 +1,124 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Compares ways of finding a member's rank in a large guild: fetching the top
+# of the leaderboard (what /rank used to do, which only works for members on
+# it), the MEMBER_RANK and MEMBER_NEIGHBORS statements, and loading the whole
+# guild's leaderboard into memory.
+#
+# Usage: python -m benchmarks.rank [members] [runs]
+
+from __future__ import annotations
+
+import asyncio
+import random
+import sys
+import time
+
+from starboard.core.leaderboard import GuildLeaderboard
+from starboard.database import queries
+
+from ._utils import connect, seed, summarize, timeit
+
+
+async def main(members: int, runs: int) -> None:
+    db = await connect()
+    s = await seed(
+        db, users=members, messages=0, votes_per_message=0, starboards=1
+    )
+    # so that the rank counts can use index-only scans, like they would once
+    # autovacuum has run
+    assert db.pool
+    async with db.pool.acquire() as con:
+        await con.con.execute("VACUUM ANALYZE members")
+
+    uids = random.sample(s.user_ids, runs)
+    # the lowest ranked member has to count everyone above them
+    last = min(
+        (u for u in s.user_ids if (u * 7919) % 1000),
+        key=lambda u: ((u * 7919) % 1000, -u),
+    )
+
+    async def top(x: int) -> None:
+        lb = await queries.LEADERBOARD.fetchmany(s.guild_id, 50)
+        next((m for m in lb if m.user_id == uids[x % runs]), None)
+
+    print("top 50:")
+    print(f"  {summarize(await timeit(top, runs))}")
+    print("member_rank:")
+    print(
+        "  "
+        + summarize(
+            await timeit(
+                lambda x: queries.MEMBER_RANK.fetchraw(
+                    s.guild_id, uids[x % runs]
+                ),
+                runs,
+            )
+        )
+    )
+    print("member_rank (lowest ranked):")
+    print(
+        "  "
+        + summarize(
+            await timeit(
+                lambda x: queries.MEMBER_RANK.fetchraw(s.guild_id, last), runs
+            )
+        )
+    )
+    print("member_neighbors:")
+    print(
+        "  "
+        + summarize(
+            await timeit(
+                lambda x: queries.MEMBER_NEIGHBORS.fetchraw(
+                    s.guild_id, uids[x % runs], 1
+                ),
+                runs,
+            )
+        )
+    )
+
+    start = time.perf_counter()
+    rows = await queries.LEADERBOARD_XP.fetchraw(s.guild_id)
+    lb = GuildLeaderboard((r["user_id"], r["xp"]) for r in rows)
+    load = (time.perf_counter() - start) * 1_000
+    print(f"loading the leaderboard: {load:.1f}ms ({len(lb)} members)")
+    print("in memory:")
+    print(
+        "  "
+        + summarize(
+            await timeit(lambda x: asyncio.sleep(0, lb.get(uids[x % runs])))
+        )
+    )
+
+    await db.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 500_000,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 1_000,
+        )
+    )
@@ -0,0 +1,626 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Drives handle_reaction_add/handle_reaction_remove with a stream of
+# synthetic reaction events, against the database from config.json and a
+# fake REST client that records its calls and simulates latency and 429s.
+# Reports throughput, handling latency, and DB queries and REST calls per
+# event.
+#
+# Usage: python -m benchmarks.reaction_storm --help
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import random
+import time
+import traceback
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, cast
+
+import hikari
+from pycooldown import FixedCooldown
+
+from starboard.cache import Cache
+from starboard.core import reactions
+from starboard.database import (
+    Database,
+    Override,
+    PermRole,
+    PermRoleStarboard,
+    Starboard,
+)
+from starboard.events.reactions import (
+    REACTION_ADD_BUDGET,
+    REACTION_REMOVE_BUDGET,
+)
+from starboard.tracing import SPAN_STATS
+
+from ._utils import connect, summarize
+
+if TYPE_CHECKING:
+    from starboard.bot import Bot
+
+STORM_GUILD_OFFSET = 10_000
+STORM_USER_OFFSET = 100_000
+BOT_ID = 99
+STAR = hikari.UnicodeEmoji("⭐")
+
+
+def _user(app: Any, user_id: int) -> hikari.User:
+    return hikari.impl.entity_factory.user_models.UserImpl(  # type: ignore
+        id=hikari.Snowflake(user_id),
+        app=app,
+        discriminator="0001",
+        username=f"user-{user_id}",
+        avatar_hash=None,
+        banner_hash=None,
+        accent_color=None,
+        is_bot=user_id == BOT_ID,
+        is_system=False,
+        flags=hikari.UserFlag.NONE,
+    )
+
+
+def _message(
+    app: Any, message_id: int, channel_id: int, guild_id: int, author: Any
+) -> hikari.Message:
+    return hikari.Message(
+        app=app,
+        id=hikari.Snowflake(message_id),
+        channel_id=hikari.Snowflake(channel_id),
+        guild_id=hikari.Snowflake(guild_id),
+        user_mentions={},
+        role_mention_ids=[],
+        channel_mentions={},
+        mentions_everyone=False,
+        author=author,
+        member=None,
+        content=f"message {message_id}",
+        timestamp=datetime.now(timezone.utc),
+        edited_timestamp=None,
+        is_tts=False,
+        attachments=[],
+        embeds=[],
+        reactions=[],
+        is_pinned=False,
+        webhook_id=None,
+        type=hikari.MessageType.DEFAULT,
+        activity=None,
+        application=None,
+        message_reference=None,
+        flags=hikari.MessageFlag.NONE,
+        stickers=[],
+        nonce=None,
+        referenced_message=None,
+        interaction=None,
+        application_id=None,
+        components=[],
+    )
+
+
+class World:
+    # the discord side of the storm: guilds, channels, members and messages
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.app: Any = None
+        self.guild_ids = [STORM_GUILD_OFFSET + g for g in range(args.guilds)]
+        self.user_ids = list(
+            range(STORM_USER_OFFSET, STORM_USER_OFFSET + args.users)
+        )
+        self.channels: dict[int, hikari.GuildChannel] = {}
+        self.guilds: dict[int, Any] = {}
+        self.members: dict[tuple[int, int], hikari.Member] = {}
+        self.messages: dict[int, hikari.Message] = {}
+        # (guild_id, channel_id, message_id) for each original message
+        self.originals: list[tuple[int, int, int]] = []
+
+        base = int(hikari.Snowflake.from_datetime(datetime.now(timezone.utc)))
+        assert args.guilds * args.messages < 1 << 21
+        self._ids = itertools.count(base + (1 << 21))
+
+        for g, guild_id in enumerate(self.guild_ids):
+            roles = {
+                r: SimpleNamespace(id=r, position=p)
+                for p, r in enumerate([guild_id] + self.permrole_ids(guild_id))
+            }
+            self.guilds[guild_id] = SimpleNamespace(
+                id=hikari.Snowflake(guild_id),
+                name=f"guild-{g}",
+                get_roles=lambda roles=roles: roles,
+            )
+
+            self.channels[self.category_id(guild_id)] = hikari.GuildCategory(
+                app=None,  # type: ignore
+                id=hikari.Snowflake(self.category_id(guild_id)),
+                name="category",
+                type=hikari.ChannelType.GUILD_CATEGORY,
+                guild_id=hikari.Snowflake(guild_id),
+                position=0,
+                is_nsfw=False,
+                permission_overwrites={},
+                parent_id=None,
+            )
+            for ch, parent in [
+                (self.text_id(guild_id), self.category_id(guild_id)),
+                *((c, None) for c in self.starboard_channel_ids(guild_id)),
+            ]:
+                self.channels[ch] = hikari.GuildTextChannel(
+                    app=None,  # type: ignore
+                    id=hikari.Snowflake(ch),
+                    name=f"channel-{ch}",
+                    type=hikari.ChannelType.GUILD_TEXT,
+                    guild_id=hikari.Snowflake(guild_id),
+                    parent_id=(
+                        hikari.Snowflake(parent)
+                        if parent is not None
+                        else None
+                    ),
+                    position=0,
+                    is_nsfw=False,
+                    permission_overwrites={},
+                    topic=None,
+                    last_message_id=None,
+                    rate_limit_per_user=timedelta(0),
+                    last_pin_timestamp=None,
+                    default_auto_archive_duration=timedelta(hours=1),
+                )
+
+            for m in range(args.messages):
+                self.originals.append(
+                    (
+                        guild_id,
+                        self.text_id(guild_id),
+                        base + g * args.messages + m,
+                    )
+                )
+
+    @staticmethod
+    def category_id(guild_id: int) -> int:
+        return guild_id * 1_000 + 1
+
+    @staticmethod
+    def text_id(guild_id: int) -> int:
+        return guild_id * 1_000 + 2
+
+    def starboard_channel_ids(self, guild_id: int) -> list[int]:
+        return [
+            guild_id * 1_000 + 100 + x for x in range(self.args.starboards)
+        ]
+
+    def permrole_ids(self, guild_id: int) -> list[int]:
+        return [guild_id * 1_000 + 500 + x for x in range(self.args.permroles)]
+
+    def member(self, guild_id: int, user_id: int) -> hikari.Member:
+        if (m := self.members.get((guild_id, user_id))) is not None:
+            return m
+
+        # every member has the default role, and roughly 1/(x+2) of them
+        # have the xth permrole
+        role_ids = [hikari.Snowflake(guild_id)] + [
+            hikari.Snowflake(r)
+            for x, r in enumerate(self.permrole_ids(guild_id))
+            if user_id % (x + 2) == 0
+        ]
+        m = self.members[(guild_id, user_id)] = hikari.Member(
+            guild_id=hikari.Snowflake(guild_id),
+            is_deaf=False,
+            is_mute=False,
+            is_pending=False,
+            joined_at=datetime.now(timezone.utc),
+            nickname=None,
+            premium_since=None,
+            raw_communication_disabled_until=None,
+            role_ids=role_ids,
+            user=_user(self.app, user_id),
+            guild_avatar_hash=None,
+        )
+        return m
+
+    def message(self, message_id: int) -> hikari.Message | None:
+        if (msg := self.messages.get(message_id)) is not None:
+            return msg
+
+        base = self.originals[0][2]
+        if not 0 <= message_id - base < len(self.originals):
+            return None
+        guild_id, channel_id, _ = self.originals[message_id - base]
+        author = self.user_ids[message_id % len(self.user_ids)]
+        msg = self.messages[message_id] = _message(
+            self.app, message_id, channel_id, guild_id, _user(self.app, author)
+        )
+        return msg
+
+    def new_message(self, channel_id: int) -> hikari.Message:
+        channel = self.channels[channel_id]
+        msg = _message(
+            self.app,
+            next(self._ids),
+            channel_id,
+            channel.guild_id,
+            _user(self.app, BOT_ID),
+        )
+        self.messages[msg.id] = msg
+        return msg
+
+
+class FakeREST:
+    # records each call, waits for the simulated latency and, every so
+    # often, for a simulated 429 (which hikari waits out and retries)
+    def __init__(self, world: World, args: argparse.Namespace) -> None:
+        self.world = world
+        self.latency = args.rest_latency / 1_000
+        self.ratelimit = args.ratelimit
+        self.retry_after = args.retry_after / 1_000
+        self.calls: Counter[str] = Counter()
+        self.ratelimited = 0
+
+    async def _call(self, method: str) -> None:
+        self.calls[method] += 1
+        if random.random() < self.ratelimit:
+            self.ratelimited += 1
+            await asyncio.sleep(self.retry_after)
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+
+    @staticmethod
+    def _not_found() -> hikari.NotFoundError:
+        return hikari.NotFoundError("fake", {}, b"")  # type: ignore
+
+    async def fetch_channel(self, channel: Any) -> hikari.PartialChannel:
+        await self._call("fetch_channel")
+        if (ch := self.world.channels.get(int(channel))) is None:
+            raise self._not_found()
+        return ch
+
+    async def fetch_member(self, guild: Any, user: Any) -> hikari.Member:
+        await self._call("fetch_member")
+        if int(guild) not in self.world.guilds:
+            raise self._not_found()
+        return self.world.member(int(guild), int(user))
+
+    async def fetch_message(
+        self, channel: Any, message: Any
+    ) -> hikari.Message:
+        await self._call("fetch_message")
+        if (msg := self.world.message(int(message))) is None:
+            raise self._not_found()
+        return msg
+
+    async def create_message(
+        self, channel: Any, content: Any = None, **kwargs: Any
+    ) -> hikari.Message:
+        await self._call("create_message")
+        return self.world.new_message(int(channel))
+
+    async def edit_message(
+        self, channel: Any, message: Any, content: Any = None, **kwargs: Any
+    ) -> hikari.Message:
+        await self._call("edit_message")
+        if (msg := self.world.messages.get(int(message))) is None:
+            raise self._not_found()
+        return msg
+
+    async def delete_message(self, channel: Any, message: Any) -> None:
+        await self._call("delete_message")
+        if self.world.messages.pop(int(message), None) is None:
+            raise self._not_found()
+
+    async def add_reaction(self, *args: Any, **kwargs: Any) -> None:
+        await self._call("add_reaction")
+
+    async def delete_reaction(self, *args: Any, **kwargs: Any) -> None:
+        await self._call("delete_reaction")
+
+
+class _Cache(Cache):
+    # guilds would be cached from the gateway
+    def __init__(self, app: Bot, world: World) -> None:
+        super().__init__(app)
+        self.world = world
+
+    def get_guild(self, guild: Any) -> Any:
+        return self.world.guilds.get(int(guild))
+
+
+class FakeBot:
+    def __init__(
+        self, world: World, rest: FakeREST, database: Database
+    ) -> None:
+        world.app = self
+        self.rest = rest
+        self.database = database
+        self.me = _user(self, BOT_ID)
+        self.cluster = SimpleNamespace(shard_count=1, shard_ids=[0])
+        self.cache = _Cache(cast("Bot", self), world)
+
+        # channels would be cached from the gateway
+        for channel in world.channels.values():
+            self.cache.set_guild_channel(channel)  # type: ignore
+
+    def get_me(self) -> hikari.User:
+        return self.me
+
+
+async def seed(db: Database, world: World) -> None:
+    print("Seeding...")
+    args = world.args
+    await db.execute(
+        "DELETE FROM role_jobs WHERE guild_id = ANY($1::bigint[])",
+        [world.guild_ids],
+    )
+    await db.execute(
+        "DELETE FROM guilds WHERE guild_id = ANY($1::bigint[])",
+        [world.guild_ids],
+    )
+    await db.execute(
+        "DELETE FROM users WHERE user_id BETWEEN $1 AND $2",
+        [world.user_ids[0], world.user_ids[-1]],
+    )
+
+    premium_end = (
+        datetime.now(timezone.utc) + timedelta(days=30)
+        if args.premium
+        else None
+    )
+    await db.execute(
+        """INSERT INTO guilds (guild_id, premium_end)
+        SELECT g, $2 FROM unnest($1::bigint[]) g""",
+        [world.guild_ids, premium_end],
+    )
+
+    for guild_id in world.guild_ids:
+        sbids: list[int] = []
+        for x, channel_id in enumerate(world.starboard_channel_ids(guild_id)):
+            sb = await Starboard(
+                name=f"storm-{x}",
+                channel_id=channel_id,
+                guild_id=guild_id,
+                required=args.required,
+            ).create()
+            sbids.append(sb.id)
+
+        # alternate between the channel and its category
+        targets = [world.text_id(guild_id), world.category_id(guild_id)]
+        for x in range(args.overrides):
+            ov = Override(
+                guild_id=guild_id,
+                name=f"storm-{x}",
+                starboard_id=sbids[x % len(sbids)],
+                channel_ids=[targets[x % 2]],
+            )
+            ov.overrides = {"required": args.required + x % 3}
+            await ov.create()
+
+        # the last permrole (if there's more than one) stops its members
+        # from voting on the first starboard
+        permroles = world.permrole_ids(guild_id)
+        for x, role_id in enumerate(permroles):
+            await PermRole(
+                role_id=role_id,
+                guild_id=guild_id,
+                xproles=None,
+                vote=None,
+                recv_votes=None,
+            ).create()
+            blocks = len(permroles) > 1 and x == len(permroles) - 1
+            await PermRoleStarboard(
+                permrole_id=role_id,
+                starboard_id=sbids[0 if blocks else x % len(sbids)],
+                vote=not blocks,
+                recv_votes=None,
+            ).create()
+
+    await db.execute("ANALYZE", [])
+    print("Seeded.")
+
+
+def events(
+    bot: FakeBot, world: World, count: int, remove_ratio: float
+) -> list[hikari.GuildReactionAddEvent | hikari.GuildReactionDeleteEvent]:
+    # a few messages get most of the reactions, like on a real starboard
+    added: list[tuple[int, int, int, int]] = []
+    out: list[
+        hikari.GuildReactionAddEvent | hikari.GuildReactionDeleteEvent
+    ] = []
+    for _ in range(count):
+        if added and random.random() < remove_ratio:
+            guild_id, channel_id, message_id, user_id = added.pop(
+                random.randrange(len(added))
+            )
+            out.append(
+                hikari.GuildReactionDeleteEvent(
+                    app=bot,  # type: ignore
+                    shard=None,  # type: ignore
+                    user_id=hikari.Snowflake(user_id),
+                    guild_id=hikari.Snowflake(guild_id),
+                    channel_id=hikari.Snowflake(channel_id),
+                    message_id=hikari.Snowflake(message_id),
+                    emoji_name=STAR,
+                    emoji_id=None,
+                )
+            )
+            continue
+
+        x = int(random.paretovariate(1.2)) - 1
+        guild_id, channel_id, message_id = world.originals[
+            x % len(world.originals)
+        ]
+        user_id = random.choice(world.user_ids)
+        added.append((guild_id, channel_id, message_id, user_id))
+        out.append(
+            hikari.GuildReactionAddEvent(
+                shard=None,  # type: ignore
+                member=world.member(guild_id, user_id),
+                channel_id=hikari.Snowflake(channel_id),
+                message_id=hikari.Snowflake(message_id),
+                emoji_name=STAR,
+                emoji_id=None,
+                is_animated=False,
+            )
+        )
+    return out
+
+
+async def main(args: argparse.Namespace) -> None:
+    random.seed(args.seed)
+    db = await connect()
+    world = World(args)
+    await seed(db, world)
+
+    rest = FakeREST(world, args)
+    bot = FakeBot(world, rest, db)
+    storm = events(bot, world, args.events, args.remove_ratio)
+
+    if not args.cooldown:
+        # otherwise most of the storm would be dropped by the per-guild vote
+        # cooldown, and the vote path wouldn't be measured
+        reactions.COOLDOWN = FixedCooldown(1e9, 1)
+
+    times: list[float] = []
+    errors: list[BaseException] = []
+
+    async def handle(
+        event: hikari.GuildReactionAddEvent | hikari.GuildReactionDeleteEvent,
+    ) -> None:
+        start = time.perf_counter()
+        try:
+            # counted the same way the event listeners count them
+            if isinstance(event, hikari.GuildReactionAddEvent):
+                with db.count_queries("reaction_add", REACTION_ADD_BUDGET):
+                    await reactions.handle_reaction_add(event)
+            else:
+                with db.count_queries(
+                    "reaction_remove", REACTION_REMOVE_BUDGET
+                ):
+                    await reactions.handle_reaction_remove(event)
+        except Exception as e:
+            if not errors:
+                traceback.print_exc()
+            errors.append(e)
+        times.append((time.perf_counter() - start) * 1_000)
+
+    db.stats.reset()
+    SPAN_STATS.clear()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    tasks: list[asyncio.Task[None]] = []
+    for x, event in enumerate(storm):
+        if (delay := start + x / args.rate - loop.time()) > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(handle(event)))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+
+    # let anything the handlers started (like role refreshes) finish, so
+    # it's counted
+    others = asyncio.all_tasks() - {asyncio.current_task()}
+    if others:
+        await asyncio.wait(others, timeout=10)
+
+    adds = sum(isinstance(e, hikari.GuildReactionAddEvent) for e in storm)
+    n = len(storm)
+    queries = {
+        shape: h.count for shape, h in db.stats.latency.items() if h.count
+    }
+    print(
+        f"{n} events ({adds} adds, {n - adds} removes) over "
+        f"{args.guilds} guilds in {elapsed:.2f}s: {n / elapsed:.1f} events/s"
+    )
+    print(f"handling: {summarize(times)}")
+    print(f"errors: {len(errors)}")
+    print(f"db queries/event: {sum(queries.values()) / n:.2f}")
+    for name, budget in [
+        ("reaction_add", REACTION_ADD_BUDGET),
+        ("reaction_remove", REACTION_REMOVE_BUDGET),
+    ]:
+        if (h := db.stats.queries.get(name)) is not None:
+            print(
+                f"  {name}: mean {h.mean:.1f} p99 {h.percentile(99):.0f} "
+                f"max {h.max:.0f} (budget {budget})"
+            )
+    for shape, count in sorted(queries.items(), key=lambda q: -q[1])[:10]:
+        print(f"  {count / n:6.2f}  {' '.join(shape.split())[:70]}")
+    print(f"rest calls/event: {sum(rest.calls.values()) / n:.2f}")
+    for method, count in rest.calls.most_common():
+        print(f"  {count / n:6.2f}  {method}")
+    print(f"429s: {rest.ratelimited}")
+    print("spans (by total time):")
+    for name, h in sorted(SPAN_STATS.items(), key=lambda s: -s[1].total):
+        print(f"  {name}: {h.count} calls, mean {h.mean:.2f}ms")
+
+    await db.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.reaction_storm"
+    )
+    parser.add_argument("--events", type=int, default=5_000)
+    parser.add_argument(
+        "--rate", type=float, default=500, help="events per second"
+    )
+    parser.add_argument(
+        "--remove-ratio",
+        type=float,
+        default=0.2,
+        help="share of events that remove an earlier reaction",
+    )
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument(
+        "--messages", type=int, default=200, help="messages per guild"
+    )
+    parser.add_argument(
+        "--starboards", type=int, default=3, help="starboards per guild"
+    )
+    parser.add_argument(
+        "--overrides", type=int, default=2, help="overrides per guild"
+    )
+    parser.add_argument(
+        "--permroles", type=int, default=2, help="permroles per guild"
+    )
+    parser.add_argument("--required", type=int, default=3)
+    parser.add_argument("--premium", action="store_true")
+    parser.add_argument(
+        "--cooldown",
+        action="store_true",
+        help="keep the per-guild vote cooldown",
+    )
+    parser.add_argument(
+        "--rest-latency", type=float, default=50, help="milliseconds"
+    )
+    parser.add_argument(
+        "--ratelimit",
+        type=float,
+        default=0.01,
+        help="chance of a REST call being rate limited",
+    )
+    parser.add_argument(
+        "--retry-after", type=float, default=1_000, help="milliseconds"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,119 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Compares ORDER BY random() against the random keyset probe used by
+# /random, with and without filters.
+#
+# Usage: python -m benchmarks.sampling [messages] [runs]
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from collections import Counter
+from typing import Any
+
+from apgorm import raw
+
+from starboard.database import Message, SBMessage, queries
+
+from ._utils import connect, seed, summarize, timeit
+
+
+async def _order_by_random(
+    sbid: int,
+    channel_id: int | None,
+    min_points: int | None,
+    max_points: int | None,
+    allow_nsfw: bool,
+) -> Any:
+    q = SBMessage.fetch_query()
+    q.where(starboard_id=sbid)
+    q.where(SBMessage.sb_message_id.is_null.not_)
+
+    sbq = Message.fetch_query()
+    sbq.where(message_id=SBMessage.message_id)
+    sbq.where(trashed=False)
+    if not allow_nsfw:
+        sbq.where(is_nsfw=False)
+    if channel_id:
+        sbq.where(channel_id=channel_id)
+
+    q.where(sbq.exists())
+
+    if min_points:
+        q.where(SBMessage.last_known_point_count.gteq(min_points))
+    if max_points:
+        q.where(SBMessage.last_known_point_count.lteq(max_points))
+
+    q.order_by(raw("random()"))
+    return await q.fetchone()
+
+
+async def main(messages: int, runs: int) -> None:
+    db = await connect()
+    s = await seed(db, messages=messages, votes_per_message=0, starboards=1)
+    sbid = s.starboard_ids[0]
+
+    cases: dict[str, tuple[Any, ...]] = {
+        "no filters": (None, None, None, False),
+        "channel": (s.channel_chain[0], None, None, False),
+        "min points": (None, 35, None, False),
+        "points range": (None, 15, 25, True),
+    }
+    for name, filters in cases.items():
+        print(f"{name}:")
+        old = await timeit(
+            lambda x: _order_by_random(sbid, *filters), runs, warmup=5
+        )
+        print(f"  order by random(): {summarize(old)}")
+        new = await timeit(
+            lambda x: queries.RANDOM_SBMESSAGE.fetchone(sbid, *filters),
+            runs,
+            warmup=5,
+        )
+        print(f"  keyset probe:      {summarize(new)}")
+
+    # how evenly the probe spreads over the posted messages
+    picks: Counter[int] = Counter()
+    for _ in range(runs * 10):
+        ret = await queries.RANDOM_SBMESSAGE.fetchone(
+            sbid, None, None, None, False
+        )
+        assert ret
+        picks[ret.message_id] += 1
+    print(
+        f"{len(picks)} distinct of {runs * 10} picks, "
+        f"most common picked {picks.most_common(1)[0][1]} times"
+    )
+
+    await db.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+        )
+    )
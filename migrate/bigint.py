@@ -0,0 +1,402 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Online NUMERIC -> BIGINT conversion for the snowflake columns.
+#
+# Migration 0002 converts the columns with ALTER TABLE ... TYPE BIGINT, which
+# rewrites each table while holding an exclusive lock. That's fine for small
+# databases, but for large tables (votes, messages) run this first, while the
+# bot is still running:
+#
+#   python -m migrate.bigint [--chunk-pages N] [--delay SECONDS] [table ...]
+#
+# For each table with NUMERIC columns, this:
+# - adds a BIGINT shadow column (<name>_i8) for each NUMERIC column, and a
+#   trigger that keeps it in sync on INSERT/UPDATE
+# - backfills the shadow columns in chunks of pages (by ctid range), each in
+#   its own short transaction
+# - builds copies of every index that uses the columns, CONCURRENTLY
+# - in one short transaction, drops the old columns, renames the shadow
+#   columns and indexes into place, and re-adds primary key, unique and
+#   foreign key constraints (the latter as NOT VALID, validated afterwards)
+#
+# Tables are converted children-first, so that foreign keys always go from a
+# BIGINT column to a NUMERIC or BIGINT column. Once done, migration 0002 is a
+# no-op and applies instantly. The script can be re-run if interrupted.
+#
+# The old code keeps working against the converted tables (asyncpg encodes
+# Decimals as BIGINT), so deploy the new code once this has finished. Expect
+# a few failed queries right after each swap, while connections re-prepare
+# their cached statements.
+#
+# Needs Postgres 14+ (for TID range scans, without which each chunk is a full
+# table scan).
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import re
+from dataclasses import dataclass
+
+import asyncpg
+from tqdm import tqdm
+
+from starboard.config import CONFIG
+
+SUFFIX = "_i8"
+
+
+@dataclass
+class Constraint:
+    table: str
+    name: str
+    type_: str
+    definition: str
+    index: str | None
+
+
+@dataclass
+class IndexDef:
+    name: str
+    definition: str
+
+
+async def _numeric_columns(con: asyncpg.Connection) -> dict[str, list[str]]:
+    rows = await con.fetch(
+        """SELECT table_name, column_name FROM information_schema.columns
+        WHERE table_schema='public' AND udt_name IN ('numeric', '_numeric')
+        ORDER BY table_name, ordinal_position"""
+    )
+    cols: dict[str, list[str]] = {}
+    for r in rows:
+        cols.setdefault(r["table_name"], []).append(r["column_name"])
+    return cols
+
+
+async def _children_first(
+    con: asyncpg.Connection, tables: list[str]
+) -> list[str]:
+    rows = await con.fetch(
+        """SELECT conrelid::regclass::text AS child,
+            confrelid::regclass::text AS parent
+        FROM pg_constraint WHERE contype='f'"""
+    )
+    children: dict[str, set[str]] = {t: set() for t in tables}
+    for r in rows:
+        if r["parent"] in children and r["child"] != r["parent"]:
+            children[r["parent"]].add(r["child"])
+
+    ordered: list[str] = []
+    while children:
+        ready = sorted(
+            t for t, c in children.items() if not c.intersection(children)
+        )
+        assert ready, "Cyclic foreign keys."
+        for t in ready:
+            ordered.append(t)
+            del children[t]
+    return ordered
+
+
+async def _constraints(
+    con: asyncpg.Connection, table: str
+) -> list[Constraint]:
+    # primary keys and unique constraints on the table, and foreign keys on
+    # or referencing the table
+    rows = await con.fetch(
+        """SELECT conrelid::regclass::text AS table, conname,
+            contype::text AS contype,
+            pg_get_constraintdef(c.oid) AS def,
+            i.relname AS index
+        FROM pg_constraint c LEFT JOIN pg_class i ON i.oid=c.conindid
+        WHERE (conrelid=$1::regclass AND contype IN ('p', 'u', 'f'))
+            OR (confrelid=$1::regclass AND contype='f')""",
+        table,
+    )
+    return [
+        Constraint(
+            r["table"],
+            r["conname"],
+            r["contype"],
+            r["def"],
+            r["index"] if r["contype"] in "pu" else None,
+        )
+        for r in rows
+    ]
+
+
+def _shadow(sql: str, columns: list[str]) -> str:
+    for c in columns:
+        sql = re.sub(rf"\b{c}\b", c + SUFFIX, sql)
+    return sql
+
+
+async def _new_types(
+    con: asyncpg.Connection, table: str, columns: list[str]
+) -> dict[str, str]:
+    return {
+        r["column_name"]: (
+            "bigint[]" if r["udt_name"] == "_numeric" else "bigint"
+        )
+        for r in await con.fetch(
+            """SELECT column_name, udt_name FROM information_schema.columns
+            WHERE table_schema='public' AND table_name=$1""",
+            table,
+        )
+        if r["column_name"] in columns
+    }
+
+
+async def _add_shadow_columns(
+    con: asyncpg.Connection, table: str, types: dict[str, str]
+) -> None:
+    func = f"_sync{SUFFIX}_{table}"
+    async with con.transaction():
+        for c, type_ in types.items():
+            await con.execute(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS "
+                f"{c}{SUFFIX} {type_}"
+            )
+        sets = " ".join(
+            f"NEW.{c}{SUFFIX} := NEW.{c}::{t};" for c, t in types.items()
+        )
+        await con.execute(
+            f"""CREATE OR REPLACE FUNCTION {func}() RETURNS trigger AS $$
+            BEGIN {sets} RETURN NEW; END $$ LANGUAGE plpgsql"""
+        )
+        await con.execute(f"DROP TRIGGER IF EXISTS {func} ON {table}")
+        await con.execute(
+            f"""CREATE TRIGGER {func} BEFORE INSERT OR UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {func}()"""
+        )
+
+
+async def _backfill(
+    con: asyncpg.Connection,
+    table: str,
+    types: dict[str, str],
+    chunk_pages: int,
+    delay: float,
+) -> None:
+    pages: int = await con.fetchval(
+        """SELECT pg_relation_size($1::regclass)
+            / current_setting('block_size')::int""",
+        table,
+    )
+    # the trigger sets the shadow columns, so this only has to touch rows
+    sets = ", ".join(f"{c}={c}" for c in types)
+    unsynced = " OR ".join(
+        f"{c}{SUFFIX} IS DISTINCT FROM {c}::{t}" for c, t in types.items()
+    )
+    query = (
+        f"UPDATE {table} SET {sets} WHERE ctid >= $1::tid AND ctid < $2::tid "
+        f"AND ({unsynced})"
+    )
+    for start in tqdm(range(0, pages + 1, chunk_pages), desc=table):
+        await con.execute(query, (start, 0), (start + chunk_pages, 0))
+        if delay:
+            await asyncio.sleep(delay)
+
+    # rows updated during the backfill may have moved past the last page, but
+    # the trigger already handled those
+    remaining = await con.fetchval(
+        f"SELECT count(*) FROM {table} WHERE {unsynced}"
+    )
+    assert remaining == 0, f"{remaining} rows in {table} were not backfilled."
+
+
+async def _build_indexes(
+    con: asyncpg.Connection, table: str, columns: list[str]
+) -> list[IndexDef]:
+    rows = await con.fetch(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename=$1", table
+    )
+    built: list[IndexDef] = []
+    for r in rows:
+        name, definition = r["indexname"], r["indexdef"]
+        if name.endswith(SUFFIX):
+            continue
+        on = definition[definition.index(" ON ") :]
+        if _shadow(on, columns) == on:
+            continue
+
+        shadow = name + SUFFIX
+        create = definition[: definition.index(" INDEX ")]
+        await con.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {shadow}")
+        print(f"Building {shadow}...")
+        await con.execute(
+            f"{create} INDEX CONCURRENTLY {shadow}{_shadow(on, columns)}"
+        )
+        built.append(IndexDef(name, definition))
+    return built
+
+
+async def _set_not_null(
+    con: asyncpg.Connection, table: str, columns: list[str]
+) -> list[str]:
+    # validating a CHECK constraint doesn't block writes, and lets SET NOT
+    # NULL skip its full table scan during the swap
+    not_null = [
+        r["column_name"]
+        for r in await con.fetch(
+            """SELECT column_name FROM information_schema.columns
+            WHERE table_schema='public' AND table_name=$1
+            AND is_nullable='NO'""",
+            table,
+        )
+        if r["column_name"] in columns
+    ]
+    for c in not_null:
+        check = f"{c}{SUFFIX}_not_null"
+        await con.execute(
+            f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {check}"
+        )
+        await con.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {check} "
+            f"CHECK ({c}{SUFFIX} IS NOT NULL) NOT VALID"
+        )
+        await con.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}")
+    return not_null
+
+
+async def _swap(
+    con: asyncpg.Connection,
+    table: str,
+    columns: list[str],
+    not_null: list[str],
+    indexes: list[IndexDef],
+) -> list[Constraint]:
+    # primary key and unique constraints whose indexes weren't rebuilt don't
+    # use the columns, so they can be left alone
+    rebuilt = {i.name for i in indexes}
+    constraints = [
+        c
+        for c in await _constraints(con, table)
+        if c.type_ == "f" or c.index in rebuilt
+    ]
+    # foreign keys have to be dropped before the constraints they depend on
+    constraints.sort(key=lambda c: c.type_ != "f")
+    readded: list[Constraint] = []
+
+    async with con.transaction():
+        await con.execute("SET LOCAL lock_timeout = '5s'")
+        await con.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+
+        for c in constraints:
+            await con.execute(
+                f"ALTER TABLE {c.table} DROP CONSTRAINT IF EXISTS {c.name}"
+            )
+        func = f"_sync{SUFFIX}_{table}"
+        await con.execute(f"DROP TRIGGER {func} ON {table}")
+        await con.execute(f"DROP FUNCTION {func}()")
+
+        for col in columns:
+            await con.execute(f"ALTER TABLE {table} DROP COLUMN {col}")
+            await con.execute(
+                f"ALTER TABLE {table} RENAME COLUMN {col}{SUFFIX} TO {col}"
+            )
+        for col in not_null:
+            await con.execute(f"ALTER TABLE {table} ALTER {col} SET NOT NULL")
+            await con.execute(
+                f"ALTER TABLE {table} DROP CONSTRAINT {col}{SUFFIX}_not_null"
+            )
+
+        constraint_indexes = {c.index for c in constraints if c.index}
+        for i in indexes:
+            if i.name not in constraint_indexes:
+                await con.execute(
+                    f"ALTER INDEX {i.name}{SUFFIX} RENAME TO {i.name}"
+                )
+
+        for c in constraints:
+            if c.index:
+                # USING INDEX renames the index to the constraint name
+                type_ = "PRIMARY KEY" if c.type_ == "p" else "UNIQUE"
+                await con.execute(
+                    f"ALTER TABLE {c.table} ADD CONSTRAINT {c.name} "
+                    f"{type_} USING INDEX {c.index}{SUFFIX}"
+                )
+            elif c.type_ != "f":
+                await con.execute(
+                    f"ALTER TABLE {c.table} ADD CONSTRAINT {c.name} "
+                    f"{c.definition}"
+                )
+        for c in constraints:
+            if c.type_ == "f":
+                await con.execute(
+                    f"ALTER TABLE {c.table} ADD CONSTRAINT {c.name} "
+                    f"{c.definition} NOT VALID"
+                )
+                readded.append(c)
+
+    return readded
+
+
+async def convert_table(
+    con: asyncpg.Connection,
+    table: str,
+    columns: list[str],
+    chunk_pages: int,
+    delay: float,
+) -> None:
+    print(f"Converting {table} ({', '.join(columns)})...")
+    types = await _new_types(con, table, columns)
+    await _add_shadow_columns(con, table, types)
+    await _backfill(con, table, types, chunk_pages, delay)
+    indexes = await _build_indexes(con, table, columns)
+    not_null = await _set_not_null(con, table, columns)
+    fks = await _swap(con, table, columns, not_null, indexes)
+
+    for c in fks:
+        await con.execute(
+            f"ALTER TABLE {c.table} VALIDATE CONSTRAINT {c.name}"
+        )
+    print(f"Converted {table}.")
+
+
+async def main(tables: list[str], chunk_pages: int, delay: float) -> None:
+    con = await asyncpg.connect(
+        host=CONFIG.db_host,
+        database=CONFIG.db_name,
+        user=CONFIG.db_user,
+        password=CONFIG.db_password,
+    )
+    try:
+        numeric = await _numeric_columns(con)
+        if tables:
+            numeric = {t: c for t, c in numeric.items() if t in tables}
+        for table in await _children_first(con, list(numeric)):
+            await convert_table(con, table, numeric[table], chunk_pages, delay)
+    finally:
+        await con.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tables", nargs="*")
+    parser.add_argument("--chunk-pages", type=int, default=1_000)
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.tables, args.chunk_pages, args.delay))
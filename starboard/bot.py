@@ -30,7 +30,7 @@ from contextlib import redirect_stdout
 from datetime import datetime
 from io import StringIO
 from textwrap import indent
-from typing import Any
+from typing import Any, cast
 
 import aiohttp
 import crescent
@@ -50,7 +50,15 @@ from .cache import Cache
 from .config import CONFIG, Config
 from .cooldowns import cooldown
 from .database import Database
-from .tasks import expired_premium, patreon, post_stats
+from .profiling import LoopLagMonitor, format_stacks, profile
+from .tasks import (
+    expired_gifs,
+    expired_premium,
+    patreon,
+    post_stats,
+    role_jobs,
+)
+from .tracing import SPAN_STATS, stop_writing
 
 if os.name != "nt":
     import uvloop  # type: ignore
@@ -58,6 +66,19 @@ if os.name != "nt":
     uvloop.install()  # type: ignore
 
 
+# each interaction is handled in its own task, so only the command's own
+# queries are counted
+async def _count_queries(ctx: crescent.Context) -> crescent.HookResult | None:
+    name = " ".join(filter(None, (ctx.group, ctx.sub_group, ctx.command)))
+    cast(Bot, ctx.app).database.start_counting(name)
+    return None
+
+
+async def _check_queries(ctx: crescent.Context) -> crescent.HookResult | None:
+    cast(Bot, ctx.app).database.finish_counting()
+    return None
+
+
 class Bot(crescent.Bot):
     cluster: Cluster
 
@@ -76,7 +97,8 @@ class Bot(crescent.Bot):
             tracked_guilds=[CONFIG.main_guild] if CONFIG.main_guild else None,
             intents=intents,
             update_commands=False,
-            command_hooks=[cooldown(*CONFIG.global_cooldown)],
+            command_hooks=[_count_queries, cooldown(*CONFIG.global_cooldown)],
+            command_after_hooks=[_check_queries],
             auto_chunk_members=False,
         )
 
@@ -85,6 +107,7 @@ class Bot(crescent.Bot):
         self._aiohttp_session: aiohttp.ClientSession | None = None
         self._tasks: list[asyncio.Task] = []
         self.database = Database()
+        self.loop_lag = LoopLagMonitor()
 
         miru.load(self)
         self.plugins.load_folder("starboard.commands")
@@ -125,6 +148,10 @@ class Bot(crescent.Bot):
             database=CONFIG.db_name,
             user=CONFIG.db_user,
             password=CONFIG.db_password,
+            replicas=CONFIG.db_replicas,
+        )
+        await self.database.load_asc(
+            self.cluster.shard_count, self.cluster.shard_ids
         )
 
         # tasks
@@ -140,6 +167,11 @@ class Bot(crescent.Bot):
         self._tasks.append(
             asyncio.create_task(post_stats.loop_broadcast_stats(self))
         )
+        self._tasks.append(asyncio.create_task(role_jobs.loop_role_jobs(self)))
+        self._tasks.append(
+            asyncio.create_task(expired_gifs.loop_delete_expired_gifs(self))
+        )
+        self._tasks.append(asyncio.create_task(self.loop_lag.run()))
 
         await super().start(
             **kwargs, activity=hikari.Activity(name="Mention me for help")
@@ -154,6 +186,7 @@ class Bot(crescent.Bot):
         for t in self._tasks:
             t.cancel()
         await asyncio.gather(*self._tasks, return_exceptions=True)
+        stop_writing()
         await self.database.cleanup()
         print("Cleaned up!")
 
@@ -231,6 +264,48 @@ async def eval_cmd(pl: payload.COMMAND, bot: Bot) -> payload.DATA:
     return {"result": f"Return:\n{ret}\n\nOutput:\n{out}"}
 
 
+@BOT_CMD.add("query_stats")
+async def query_stats(pl: payload.COMMAND, bot: Bot) -> payload.DATA:
+    assert pl.data.data is not None
+    stats = bot.database.stats.to_dict()
+    if pl.data.data.get("reset"):
+        bot.database.stats.reset()
+    return {"stats": stats}
+
+
+@BOT_CMD.add("trace_stats")
+async def trace_stats(pl: payload.COMMAND, bot: Bot) -> payload.DATA:
+    assert pl.data.data is not None
+    stats = {name: h.to_dict() for name, h in SPAN_STATS.items()}
+    if pl.data.data.get("reset"):
+        SPAN_STATS.clear()
+    return {"spans": stats}
+
+
+@BOT_CMD.add("profile")
+async def profile_cmd(pl: payload.COMMAND, bot: Bot) -> payload.DATA:
+    assert pl.data.data is not None
+    stacks = await profile(pl.data.data["seconds"], pl.data.data["interval"])
+    return {
+        "cluster": bot.cluster.cluster_id,
+        "samples": sum(stacks.values()),
+        "stacks": format_stacks(stacks),
+    }
+
+
+@BOT_CMD.add("loop_lag")
+async def loop_lag(pl: payload.COMMAND, bot: Bot) -> payload.DATA:
+    assert pl.data.data is not None
+    data = {
+        "cluster": bot.cluster.cluster_id,
+        "lag": bot.loop_lag.lag.to_dict(),
+        "stalls": bot.loop_lag.stalls,
+    }
+    if pl.data.data.get("reset"):
+        bot.loop_lag.reset()
+    return data
+
+
 BOT_EVENT = events.EventGroup()
 
 
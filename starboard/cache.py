@@ -31,7 +31,7 @@ from hikari.impl.cache import CacheImpl
 from hikari.impl.config import CacheSettings
 
 from starboard.config import CONFIG
-from starboard.database import Starboard
+from starboard.database import Starboard, queries
 from starboard.database.models.override import Override
 from starboard.undefined import UNDEF
 
@@ -76,6 +76,9 @@ class Cache(CacheImpl):
         self.__vote_emojis: LFUCache[int, set[str]] = LFUCache(
             CONFIG.vote_emoji_cache_size
         )
+        self.__xproles: LFUCache[int, list[tuple[int, int]]] = LFUCache(
+            CONFIG.xprole_cache_size
+        )
 
         if TYPE_CHECKING:
             self._app = cast(Bot, self._app)
@@ -86,6 +89,7 @@ class Cache(CacheImpl):
         self.__members.clear()
         self.__webhooks.clear()
         self.__vote_emojis.clear()
+        self.__xproles.clear()
         self.clear_messages()
         self.clear_dm_channel_ids()
 
@@ -119,6 +123,27 @@ class Cache(CacheImpl):
     ) -> None:
         self.__vote_emojis.pop(int(guild), None)
 
+    # xproles
+    async def guild_xproles(
+        self, guild: hikari.SnowflakeishOr[hikari.PartialGuild]
+    ) -> list[tuple[int, int]]:
+        # (role_id, required) for each of the guild's XPRoles
+        gid = int(guild)
+        if (c := self.__xproles.get(gid)) is not None:
+            return c
+
+        xpr = [
+            (r.role_id, r.required)
+            for r in await queries.XPROLES.fetchmany(gid)
+        ]
+        self.__xproles[gid] = xpr
+        return xpr
+
+    def invalidate_xproles(
+        self, guild: hikari.SnowflakeishOr[hikari.PartialGuild]
+    ) -> None:
+        self.__xproles.pop(int(guild), None)
+
     # webhooks
     async def gof_webhook(
         self, webhook_id: hikari.SnowflakeishOr[hikari.PartialWebhook]
@@ -29,7 +29,7 @@ import hikari
 
 from starboard.bot import Bot
 from starboard.config import CONFIG
-from starboard.database import Guild
+from starboard.database import Guild, use_replica
 
 
 async def owner_only(ctx: crescent.Context) -> crescent.HookResult | None:
@@ -50,6 +50,13 @@ async def guild_only(ctx: crescent.Context) -> crescent.HookResult | None:
     return None
 
 
+async def read_only(ctx: crescent.Context) -> crescent.HookResult | None:
+    # each interaction is handled in its own task, so this only affects the
+    # rest of this command
+    use_replica()
+    return None
+
+
 async def premium_guild(ctx: crescent.Context) -> crescent.HookResult | None:
     await guild_only(ctx)
     assert ctx.guild_id is not None
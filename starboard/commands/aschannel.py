@@ -89,7 +89,7 @@ class CreateAutoStar:
                 "exists."
             ) from None
 
-        bot.database.asc.add(self.channel.id)
+        await bot.database.refresh_asc(ctx.guild_id)
         await ctx.respond(
             f"Created autostar channel '{name}' in <#{self.channel.id}>."
         )
@@ -123,6 +123,7 @@ class DeleteAutoStar:
             return
 
         await asc.delete()
+        await cast("Bot", ctx.app).database.refresh_asc(ctx.guild_id)
         await msg.edit(
             f"Deleted autostar channel '{asc.name}'.", components=[]
         )
@@ -218,6 +219,7 @@ class RenameAutoStar:
         name = clean_name(self.name)
         asc.name = name
         await asc.save()
+        await cast("Bot", ctx.app).database.refresh_asc(ctx.guild_id)
 
         await ctx.respond(
             f"Renamed autostar channel '{self.autostar}' to '{name}'."
@@ -272,6 +274,7 @@ class EditAutoStar:
             setattr(asc, k, v)
 
         await asc.save()
+        await cast("Bot", ctx.app).database.refresh_asc(ctx.guild_id)
         await ctx.respond(f"Updated settings for '{asc.name}'.")
 
 
@@ -302,4 +305,5 @@ class SetEmoji:
 
         asc.emojis = list(emojis)
         await asc.save()
+        await cast("Bot", ctx.app).database.refresh_asc(ctx.guild_id)
         await ctx.respond("Done.")
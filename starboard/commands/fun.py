@@ -23,26 +23,37 @@
 from __future__ import annotations
 
 import datetime
-from typing import TYPE_CHECKING, Any, Iterator, cast
+from typing import TYPE_CHECKING, Iterator, cast
 
 import crescent
 import hikari
-from apgorm import LazyList
-from apgorm import raw as r
 
 from starboard.config import CONFIG
 from starboard.cooldowns import cooldown
 from starboard.core.config import get_config
 from starboard.core.embed_message import embed_message
 from starboard.core.emojis import stored_to_emoji
-from starboard.core.leaderboard import get_leaderboard, refresh_xp
-from starboard.database import Guild, Member, Message, SBMessage, Starboard
+from starboard.core.leaderboard import (
+    custom_leaderboard,
+    get_leaderboard,
+    get_neighbors,
+    get_rank,
+    refresh_xp,
+)
+from starboard.database import (
+    Guild,
+    Member,
+    Message,
+    SBMessage,
+    Starboard,
+    queries,
+)
 from starboard.exceptions import StarboardError
 from starboard.utils import human_to_seconds, parse_date
 from starboard.views import InfiniteScroll, Paginator
 
 from ._autocomplete import starboard_autocomplete
-from ._checks import guild_only
+from ._checks import guild_only, read_only
 
 if TYPE_CHECKING:
     from starboard.bot import Bot
@@ -50,6 +61,8 @@ if TYPE_CHECKING:
 
 plugin = crescent.Plugin()
 
+MOSTSTARRED_PAGE_SIZE = 10
+
 
 @plugin.include
 @crescent.hook(guild_only)
@@ -90,6 +103,7 @@ def _build_leaderboard(
 
 @plugin.include
 @crescent.hook(guild_only)
+@crescent.hook(read_only)
 @crescent.command(
     name="leaderboard", description="Shows the server's leaderboard"
 )
@@ -113,6 +127,7 @@ async def leaderboard(ctx: crescent.Context) -> None:
 @plugin.include
 @crescent.hook(guild_only)
 @crescent.hook(cooldown(2, 10))
+@crescent.hook(read_only)
 @crescent.command(
     name="custom-leaderboard", description="Create a custom leaderboard"
 )
@@ -158,37 +173,28 @@ class CustomLeaderboard:
         bot = cast("Bot", ctx.app)
         assert ctx.guild_id
 
+        now = datetime.datetime.now(datetime.timezone.utc)
         newer_than = (
-            hikari.Snowflake.from_datetime(
-                (
-                    datetime.datetime.now(datetime.timezone.utc)
-                    - datetime.timedelta(
-                        seconds=human_to_seconds(self.newer_than)
-                    )
-                )
-            )
+            now - datetime.timedelta(seconds=human_to_seconds(self.newer_than))
             if self.newer_than
             else None
         )
         older_than = (
-            hikari.Snowflake.from_datetime(
-                (
-                    datetime.datetime.now(datetime.timezone.utc)
-                    - datetime.timedelta(
-                        seconds=human_to_seconds(self.older_than)
-                    )
-                )
-            )
+            now - datetime.timedelta(seconds=human_to_seconds(self.older_than))
             if self.older_than
             else None
         )
         created_after = (
-            hikari.Snowflake.from_datetime(parse_date(self.created_after))
+            parse_date(self.created_after).replace(
+                tzinfo=datetime.timezone.utc
+            )
             if self.created_after
             else None
         )
         created_before = (
-            hikari.Snowflake.from_datetime(parse_date(self.created_before))
+            parse_date(self.created_before).replace(
+                tzinfo=datetime.timezone.utc
+            )
             if self.created_before
             else None
         )
@@ -206,32 +212,11 @@ class CustomLeaderboard:
             ctx.guild_id, self.starboard_name
         )
 
-        query = """
-        SELECT
-            COUNT(*) FILTER (WHERE is_downvote=false)
-                - COUNT(*) FILTER (WHERE is_downvote=true)
-                AS stars,
-            target_author_id
-        FROM votes
-            WHERE starboard_id=$1
-            AND ($3::numeric IS NULL OR message_id > $3) -- newer than
-            AND ($4::numeric IS NULL OR message_id < $4) -- older than
-        GROUP BY target_author_id
-        ORDER BY
-            COUNT(*) FILTER (WHERE is_downvote=false)
-                - COUNT(*) FILTER (WHERE is_downvote=true)
-            DESC
-        LIMIT $2
-        """
-
-        result: LazyList[Any, dict[str, Any]] = await bot.database.fetchmany(
-            query,
-            [
-                starboard.id,
-                self.limit,
-                created_after or newer_than,
-                created_before or older_than,
-            ],
+        result = await custom_leaderboard(
+            starboard.id,
+            self.limit,
+            created_after or newer_than,
+            created_before or older_than,
         )
         embeds: list[hikari.Embed] = [
             bot.embed(
@@ -239,11 +224,8 @@ class CustomLeaderboard:
                 description=page,
             )
             for page in _build_leaderboard(
-                (
-                    entry["target_author_id"],
-                    entry["stars"] * starboard.xp_multiplier,
-                )
-                for entry in list(result)
+                (uid, points * starboard.xp_multiplier)
+                for uid, points in result
             )
         ]
         if not embeds:
@@ -254,6 +236,7 @@ class CustomLeaderboard:
 
 @plugin.include
 @crescent.hook(guild_only)
+@crescent.hook(read_only)
 @crescent.command(name="rank", description="Show a users rank")
 class Rank:
     user = crescent.option(
@@ -266,8 +249,7 @@ class Rank:
         user = self.user or ctx.user
         is_self = user.id == ctx.user.id
 
-        lb = await get_leaderboard(ctx.guild_id)
-        stats = lb.get(user.id)
+        stats = await get_rank(ctx.guild_id, user.id)
 
         xp: float
         rank: int | None
@@ -280,28 +262,28 @@ class Rank:
             xp = m.xp if m else 0
 
         if is_self:
-            await ctx.respond(
-                f"You have **{xp}** XP"
-                + (
-                    f", and you're **#{rank}** on the leaderboard."
-                    if rank
-                    else "."
-                )
+            content = f"You have **{xp}** XP" + (
+                f", and you're **#{rank}** on the leaderboard."
+                if rank
+                else "."
             )
         else:
-            await ctx.respond(
-                f"{user} has **{xp}** XP"
-                + (
-                    f", and is **#{rank}** on the leaderboard."
-                    if rank
-                    else "."
-                )
+            content = f"{user} has **{xp}** XP" + (
+                f", and is **#{rank}** on the leaderboard." if rank else "."
             )
 
+        if rank:
+            neighbors = await get_neighbors(ctx.guild_id, user.id, rank)
+            for uid, n in neighbors.items():
+                content += f"\n#{n.rank}: <@{uid}> with {n.xp} XP"
+
+        await ctx.respond(content, user_mentions=False)
+
 
 @plugin.include
 @crescent.hook(cooldown(*CONFIG.random_cooldown))
 @crescent.hook(guild_only)
+@crescent.hook(read_only)
 @crescent.command(
     name="random", description="A random message from the starboards"
 )
@@ -355,28 +337,14 @@ class Random:
         if s.private:
             raise StarboardError(f"{s.name} is a private starboard.")
 
-        q = SBMessage.fetch_query()
-        q.where(starboard_id=s.id)
-        q.where(SBMessage.sb_message_id.is_null.not_)
-
-        sbq = Message.fetch_query()
-        sbq.where(message_id=SBMessage.message_id)
-        sbq.where(trashed=False)
-        if not self.allow_nsfw:
-            sbq.where(is_nsfw=False)
-        if self.channel:
-            sbq.where(channel_id=self.channel.id)
-
-        q.where(sbq.exists())
-
-        if self.min_points:
-            q.where(SBMessage.last_known_point_count.gteq(self.min_points))
-        if self.max_points:
-            q.where(SBMessage.last_known_point_count.lteq(self.max_points))
-
-        q.order_by(r("random()"))
-
-        ret = await q.fetchone()
+        # 0 means no limit
+        ret = await queries.RANDOM_SBMESSAGE.fetchone(
+            s.id,
+            self.channel.id if self.channel else None,
+            self.min_points or None,
+            self.max_points or None,
+            self.allow_nsfw,
+        )
 
         if not ret:
             raise StarboardError("Nothing to show.")
@@ -415,6 +383,7 @@ class Random:
 @plugin.include
 @crescent.hook(cooldown(*CONFIG.moststarred_cooldown))
 @crescent.hook(guild_only)
+@crescent.hook(read_only)
 @crescent.command(
     name="moststarred", description="Shows the most starred messages"
 )
@@ -468,37 +437,34 @@ class MostStarred:
         if s.private:
             raise StarboardError(f"{s.name} is a private starboard.")
 
-        q = SBMessage.fetch_query()
-        q.where(starboard_id=s.id)
-        q.where(SBMessage.sb_message_id.is_null.not_)
-
-        sbq = Message.fetch_query()
-        sbq.where(message_id=SBMessage.message_id)
-        sbq.where(trashed=False)
-        if not self.allow_nsfw:
-            sbq.where(is_nsfw=False)
-        if self.channel:
-            sbq.where(channel_id=self.channel.id)
-
-        q.where(sbq.exists())
-
-        if self.min_points:
-            q.where(SBMessage.last_known_point_count.gteq(self.min_points))
-        if self.max_points:
-            q.where(SBMessage.last_known_point_count.lteq(self.max_points))
-
-        q.order_by(SBMessage.last_known_point_count, True)
-        cursor = q.cursor()
-
         guild = await Guild.fetch(guild_id=ctx.guild_id)
 
-        async def next_page() -> tuple[list[hikari.Embed], str] | None:
+        page: list[SBMessage] = []
+        last: SBMessage | None = None
+
+        async def next_item() -> SBMessage | None:
+            nonlocal last
+            if not page:
+                page.extend(
+                    await queries.MOSTSTARRED.fetchmany(
+                        s.id,
+                        self.channel.id if self.channel else None,
+                        self.min_points or None,
+                        self.max_points or None,
+                        self.allow_nsfw,
+                        last.last_known_point_count if last else None,
+                        last.message_id if last else None,
+                        MOSTSTARRED_PAGE_SIZE,
+                    )
+                )
+            if not page:
+                return None
+            last = page.pop(0)
+            return last
+
+        async def render(sql_msg: SBMessage) -> tuple[list[hikari.Embed], str]:
             assert s is not None
 
-            try:
-                sql_msg = await cursor.__anext__()
-            except StopAsyncIteration:
-                return None
             orig = await Message.fetch(message_id=sql_msg.message_id)
             obj = await bot.cache.gof_message(orig.channel_id, orig.message_id)
             assert obj is not None
@@ -525,7 +491,7 @@ class MostStarred:
 
             return [e, *es], raw
 
-        paginator = InfiniteScroll(ctx.user.id, next_page)
+        paginator = InfiniteScroll(ctx.user.id, next_item, render)
         first_page = await paginator.get_page(0)
         if not first_page:
             raise StarboardError("Nothing to show.")
@@ -537,7 +503,4 @@ class MostStarred:
             ensure_message=True,
         )
         await paginator.start(initial)
-        try:
-            await paginator.wait()
-        finally:
-            await cursor.aclose()
+        await paginator.wait()
@@ -8,7 +8,7 @@ import hikari
 
 from starboard.commands._converters import channel_list
 from starboard.config import CONFIG
-from starboard.core.config import StarboardConfig
+from starboard.core.config import StarboardConfig, invalidate_configs
 from starboard.database import Guild, Override, Starboard, validate_sb_changes
 from starboard.exceptions import OverrideNotFound, StarboardError
 
@@ -163,6 +163,7 @@ class CreateOverride:
         )
         try:
             await o.create()
+            invalidate_configs(o.guild_id)
         except asyncpg.UniqueViolationError:
             raise StarboardError(
                 f"There is already an override with the name '{name}'."
@@ -184,6 +185,7 @@ class DeleteOverride:
 
         ov = await Override.from_name(ctx.guild_id, self.name)
         await ov.delete()
+        invalidate_configs(ov.guild_id)
         await ctx.respond(f"Deleted setting override '{self.name}'.")
 
 
@@ -200,6 +202,7 @@ async def _update_override(
     ov.overrides = opt
 
     await ov.save()
+    invalidate_configs(ov.guild_id)
 
 
 edit = overrides.sub_group("edit", description="Edit a starboard")
@@ -296,6 +299,7 @@ class ResetOverrideSettings:
                 c += 1
         ov.overrides = ovd
         await ov.save()
+        invalidate_configs(ov.guild_id)
         await ctx.respond(f"Reset {c} settings for override '{ov.name}'.")
 
 
@@ -319,6 +323,7 @@ class RenameOverride:
         ov.name = name
         try:
             await ov.save()
+            invalidate_configs(ov.guild_id)
         except asyncpg.UniqueViolationError:
             raise StarboardError(
                 f"There is already an override with the name '{name}'."
@@ -346,6 +351,7 @@ class SetOverrideChannels:
             channel_list(self.channels, bot, categories=True).valid
         )
         await ov.save()
+        invalidate_configs(ov.guild_id)
         await ctx.respond(f"Updated the channels for override '{self.name}'.")
 
 
@@ -372,6 +378,7 @@ class RemoveOverrideChannels:
             .difference(chlist.invalid)
         )
         await ov.save()
+        invalidate_configs(ov.guild_id)
         await ctx.respond(f"Updated the channels for override '{self.name}'.")
 
 
@@ -397,6 +404,7 @@ class AddOverrideChannels:
             )
         )
         await ov.save()
+        invalidate_configs(ov.guild_id)
         await ctx.respond(f"Updated the channels for override '{self.name}'.")
 
 
@@ -439,6 +447,7 @@ class SetUpvoteEmojis:
         ov_data["downvote_emojis"] = list(downvote_emojis)
         ov.overrides = ov_data
         await ov.save()
+        invalidate_configs(ov.guild_id)
         bot.cache.invalidate_vote_emojis(ctx.guild_id)
         await ctx.respond("Done.")
 
@@ -477,5 +486,6 @@ class SetDownvoteEmojis:
         ov_data["upvote_emojis"] = list(upvote_emojis)
         ov.overrides = ov_data
         await ov.save()
+        invalidate_configs(ov.guild_id)
         bot.cache.invalidate_vote_emojis(ctx.guild_id)
         await ctx.respond("Done.")
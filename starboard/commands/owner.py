@@ -23,7 +23,7 @@
 from __future__ import annotations
 
 import asyncio
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING, Callable, cast
 
 import crescent
 import hikari
@@ -33,6 +33,8 @@ from starboard.config import CONFIG
 from starboard.constants import MESSAGE_LEN
 from starboard.database import User
 from starboard.exceptions import StarboardError
+from starboard.metrics import Histogram, QueryStats
+from starboard.profiling import format_stacks, profile
 from starboard.stats import post_stats
 from starboard.tasks.patreon import _get_all_patrons
 from starboard.utils import paginate, trunc_list, truncate
@@ -259,6 +261,300 @@ async def restart_bot(ctx: crescent.Context) -> None:
     await bot.cluster.ipc.send_event(bot.cluster.ipc.brain, "shutdown")
 
 
+def _fmt_histogram(h: Histogram) -> str:
+    return (
+        f"mean {h.mean:.2f}ms | p50 {h.percentile(50):.2f}ms | "
+        f"p99 {h.percentile(99):.2f}ms | max {h.max:.2f}ms"
+    )
+
+
+_QUERY_STATS_SORT: dict[str, Callable[[Histogram], float]] = {
+    "total": lambda h: h.total,
+    "mean": lambda h: h.mean,
+    "p99": lambda h: h.percentile(99),
+    "calls": lambda h: h.count,
+}
+
+
+@plugin.include
+@owner.child
+@crescent.command(
+    name="query-stats",
+    description="View query latency stats for all clusters",
+    guild=CONFIG.main_guild,
+)
+class QueryStatsCommand:
+    sort = crescent.option(
+        str,
+        "How to sort the queries",
+        choices=[(k, k) for k in _QUERY_STATS_SORT],
+        default="total",
+    )
+    reset = crescent.option(
+        bool, "Whether to reset the stats afterwards", default=False
+    )
+
+    async def callback(self, ctx: crescent.Context) -> None:
+        bot = cast("Bot", ctx.app)
+
+        ret = await bot.cluster.ipc.send_command(
+            bot.cluster.ipc.clusters, "query_stats", {"reset": self.reset}
+        )
+        stats = QueryStats()
+        responded = 0
+        for pl in ret.values():
+            if isinstance(pl, callbacks.NoResponse) or not isinstance(
+                pl.data, payload.ResponseOk
+            ):
+                continue
+            assert pl.data.data is not None
+            stats.merge(QueryStats.from_dict(pl.data.data["stats"]))
+            responded += 1
+
+        if not responded:
+            raise StarboardError("No responses were received.")
+
+        key = _QUERY_STATS_SORT[self.sort]
+        lines = [
+            f"{responded}/{len(ret)} clusters responded.\n"
+            f"Pool acquire ({stats.acquire.count}): "
+            f"{_fmt_histogram(stats.acquire)}\n"
+        ]
+        if stats.queries:
+            # the events and commands that make the most queries first
+            lines.append(
+                "Queries per event/command:\n"
+                + "\n".join(
+                    f"  {name} ({h.count}): mean {h.mean:.1f} | p99 "
+                    f"{h.percentile(99):.0f} | max {h.max:.0f}"
+                    for name, h in sorted(
+                        stats.queries.items(),
+                        key=lambda i: i[1].percentile(99),
+                        reverse=True,
+                    )
+                )
+                + "\n"
+            )
+        for shape, h in sorted(
+            stats.latency.items(), key=lambda i: key(i[1]), reverse=True
+        ):
+            lines.append(
+                f"{truncate(shape, 200)}\n"
+                f"  calls {h.count} | rows/call "
+                f"{stats.rows[shape] / h.count:.1f} | total "
+                f"{h.total / 1_000:.1f}s\n  {_fmt_histogram(h)}\n"
+            )
+
+        pages: list[str] = []
+        for line in lines:
+            if pages and len(pages[-1]) + len(line) < MESSAGE_LEN - 8:
+                pages[-1] += "\n" + line
+            else:
+                pages.append(line)
+        paginator = Paginator(
+            ctx.user.id, [f"```\n{page}\n```" for page in pages]
+        )
+        await paginator.send(ctx.interaction, ephemeral=True)
+
+
+@plugin.include
+@owner.child
+@crescent.command(
+    name="trace-stats",
+    description="View how long each part of the vote pipeline takes",
+    guild=CONFIG.main_guild,
+)
+class TraceStatsCommand:
+    sort = crescent.option(
+        str,
+        "How to sort the spans",
+        choices=[(k, k) for k in _QUERY_STATS_SORT],
+        default="total",
+    )
+    reset = crescent.option(
+        bool, "Whether to reset the stats afterwards", default=False
+    )
+
+    async def callback(self, ctx: crescent.Context) -> None:
+        bot = cast("Bot", ctx.app)
+
+        ret = await bot.cluster.ipc.send_command(
+            bot.cluster.ipc.clusters, "trace_stats", {"reset": self.reset}
+        )
+        spans: dict[str, Histogram] = {}
+        responded = 0
+        for pl in ret.values():
+            if isinstance(pl, callbacks.NoResponse) or not isinstance(
+                pl.data, payload.ResponseOk
+            ):
+                continue
+            assert pl.data.data is not None
+            for name, data in pl.data.data["spans"].items():
+                h = Histogram.from_dict(data)
+                if name in spans:
+                    spans[name].merge(h)
+                else:
+                    spans[name] = h
+            responded += 1
+
+        if not responded:
+            raise StarboardError("No responses were received.")
+
+        key = _QUERY_STATS_SORT[self.sort]
+        lines = [f"{responded}/{len(ret)} clusters responded.\n"]
+        for name, h in sorted(
+            spans.items(), key=lambda i: key(i[1]), reverse=True
+        ):
+            lines.append(
+                f"{name}\n  calls {h.count} | total "
+                f"{h.total / 1_000:.1f}s\n  {_fmt_histogram(h)}\n"
+            )
+
+        paginator = Paginator(
+            ctx.user.id,
+            [
+                f"```\n{page}\n```"
+                for page in paginate("\n".join(lines), MESSAGE_LEN - 8)
+            ],
+        )
+        await paginator.send(ctx.interaction, ephemeral=True)
+
+
+@plugin.include
+@owner.child
+@crescent.command(
+    name="profile",
+    description="Profile one or all clusters",
+    guild=CONFIG.main_guild,
+)
+class ProfileCommand:
+    seconds = crescent.option(
+        int,
+        "How many seconds to profile for",
+        min_value=1,
+        max_value=CONFIG.max_profile_seconds,
+    )
+    broadcast = crescent.option(
+        bool, "Whether to profile all clusters", default=False
+    )
+    interval = crescent.option(
+        float,
+        "How many milliseconds between samples",
+        min_value=1,
+        default=CONFIG.default_profile_interval,
+    )
+
+    async def callback(self, ctx: crescent.Context) -> None:
+        bot = cast("Bot", ctx.app)
+        await ctx.defer(True)
+
+        if not self.broadcast:
+            try:
+                stacks = await profile(self.seconds, self.interval / 1_000)
+            except RuntimeError as e:
+                raise StarboardError(str(e)) from None
+            await ctx.respond(
+                f"Took {sum(stacks.values())} samples.",
+                attachment=hikari.Bytes(format_stacks(stacks), "profile.txt"),
+                ephemeral=True,
+            )
+            return
+
+        ret = await bot.cluster.ipc.send_command(
+            bot.cluster.ipc.clusters,
+            "profile",
+            {"seconds": self.seconds, "interval": self.interval / 1_000},
+            timeout=self.seconds + 10,
+        )
+        # each cluster's stacks are under a frame for the cluster, so they
+        # can be told apart in the flamegraph
+        out: list[str] = []
+        failed: list[str] = []
+        samples = 0
+        for rid, pl in ret.items():
+            if isinstance(pl, callbacks.NoResponse) or not isinstance(
+                pl.data, payload.ResponseOk
+            ):
+                failed.append(_parse_response(rid, pl))
+                continue
+            assert pl.data.data is not None
+            data = pl.data.data
+            samples += data["samples"]
+            out.extend(
+                f"cluster-{data['cluster']};{line}"
+                for line in data["stacks"].splitlines()
+            )
+
+        if not out:
+            raise StarboardError("No responses were received.")
+        await ctx.respond(
+            f"Took {samples} samples on {len(ret) - len(failed)}/{len(ret)} "
+            "clusters.\n" + truncate("\n".join(failed), MESSAGE_LEN - 100),
+            attachment=hikari.Bytes("\n".join(out) + "\n", "profile.txt"),
+            ephemeral=True,
+        )
+
+
+@plugin.include
+@owner.child
+@crescent.command(
+    name="loop-lag",
+    description="View event loop lag for all clusters",
+    guild=CONFIG.main_guild,
+)
+class LoopLagCommand:
+    reset = crescent.option(
+        bool, "Whether to reset the stats afterwards", default=False
+    )
+
+    async def callback(self, ctx: crescent.Context) -> None:
+        bot = cast("Bot", ctx.app)
+
+        ret = await bot.cluster.ipc.send_command(
+            bot.cluster.ipc.clusters, "loop_lag", {"reset": self.reset}
+        )
+        clusters: list[tuple[int, int, Histogram]] = []
+        for pl in ret.values():
+            if isinstance(pl, callbacks.NoResponse) or not isinstance(
+                pl.data, payload.ResponseOk
+            ):
+                continue
+            assert pl.data.data is not None
+            data = pl.data.data
+            clusters.append(
+                (
+                    data["cluster"],
+                    data["stalls"],
+                    Histogram.from_dict(data["lag"]),
+                )
+            )
+
+        if not clusters:
+            raise StarboardError("No responses were received.")
+
+        total = Histogram()
+        for _, _, h in clusters:
+            total.merge(h)
+        lines = [
+            f"{len(clusters)}/{len(ret)} clusters responded.\n"
+            f"All ({sum(c[1] for c in clusters)} stalls): "
+            f"{_fmt_histogram(total)}\n"
+        ]
+        for cluster, stalls, h in sorted(clusters, key=lambda c: c[0]):
+            lines.append(
+                f"Cluster {cluster} ({stalls} stalls): {_fmt_histogram(h)}"
+            )
+
+        paginator = Paginator(
+            ctx.user.id,
+            [
+                f"```\n{page}\n```"
+                for page in paginate("\n".join(lines), MESSAGE_LEN - 8)
+            ],
+        )
+        await paginator.send(ctx.interaction, ephemeral=True)
+
+
 class Rollback(Exception):
     """Rollback the transaction."""
 
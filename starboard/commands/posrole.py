@@ -57,7 +57,7 @@ posrole = crescent.Group("posroles", "Manage PosRoles")
 async def refresh_posroles(ctx: crescent.Context) -> None:
     assert ctx.guild_id
     await ctx.defer(True)
-    ret = await update_posroles(cast("Bot", ctx.app), ctx.guild_id)
+    ret = await update_posroles(ctx.guild_id, full=True)
     if ret:
         msg = "Updated PosRoles."
     else:
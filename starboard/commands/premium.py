@@ -112,6 +112,7 @@ class MoveAscPremLock:
         asc_to.prem_locked = True
         await asc_from.save()
         await asc_to.save()
+        await cast("Bot", ctx.app).database.refresh_asc(ctx.guild_id)
 
         await ctx.respond(
             f"Lock moved from '{asc_from.name}' to '{asc_to.name}'."
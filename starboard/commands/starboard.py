@@ -30,7 +30,7 @@ import hikari
 
 from starboard.commands._converters import any_emoji_list
 from starboard.config import CONFIG
-from starboard.core.config import StarboardConfig
+from starboard.core.config import StarboardConfig, invalidate_configs
 from starboard.database import Guild, Override, Starboard, validate_sb_changes
 from starboard.exceptions import StarboardError
 from starboard.undefined import UNDEF
@@ -216,6 +216,7 @@ class DeleteStarboard:
             return
 
         await starboard.delete()
+        invalidate_configs(starboard.guild_id)
         bot.cache.invalidate_vote_emojis(ctx.guild_id)
         await msg.edit(f"Deleted starboard '{starboard.name}'.", components=[])
 
@@ -237,6 +238,7 @@ class RenameStarboard:
         starboard.name = name
         try:
             await starboard.save()
+            invalidate_configs(starboard.guild_id)
         except asyncpg.UniqueViolationError:
             raise StarboardError(
                 f"A starboard with the name '{name}' already exists."
@@ -253,6 +255,7 @@ async def _update_starboard(
     for k, v in params.items():
         setattr(s, k, v)
     await s.save()
+    invalidate_configs(s.guild_id)
     return s
 
 
@@ -381,6 +384,7 @@ class SetUpvoteEmojis:
         s.upvote_emojis = list(upvote_emojis)
         s.downvote_emojis = list(downvote_emojis)
         await s.save()
+        invalidate_configs(s.guild_id)
         bot.cache.invalidate_vote_emojis(ctx.guild_id)
         await ctx.respond("Done.")
 
@@ -417,5 +421,6 @@ class SetDownvoteEmojis:
         s.upvote_emojis = list(upvote_emojis)
         s.downvote_emojis = list(downvote_emojis)
         await s.save()
+        invalidate_configs(s.guild_id)
         bot.cache.invalidate_vote_emojis(ctx.guild_id)
         await ctx.respond("Done.")
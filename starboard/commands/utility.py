@@ -38,7 +38,7 @@ from starboard.utils import jump
 from starboard.views import Paginator
 
 from ._autocomplete import starboard_autocomplete
-from ._checks import has_guild_perms
+from ._checks import has_guild_perms, read_only
 
 if TYPE_CHECKING:
     from starboard.bot import Bot
@@ -116,6 +116,7 @@ async def toggle_freeze(
 # TRASHING
 @plugin.include
 @utils.child
+@crescent.hook(read_only)
 @crescent.command(name="trashcan", description="Lists all trashed messages")
 async def trashcan(ctx: crescent.Context) -> None:
     bot = cast("Bot", ctx.app)
@@ -58,7 +58,8 @@ async def refresh_xproles(ctx: crescent.Context, user: hikari.User) -> None:
         await ctx.respond("Refreshed roles.", ephemeral=True)
     else:
         await ctx.respond(
-            "You're using this command too much, please try again later.",
+            "This user's roles were refreshed recently, so they will be "
+            "refreshed again shortly.",
             ephemeral=True,
         )
 
@@ -109,6 +110,7 @@ class AddXPRole:
         await XPRole(
             role_id=self.role.id, guild_id=ctx.guild_id, required=self.xp
         ).create()
+        cast("Bot", ctx.app).cache.invalidate_xproles(ctx.guild_id)
         await ctx.respond(f"**{self.role}** is now an XPRole.")
 
 
@@ -134,6 +136,7 @@ class SetXPRoleXP:
 
         xpr.required = self.xp
         await xpr.save()
+        cast("Bot", ctx.app).cache.invalidate_xproles(ctx.guild_id)
         await ctx.respond(
             f"Set the required XP for **{self.xprole}** to {self.xp}."
         )
@@ -146,11 +149,13 @@ class DeleteXPRole:
     xprole = crescent.option(hikari.Role, "The XPRole to delete")
 
     async def callback(self, ctx: crescent.Context) -> None:
+        assert ctx.guild_id
         ret = (
             await XPRole.delete_query().where(role_id=self.xprole.id).execute()
         )
         if not ret:
             raise StarboardError(f"**{self.xprole}** is not an XPRole.")
+        cast("Bot", ctx.app).cache.invalidate_xproles(ctx.guild_id)
 
         await ctx.respond(f"Deleted XPRole **{self.xprole}**.")
 
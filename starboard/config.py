@@ -98,6 +98,13 @@ class Config:
     refresh_xp_period: int = 60
     credits_per_month: int = 3
     days_per_month: int = 32  # just be safe
+    asc_embed_timeout: float = 3
+    gif_ttl: int = 60 * 60 * 24 * 7
+    gif_failure_ttl: int = 60 * 10
+    gif_batch_delay: float = 0.05
+    gif_batch_size: int = 50
+    gif_timeout: float = 3
+    render_timeout: float = 2
 
     # command cooldowns
     random_cooldown: tuple[int, int] = (5, 10)
@@ -118,6 +125,11 @@ class Config:
     update_patreons_delay: int = 60 * 5
     post_stats_delay: int = 60 * 10
     broadcast_stats_delay: int = 60
+    posrole_reconcile_delay: int = 60 * 60
+    role_job_delay: int = 10
+    delete_expired_gifs_delay: int = 60 * 60
+    role_job_batch_size: int = 100
+    role_job_max_attempts: int = 5
 
     # cache
     dm_channel_cache_size: int = 1_000
@@ -127,6 +139,12 @@ class Config:
     channel_null_cache_size: int = 1_000
     webhook_cache_size: int = 1_000
     vote_emoji_cache_size: int = 1_000
+    xprole_cache_size: int = 1_000
+    starboard_config_cache_size: int = 10_000
+    asc_emoji_cache_size: int = 1_000
+    asc_load_chunk_size: int = 1_000
+    leaderboard_cache_size: int = 1_000
+    gif_cache_size: int = 5_000
 
     # botlists & stats
     api_keys: dict[str, str] = field(default_factory=dict)
@@ -160,6 +178,35 @@ class Config:
     db_name: str = "DATABASE NAME"
     db_user: str | None = None
     db_password: str | None = None
+    slow_query_threshold: float | None = 500
+    """Queries that take longer than this many milliseconds are logged."""
+    db_replicas: list[str] = field(default_factory=list)
+    """DSNs of read replicas. Read-only commands query these when they can."""
+    replica_max_lag: float = 30
+    """How many seconds a replica can be behind and still be queried."""
+    replica_check_delay: int = 5
+    query_budgets: dict[str, int] = field(default_factory=dict)
+    """The most queries each event or command (by name) should make, which
+    override the budgets declared in the code."""
+    query_budget_sample_rate: float = 0.01
+    """How often events and commands that go over their budget are logged."""
+    strict_query_budgets: bool = False
+    """Whether going over a budget raises an error. Used by tests."""
+
+    # profiling
+    loop_lag_interval: float = 0.5
+    """How often, in seconds, event loop lag is measured."""
+    loop_lag_threshold: float | None = 250
+    """Event loop stalls longer than this many milliseconds are logged, with
+    the stack of whatever is blocking the loop."""
+    max_profile_seconds: int = 300
+    default_profile_interval: float = 5
+    """Milliseconds between samples taken by /owner profile."""
+    trace_sample_rate: float = 0.001
+    """How often traces of the vote pipeline are written to trace_file."""
+    trace_file: str = "traces.jsonl"
+    trace_file_max_bytes: int = 50_000_000
+    trace_file_backups: int = 3
 
     # apis
     tenor_token: str | None = None
@@ -24,9 +24,10 @@ from __future__ import annotations
 
 import asyncio
 from contextlib import suppress
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING, Sequence, cast
 
 import hikari
+from cachetools import LRUCache
 from pycooldown import FixedCooldown
 
 from starboard.config import CONFIG
@@ -34,40 +35,90 @@ from starboard.core.notifications import notify
 from starboard.database import AutoStarChannel
 
 from .emojis import stored_to_emoji
-from .has_image import has_image
+from .has_image import embeds_have_image, has_image
 
 if TYPE_CHECKING:
     from starboard.bot import Bot
 
 
 COOLDOWN: FixedCooldown[int] = FixedCooldown(*CONFIG.guild_asc_cooldown)
+# parsed emojis, by the stored emojis of an autostar channel
+_EMOJIS: LRUCache[
+    tuple[str, ...], list[hikari.CustomEmoji | hikari.UnicodeEmoji]
+] = LRUCache(CONFIG.asc_emoji_cache_size)
+# embeds for messages that autostar channels are waiting on, by message_id
+_EMBED_WAITERS: dict[int, asyncio.Future[Sequence[hikari.Embed]]] = {}
 
 
 async def handle_message(event: hikari.GuildMessageCreateEvent) -> None:
     bot = cast("Bot", event.app)
 
-    if event.channel_id not in bot.database.asc or COOLDOWN.update_ratelimit(
-        event.guild_id
-    ):
+    asc = bot.database.asc.get(event.channel_id)
+    if not asc or COOLDOWN.update_ratelimit(event.guild_id):
         return
 
-    asc = (
-        await AutoStarChannel.fetch_query()
-        .where(channel_id=event.channel_id)
-        .fetchmany()
+    # Discord adds link embeds with a later update, so messages with links
+    # might still get an image
+    embeds: asyncio.Future[Sequence[hikari.Embed]] | None = None
+    if (
+        any(a.require_image for a in asc)
+        and "http" in (event.message.content or "")
+        and not has_image(event.message)
+    ):
+        embeds = _expect_embeds(event.message_id)
+
+    try:
+        for a in asc:
+            if a.prem_locked:
+                continue
+            await _handle_asc(bot, event.message, a, embeds)
+    finally:
+        _resolve_embeds(event.message_id, ())
+
+
+def handle_message_update(event: hikari.GuildMessageUpdateEvent) -> None:
+    if event.message.embeds:
+        _resolve_embeds(event.message_id, event.message.embeds)
+
+
+def _expect_embeds(message_id: int) -> asyncio.Future[Sequence[hikari.Embed]]:
+    loop = asyncio.get_running_loop()
+    fut: asyncio.Future[Sequence[hikari.Embed]] = loop.create_future()
+    _EMBED_WAITERS[message_id] = fut
+    timeout = loop.call_later(
+        CONFIG.asc_embed_timeout, _resolve_embeds, message_id, ()
     )
-    if not asc:
-        bot.database.asc.discard(event.channel_id)
-        return
+    fut.add_done_callback(lambda _: timeout.cancel())
+    return fut
+
+
+def _resolve_embeds(message_id: int, embeds: Sequence[hikari.Embed]) -> None:
+    fut = _EMBED_WAITERS.pop(message_id, None)
+    if fut is not None and not fut.done():
+        fut.set_result(embeds)
 
-    for a in asc:
-        if a.prem_locked:
-            continue
-        await _handle_asc(bot, event.message, a)
+
+def _parse_emojis(
+    bot: Bot, stored: Sequence[str]
+) -> list[hikari.CustomEmoji | hikari.UnicodeEmoji]:
+    key = tuple(stored)
+    if (c := _EMOJIS.get(key)) is not None:
+        return c
+
+    parsed = [stored_to_emoji(e, bot) for e in stored]
+    emojis = [e for e in dict.fromkeys(parsed) if e is not None]
+    # custom emojis can't be parsed until their guild is cached, so only
+    # keep the result if every emoji was found
+    if len(emojis) == len(set(stored)):
+        _EMOJIS[key] = emojis
+    return emojis
 
 
 async def _handle_asc(
-    bot: "Bot", message: hikari.Message, asc: AutoStarChannel
+    bot: "Bot",
+    message: hikari.Message,
+    asc: AutoStarChannel,
+    embeds: asyncio.Future[Sequence[hikari.Embed]] | None,
 ) -> None:
     if asc.prem_locked:
         return
@@ -81,15 +132,11 @@ async def _handle_asc(
     elif asc.max_chars is not None and ln > asc.max_chars:
         valid = False
     elif asc.require_image and not has_image(message):
-        await asyncio.sleep(0.5)
-        m = await bot.cache.gof_message(message.channel_id, message.id)
-        if m is None:
-            return
-        valid = has_image(m)
+        valid = embeds is not None and embeds_have_image(await embeds)
 
     if not valid:
         if asc.delete_invalid:
-            with suppress(hikari.ForbiddenError):
+            with suppress(hikari.ForbiddenError, hikari.NotFoundError):
                 await message.delete()
 
             await notify(
@@ -109,11 +156,7 @@ async def _handle_asc(
         return
 
     # react
-    _emojis = {stored_to_emoji(e, bot) for e in asc.emojis}
-    _emojis.discard(None)
-    emojis = cast("set[hikari.CustomEmoji | hikari.UnicodeEmoji]", _emojis)
-
-    for e in emojis:
+    for e in _parse_emojis(bot, asc.emojis):
         with suppress(
             hikari.ForbiddenError, hikari.NotFoundError, hikari.BadRequestError
         ):
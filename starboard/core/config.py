@@ -25,27 +25,98 @@ from __future__ import annotations
 from typing import TYPE_CHECKING, Any, Iterable
 
 import hikari
-from apgorm import join, raw, sql
+from cachetools import LRUCache
 
-from starboard.bot import Bot
-from starboard.database import Override
+from starboard.config import CONFIG
+from starboard.database import Override, queries
 
 if TYPE_CHECKING:
+    from starboard.bot import Bot
     from starboard.database import Starboard
 
 
+_OPTIONS = (
+    # General Style
+    "display_emoji",
+    "ping_author",
+    "use_server_profile",
+    "extra_embeds",
+    "use_webhook",
+    # Embed Style
+    "color",
+    "jump_to_message",
+    "attachments_list",
+    "replied_to",
+    # Requirements
+    "required",
+    "required_remove",
+    "upvote_emojis",
+    "downvote_emojis",
+    "self_vote",
+    "allow_bots",
+    "require_image",
+    "older_than",
+    "newer_than",
+    # Behavior
+    "enabled",
+    "autoreact_upvote",
+    "autoreact_downvote",
+    "remove_invalid",
+    "link_deletes",
+    "link_edits",
+    "private",
+    "xp_multiplier",
+    "cooldown_enabled",
+    "cooldown_count",
+    "cooldown_period",
+)
+
+
 class StarboardConfig:
+    # The settings of a starboard with overrides applied, resolved once when
+    # it's created so that reading a setting is just a slot lookup. Overrides
+    # should be ordered from most to least specific, and the first one that
+    # sets an option wins.
+
+    __slots__ = (
+        "starboard",
+        "overrides",
+        "upvote_emoji_set",
+        "downvote_emoji_set",
+        *_OPTIONS,
+    )
+
     def __init__(
         self, starboard: Starboard, overrides: Iterable[Override] | None
     ) -> None:
-        self.starboard = starboard
-        self.overrides = overrides or []
-
-    def __getattr__(self, key: str) -> Any:
-        for ov in self.overrides:
-            if key in ov.overrides:
-                return ov.overrides[key]
-        return getattr(self.starboard, key)
+        overrides = tuple(overrides or ())
+        resolved: dict[str, Any] = {}
+        for ov in reversed(overrides):
+            resolved.update(ov.overrides)
+
+        _set = super().__setattr__
+        _set("starboard", starboard)
+        _set("overrides", overrides)
+        for key in _OPTIONS:
+            _set(
+                key,
+                resolved[key] if key in resolved else getattr(starboard, key),
+            )
+
+        # lists can't be frozen, and the order of the emojis matters when
+        # adding reactions, so keep them as tuples with sets for lookups
+        _set("upvote_emojis", tuple(self.upvote_emojis))
+        _set("downvote_emojis", tuple(self.downvote_emojis))
+        _set("upvote_emoji_set", frozenset(self.upvote_emojis))
+        _set("downvote_emoji_set", frozenset(self.downvote_emojis))
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise AttributeError("StarboardConfig is immutable.")
+
+    starboard: Starboard
+    overrides: tuple[Override, ...]
+    upvote_emoji_set: frozenset[str]
+    downvote_emoji_set: frozenset[str]
 
     # General Style
     display_emoji: str | None
@@ -63,8 +134,8 @@ class StarboardConfig:
     # Requirements
     required: int
     required_remove: int
-    upvote_emojis: list[str]
-    downvote_emojis: list[str]
+    upvote_emojis: tuple[str, ...]
+    downvote_emojis: tuple[str, ...]
     self_vote: bool
     allow_bots: bool
     require_image: bool
@@ -85,11 +156,32 @@ class StarboardConfig:
     cooldown_period: int
 
 
+# resolved configs, by (starboard_id, channel chain). invalidate_configs must
+# be called whenever a guild's starboards or overrides are changed.
+_CONFIGS: LRUCache[tuple[int, tuple[int, ...]], StarboardConfig] = LRUCache(
+    CONFIG.starboard_config_cache_size
+)
+
+
 async def get_config(
     bot: Bot, sb: Starboard, channel_id: int
 ) -> StarboardConfig:
-    ov = await fetch_overrides(bot, sb.id, channel_id)
-    return StarboardConfig(sb, ov)
+    channels = await qualified_channel_ids(bot, channel_id)
+    key = (sb.id, tuple(channels))
+    if (c := _CONFIGS.get(key)) is not None:
+        return c
+
+    config = _CONFIGS[key] = StarboardConfig(
+        sb, await fetch_overrides(sb.id, channels)
+    )
+    return config
+
+
+def invalidate_configs(guild_id: int) -> None:
+    for key in [
+        k for k, c in _CONFIGS.items() if c.starboard.guild_id == guild_id
+    ]:
+        del _CONFIGS[key]
 
 
 async def qualified_channel_ids(bot: Bot, ch: int) -> list[int]:
@@ -106,18 +198,15 @@ async def qualified_channel_ids(bot: Bot, ch: int) -> list[int]:
         return channels
 
 
-async def fetch_overrides(bot: Bot, sb: int, ch: int) -> Iterable[Override]:
-    match_list = join(raw(","), *await qualified_channel_ids(bot, ch))
-
-    q = Override.fetch_query()
-    q.where(starboard_id=sb)
+async def fetch_overrides(sb: int, channels: list[int]) -> list[Override]:
+    overrides = await queries.CHANNEL_OVERRIDES.fetchmany(sb, channels)
 
-    q.where(
-        sql(
-            Override.channel_ids,
-            raw("&& array["),
-            match_list,
-            raw("]::numeric[]"),
+    # overrides for the channel itself take priority over ones for its
+    # parents
+    def specificity(ov: Override) -> tuple[int, int]:
+        return (
+            min(channels.index(c) for c in ov.channel_ids if c in channels),
+            ov.id,
         )
-    )
-    return await q.fetchmany()
+
+    return sorted(overrides, key=specificity)
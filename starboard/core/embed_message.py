@@ -22,10 +22,12 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import asyncio
+from typing import TYPE_CHECKING, Awaitable, TypeVar
 
 import hikari
 
+from starboard.config import CONFIG
 from starboard.constants import EMBED_DESC_LEN, EMBED_FIELD_LEN, ZWS
 from starboard.core.gifs import get_gif_url
 from starboard.utils import rendered_content, trunc_list, truncate
@@ -33,6 +35,8 @@ from starboard.utils import rendered_content, trunc_list, truncate
 if TYPE_CHECKING:
     from starboard.bot import Bot
 
+_T = TypeVar("_T")
+
 
 def get_raw_message_text(
     channel_id: int,
@@ -76,9 +80,33 @@ async def embed_message(
     jump_to_message: bool,
     replied_to: bool,
 ) -> tuple[str, hikari.Embed, list[hikari.Embed]]:
-    name, avatar = await _get_name_and_avatar(
-        bot, guild_id, message.author, server_profile
+    # member lookup, reply resolution and GIF resolution can all need
+    # requests, so they run together. Any that take longer than
+    # render_timeout fall back to what the message already has.
+    timeout = CONFIG.render_timeout
+    author: tuple[str, hikari.URL]
+    image_urls: list[str]
+    reply: tuple[str, str] | None
+    author, image_urls, reply = await asyncio.gather(
+        _within(
+            _get_name_and_avatar(
+                bot, guild_id, message.author, server_profile
+            ),
+            timeout,
+            _user_name_and_avatar(message.author),
+        ),
+        _extract_images(bot, message, gifs, timeout),
+        (
+            _within(
+                _extract_reply(bot, message, guild_id, server_profile),
+                timeout,
+                None,
+            )
+            if replied_to
+            else _none()
+        ),
     )
+    name, avatar = author
 
     embed = hikari.Embed(
         description=_extract_main_content(message),
@@ -94,12 +122,11 @@ async def embed_message(
             name=ZWS, value=f"[Go to Message]({message.make_link(guild_id)})"
         )
 
-    image_urls = await _extract_images(bot, message, gifs)
     if image_urls:
         embed.set_image(image_urls[0])
 
-    if replied_to:
-        await _extract_reply(bot, message, guild_id, server_profile, embed)
+    if reply is not None:
+        embed.add_field(name=f"Replying To {reply[0]}", value=reply[1])
 
     return (
         get_raw_message_text(
@@ -116,6 +143,10 @@ async def embed_message(
     )
 
 
+def _user_name_and_avatar(user: hikari.User) -> tuple[str, hikari.URL]:
+    return (user.username, user.avatar_url or user.default_avatar_url)
+
+
 async def _get_name_and_avatar(
     bot: Bot,
     guild: hikari.SnowflakeishOr[hikari.PartialGuild],
@@ -123,11 +154,11 @@ async def _get_name_and_avatar(
     server_profile: bool,
 ) -> tuple[str, hikari.URL]:
     if not server_profile:
-        return (user.username, user.avatar_url or user.default_avatar_url)
+        return _user_name_and_avatar(user)
 
     member = await bot.cache.gof_member(guild, user)
     if not member:
-        return (user.username, user.avatar_url or user.default_avatar_url)
+        return _user_name_and_avatar(user)
 
     return (
         member.nickname or member.username,
@@ -138,32 +169,34 @@ async def _get_name_and_avatar(
 
 
 async def _extract_reply(
-    bot: Bot,
-    message: hikari.Message,
-    guild_id: int,
-    server_profile: bool,
-    embed: hikari.Embed,
-) -> None:
-    if (ref := message.message_reference) is not None:
-        if ref.id is None:
-            return None
-
-        ref_obj = message.referenced_message
-        if ref_obj is None or not isinstance(ref_obj, hikari.Message):
-            ref_obj = await bot.cache.gof_message(ref.channel_id, ref.id)
-
-        if ref_obj is not None:
-            name, _ = await _get_name_and_avatar(
-                bot, guild_id, ref_obj.author, server_profile
-            )
-            content = _extract_main_content(ref_obj) or "*File only.*"
-        else:
-            name, content = (
-                "Deleted Message",
-                "*Original message was deleted.*",
-            )
+    bot: Bot, message: hikari.Message, guild_id: int, server_profile: bool
+) -> tuple[str, str] | None:
+    # returns the name of the author and the content of the replied message
+    if (ref := message.message_reference) is None or ref.id is None:
+        return None
+
+    ref_obj = message.referenced_message
+    if ref_obj is None or not isinstance(ref_obj, hikari.Message):
+        ref_obj = await bot.cache.gof_message(ref.channel_id, ref.id)
+
+    if ref_obj is None:
+        return ("Deleted Message", "*Original message was deleted.*")
+
+    name, _ = await _get_name_and_avatar(
+        bot, guild_id, ref_obj.author, server_profile
+    )
+    return (name, _extract_main_content(ref_obj) or "*File only.*")
+
 
-        embed.add_field(name=f"Replying To {name}", value=content)
+async def _within(aw: Awaitable[_T], timeout: float, default: _T) -> _T:
+    try:
+        return await asyncio.wait_for(aw, timeout)
+    except asyncio.TimeoutError:
+        return default
+
+
+async def _none() -> None:
+    return None
 
 
 def _is_rich(embed: hikari.Embed) -> bool:
@@ -229,7 +262,7 @@ def _extract_file_str(message: hikari.Message) -> str | None:
 
 
 async def _extract_images(
-    bot: Bot, message: hikari.Message, gifs: bool
+    bot: Bot, message: hikari.Message, gifs: bool, timeout: float
 ) -> list[str]:
     urls = [
         a.url
@@ -239,8 +272,17 @@ async def _extract_images(
         and not _is_spoiler(a.filename)
     ]
 
-    for embed in message.embeds:
-        gif_url = await _get_gifv(bot, embed) if gifs else None
+    if gifs:
+        gif_urls = await asyncio.gather(
+            *(
+                _within(_get_gifv(bot, e), timeout, None)
+                for e in message.embeds
+            )
+        )
+    else:
+        gif_urls = [None] * len(message.embeds)
+
+    for embed, gif_url in zip(message.embeds, gif_urls):
         if gif_url is not None:
             urls.append(gif_url)
         elif not _is_rich(embed):
@@ -22,18 +22,22 @@
 
 from __future__ import annotations
 
+import asyncio
 import re
-from typing import TYPE_CHECKING, Any, cast
+import traceback
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Tuple, cast
 
-from cachetools import LFUCache
+import aiohttp
+from cachetools import TTLCache
 
 from starboard.config import CONFIG
+from starboard.database import queries
 
 if TYPE_CHECKING:
     from starboard.bot import Bot
 
-TENOR_BASE = "https://api.tenor.com/v1/gifs?ids={0}&key={1}"
-GIPHY_BASE = "https://api.giphy.com/v1/gifs/{0}"
+TENOR_BASE = "https://api.tenor.com/v1/gifs"
+GIPHY_BASE = "https://api.giphy.com/v1/gifs"
 
 TENOR_PATTERN = re.compile(
     r"^http[s]?://tenor.com/view/[a-zA-Z-]+(?P<id>\d+)$"
@@ -41,7 +45,22 @@ TENOR_PATTERN = re.compile(
 GIPHY_PATTERN = re.compile(
     r"^http[s]?://giphy.com/gifs/[a-zA-Z-]+-(?P<id>[\w]+)$"
 )
-CACHE: LFUCache[str, str | None] = LFUCache(5_000)
+
+# Resolved URLs are stored in the gif_urls table so that they survive
+# restarts, and recently used ones are also kept in memory. GIFs that
+# couldn't be found are kept for a shorter time. Lookups for the same
+# service are collected for gif_batch_delay seconds and made together.
+
+_Key = Tuple[str, str]  # (service, gif_id)
+FOUND: TTLCache[_Key, str] = TTLCache(CONFIG.gif_cache_size, CONFIG.gif_ttl)
+MISSING: TTLCache[_Key, None] = TTLCache(
+    CONFIG.gif_cache_size, CONFIG.gif_failure_ttl
+)
+# lookups that are queued or running, so each GIF is only looked up once
+_PENDING: dict[_Key, asyncio.Future[str | None]] = {}
+_QUEUED: dict[str, dict[str, asyncio.Future[str | None]]] = {}
+_FLUSHES: dict[str, asyncio.TimerHandle] = {}
+_TASKS: set[asyncio.Task[None]] = set()
 
 
 def _get_gif_id(url: str) -> tuple[str, str] | None:
@@ -54,46 +73,116 @@ def _get_gif_id(url: str) -> tuple[str, str] | None:
 
 async def _get(bot: Bot, url: str, *args, **kwargs) -> dict[Any, Any]:
     async with (await bot.session()).get(
-        url, *args, timeout=3, **kwargs
+        url,
+        *args,
+        timeout=aiohttp.ClientTimeout(total=CONFIG.gif_timeout),
+        **kwargs,
     ) as resp:
         resp.raise_for_status()
         data = cast(dict, await resp.json())
     return data
 
 
-async def _get_tenor(bot: Bot, gifid: str) -> str | None:
-    if not CONFIG.tenor_token:
-        return None
-
-    if gifid in CACHE:
-        return CACHE[gifid]
-
+async def _fetch_tenor(bot: Bot, gifids: list[str]) -> dict[str, str]:
+    params = {"ids": ",".join(gifids), "key": cast(str, CONFIG.tenor_token)}
+    data = await _get(bot, TENOR_BASE, params=params)
+    return {
+        r["id"]: r["media"][0]["gif"]["url"]
+        for r in data["results"]
+        if r.get("media")
+    }
+
+
+async def _fetch_giphy(bot: Bot, gifids: list[str]) -> dict[str, str]:
+    params = {
+        "ids": ",".join(gifids),
+        "api_key": cast(str, CONFIG.giphy_token),
+    }
+    data = await _get(bot, GIPHY_BASE, params=params)
+    return {g["id"]: g["images"]["fixed_height"]["url"] for g in data["data"]}
+
+
+_FETCHERS: dict[str, Callable[[Bot, list[str]], Awaitable[dict[str, str]]]] = {
+    "tenor": _fetch_tenor,
+    "giphy": _fetch_giphy,
+}
+
+
+async def _lookup(
+    bot: Bot, service: str, gifids: list[str]
+) -> dict[str, str | None]:
+    urls: dict[str, str | None] = {
+        g.gif_id: g.url
+        for g in await queries.GIF_URLS.fetchmany(service, gifids)
+    }
+    if not (missing := [g for g in gifids if g not in urls]):
+        return urls
+
+    # if the request fails, the GIFs are only skipped for now
+    fetched = await _FETCHERS[service](bot, missing)
+    found = [fetched.get(g) for g in missing]
+    await queries.UPSERT_GIF_URLS.execute(
+        service,
+        missing,
+        found,
+        [
+            CONFIG.gif_failure_ttl if u is None else CONFIG.gif_ttl
+            for u in found
+        ],
+    )
+    urls.update(zip(missing, found))
+    return urls
+
+
+async def _flush(
+    bot: Bot, service: str, batch: dict[str, asyncio.Future[str | None]]
+) -> None:
     try:
-        data = await _get(bot, TENOR_BASE.format(gifid, CONFIG.tenor_token))
-        res = cast(str, data["results"][0]["media"][0]["gif"]["url"])
+        urls = await _lookup(bot, service, list(batch))
     except Exception:
-        res = None
-
-    CACHE[gifid] = res
-    return res
-
-
-async def _get_giphy(bot: Bot, gifid: str) -> str | None:
-    if not CONFIG.giphy_token:
+        traceback.print_exc()
+        urls = {}
+
+    for gifid, fut in batch.items():
+        key = (service, gifid)
+        if (url := urls.get(gifid)) is None:
+            MISSING[key] = None
+        else:
+            FOUND[key] = url
+        del _PENDING[key]
+        fut.set_result(url)
+
+
+def _start_flush(bot: Bot, service: str) -> None:
+    if (handle := _FLUSHES.pop(service, None)) is not None:
+        handle.cancel()
+    if batch := _QUEUED.pop(service, None):
+        task = asyncio.create_task(_flush(bot, service, batch))
+        _TASKS.add(task)
+        task.add_done_callback(_TASKS.discard)
+
+
+async def _resolve(bot: Bot, service: str, gifid: str) -> str | None:
+    key = (service, gifid)
+    if (url := FOUND.get(key)) is not None:
+        return url
+    if key in MISSING:
         return None
 
-    if gifid in CACHE:
-        return CACHE[gifid]
-
-    try:
-        params = {"api_key": CONFIG.giphy_token}
-        data = await _get(bot, GIPHY_BASE.format(gifid), params=params)
-        res = cast(str, data["data"]["images"]["fixed_height"]["url"])
-    except Exception:
-        res = None
+    if (fut := _PENDING.get(key)) is None:
+        loop = asyncio.get_running_loop()
+        fut = _PENDING[key] = loop.create_future()
+        queued = _QUEUED.setdefault(service, {})
+        queued[gifid] = fut
+        if len(queued) >= CONFIG.gif_batch_size:
+            _start_flush(bot, service)
+        elif service not in _FLUSHES:
+            _FLUSHES[service] = loop.call_later(
+                CONFIG.gif_batch_delay, _start_flush, bot, service
+            )
 
-    CACHE[gifid] = res
-    return res
+    # the lookup is shared, so it isn't cancelled with the caller
+    return await asyncio.shield(fut)
 
 
 async def get_gif_url(bot: Bot, url: str) -> str | None:
@@ -113,9 +202,9 @@ async def get_gif_url(bot: Bot, url: str) -> str | None:
 
     gifid, service = result
 
-    if service == "tenor":
-        return await _get_tenor(bot, gifid)
-    elif service == "giphy":
-        return await _get_giphy(bot, gifid)
+    if service == "tenor" and not CONFIG.tenor_token:
+        return None
+    if service == "giphy" and not CONFIG.giphy_token:
+        return None
 
-    return None
+    return await _resolve(bot, service, gifid)
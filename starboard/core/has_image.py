@@ -22,6 +22,8 @@
 
 from __future__ import annotations
 
+from typing import Sequence
+
 import hikari
 
 
@@ -35,9 +37,13 @@ def has_image(message: hikari.Message) -> bool:
         ) or attachment.media_type.startswith("video"):
             return True
 
+    return embeds_have_image(message.embeds)
+
+
+def embeds_have_image(embeds: Sequence[hikari.Embed]) -> bool:
     return any(
         embed.image is not None
         or embed.thumbnail is not None
         or embed.video is not None
-        for embed in message.embeds
+        for embed in embeds
     )
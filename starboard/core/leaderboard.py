@@ -22,62 +22,279 @@
 
 from __future__ import annotations
 
+import asyncio
+import sys
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional, Set, Tuple
 
+from cachetools import LRUCache
 from pycooldown import FixedCooldown
 
 from starboard.config import CONFIG
-from starboard.database import Member, Starboard, Vote
+from starboard.database import on_primary, queries
+from starboard.tracing import traced
 
 REFRESH_XP_COOLDOWN: FixedCooldown[tuple[int, int]] = FixedCooldown(
     CONFIG.refresh_xp_period, CONFIG.refresh_xp_cap
 )
 
 
+# the position of members that aren't on the leaderboard
+_UNRANKED = sys.maxsize
+
+
+class GuildLeaderboard:
+    # Every member of a guild with more than 0 XP, sorted by XP (highest
+    # first, ties broken by user id). Ranks are found by binary search, and
+    # updates move a single entry.
+    #
+    # Positions (0-indexed ranks) can be watched, in which case the members
+    # that cross one of them are collected until drain_crossed() is called.
+    # A member crosses a position when they move from before it to after it
+    # (or the other way around), which happens to the member whose XP changed
+    # and to the members they pass.
+
+    __slots__ = ("_keys", "_xp", "_watched", "_crossed")
+
+    def __init__(self, members: Iterable[tuple[int, float]] = ()) -> None:
+        self._xp: dict[int, float] = {}
+        for user_id, xp in members:
+            if xp > 0:
+                self._xp[user_id] = xp
+        self._keys: list[tuple[float, int]] = sorted(
+            (-xp, uid) for uid, xp in self._xp.items()
+        )
+        self._watched: list[int] = []
+        self._crossed: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def set(self, user_id: int, xp: float) -> None:
+        old_pos = new_pos = _UNRANKED
+
+        old = self._xp.pop(user_id, None)
+        if old is not None:
+            old_pos = bisect_left(self._keys, (-old, user_id))
+            del self._keys[old_pos]
+        if xp > 0:
+            self._xp[user_id] = xp
+            new_pos = bisect_left(self._keys, (-xp, user_id))
+            self._keys.insert(new_pos, (-xp, user_id))
+
+        if self._watched and old_pos != new_pos:
+            self._record_crossings(user_id, old_pos, new_pos)
+
+    def watch(self, positions: Iterable[int]) -> None:
+        self._watched = sorted(set(positions))
+        self._crossed.clear()
+
+    def drain_crossed(self) -> Set[int]:
+        crossed, self._crossed = self._crossed, set()
+        return crossed
+
+    def _record_crossings(
+        self, user_id: int, old_pos: int, new_pos: int
+    ) -> None:
+        if old_pos > new_pos:
+            # everyone from new_pos to old_pos moved down one
+            lo = bisect_right(self._watched, new_pos)
+            hi = bisect_right(self._watched, old_pos)
+            passed = [p for p in self._watched[lo:hi] if p < len(self._keys)]
+        else:
+            # everyone from old_pos to new_pos moved up one
+            lo = bisect_right(self._watched, old_pos)
+            hi = bisect_right(self._watched, new_pos)
+            passed = [
+                p - 1 for p in self._watched[lo:hi] if p - 1 < len(self._keys)
+            ]
+
+        if lo == hi:
+            return
+        self._crossed.add(user_id)
+        self._crossed.update(self._keys[p][1] for p in passed)
+
+    def get(self, user_id: int) -> MemberStats | None:
+        xp = self._xp.get(user_id)
+        if xp is None:
+            return None
+        rank = bisect_left(self._keys, (-xp, user_id)) + 1
+        return MemberStats(round(xp, 2), rank)
+
+    def range(self, start: int, stop: int) -> dict[int, MemberStats]:
+        # 0-indexed, like a slice
+        start = max(start, 0)
+        return {
+            uid: MemberStats(round(-xp, 2), start + x + 1)
+            for x, (xp, uid) in enumerate(self._keys[start:stop])
+        }
+
+    def top(self, limit: int) -> dict[int, MemberStats]:
+        return self.range(0, limit)
+
+    def neighbors(self, user_id: int, count: int) -> dict[int, MemberStats]:
+        # the members ranked just above and below a member
+        if (stats := self.get(user_id)) is None:
+            return {}
+        idx = stats.rank - 1
+        ret = self.range(idx - count, idx)
+        ret.update(self.range(idx + 1, idx + 1 + count))
+        return ret
+
+
+# A guild's leaderboard is only updated by the cluster its shard is on, and
+# the commands that read it run there too.
+_LEADERBOARDS: LRUCache[int, GuildLeaderboard] = LRUCache(
+    CONFIG.leaderboard_cache_size
+)
+_LOADING: dict[int, asyncio.Task[GuildLeaderboard]] = {}
+# XP changes that happened while a leaderboard was being loaded
+_PENDING: dict[int, dict[int, float]] = {}
+
+
+async def guild_leaderboard(guild_id: int) -> GuildLeaderboard:
+    if (lb := _LEADERBOARDS.get(guild_id)) is not None:
+        return lb
+
+    if (task := _LOADING.get(guild_id)) is None:
+        task = asyncio.create_task(_load(guild_id))
+        _LOADING[guild_id] = task
+        _PENDING[guild_id] = {}
+        task.add_done_callback(lambda _: _done_loading(guild_id))
+    return await asyncio.shield(task)
+
+
+async def _load(guild_id: int) -> GuildLeaderboard:
+    # a replica might not have the latest XP changes, and they won't be
+    # applied again once this is cached
+    with on_primary():
+        rows = await queries.LEADERBOARD_XP.fetchraw(guild_id)
+
+    lb = GuildLeaderboard((r["user_id"], r["xp"]) for r in rows)
+    for user_id, xp in _PENDING[guild_id].items():
+        lb.set(user_id, xp)
+    _LEADERBOARDS[guild_id] = lb
+    return lb
+
+
+def _done_loading(guild_id: int) -> None:
+    del _LOADING[guild_id]
+    del _PENDING[guild_id]
+
+
+def update_xp(guild_id: int, user_id: int, xp: float) -> None:
+    if (lb := _LEADERBOARDS.get(guild_id)) is not None:
+        lb.set(user_id, xp)
+    elif (pending := _PENDING.get(guild_id)) is not None:
+        pending[user_id] = xp
+
+
+@traced("refresh_xp")
 async def refresh_xp(guild_id: int, user_id: int) -> bool | None:
     if REFRESH_XP_COOLDOWN.update_ratelimit((guild_id, user_id)) is not None:
         return False
 
-    member = await Member.exists(guild_id=guild_id, user_id=user_id)
+    member = await queries.MEMBER.fetchone(guild_id, user_id)
     if not member:
         return None
 
-    starboards = (
-        await Starboard.fetch_query().where(guild_id=guild_id).fetchmany()
-    )
-    member.xp = sum(
-        [
-            (await _count_votes(sb, user_id)) * sb.xp_multiplier
-            for sb in starboards
-        ]
-    )
+    member.xp = await queries.AUTHOR_XP.fetchval(guild_id, user_id)
     await member.save()
+    update_xp(guild_id, user_id, member.xp)
     return True
 
 
-async def _count_votes(starboard: Starboard, user_id: int) -> int:
-    upvotes = await Vote.count(
-        starboard_id=starboard.id, target_author_id=user_id, is_downvote=False
-    )
-    downvotes = await Vote.count(
-        starboard_id=starboard.id, target_author_id=user_id, is_downvote=True
-    )
-    return upvotes - downvotes
-
-
 async def get_leaderboard(
     guild_id: int, limit: int = CONFIG.leaderboard_length
 ) -> dict[int, MemberStats]:
-    q = Member.fetch_query()
-    q.where(guild_id=guild_id)
-    q.where(Member.xp.gt(0))
-    q.order_by(Member.xp, reverse=True)
-    ret = await q.fetchmany(limit=limit)
-
-    return {
-        m.user_id: MemberStats(round(m.xp, 2), x + 1)
-        for x, m in enumerate(ret)
-    }
+    return (await guild_leaderboard(guild_id)).top(limit)
+
+
+# A cached leaderboard can answer these straight away. Otherwise, they're
+# looked up with the (guild_id, xp, user_id) index, rather than loading a
+# whole guild's leaderboard for a single member.
+
+
+async def get_rank(guild_id: int, user_id: int) -> MemberStats | None:
+    if (lb := _LEADERBOARDS.get(guild_id)) is not None:
+        return lb.get(user_id)
+
+    rows = await queries.MEMBER_RANK.fetchraw(guild_id, user_id)
+    if not rows:
+        return None
+    return MemberStats(round(rows[0]["xp"], 2), rows[0]["rank"])
+
+
+async def get_neighbors(
+    guild_id: int, user_id: int, rank: int, count: int = 1
+) -> dict[int, MemberStats]:
+    if (lb := _LEADERBOARDS.get(guild_id)) is not None:
+        return lb.neighbors(user_id, count)
+
+    above: dict[int, MemberStats] = {}
+    below: dict[int, MemberStats] = {}
+    for r in await queries.MEMBER_NEIGHBORS.fetchraw(guild_id, user_id, count):
+        if r["below"]:
+            below[r["user_id"]] = MemberStats(
+                round(r["xp"], 2), rank + len(below) + 1
+            )
+        else:
+            above[r["user_id"]] = MemberStats(
+                round(r["xp"], 2), rank - len(above) - 1
+            )
+    return {**dict(reversed(above.items())), **below}
+
+
+_Range = Tuple[Optional[datetime], Optional[datetime]]
+
+
+def split_window(
+    after: datetime | None, before: datetime | None
+) -> tuple[date | None, date | None, bool, list[_Range]]:
+    # Splits a window of time into the whole (UTC) days in it, which can use
+    # the daily rollups, and up to two partial days at the edges, which have
+    # to count votes individually. None means no limit.
+    def floor(dt: datetime) -> datetime:
+        dt = dt.astimezone(timezone.utc)
+        return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    first = None
+    if after is not None:
+        first = floor(after)
+        if first != after:
+            first += timedelta(days=1)
+    last = None if before is None else floor(before)
+
+    if first is not None and last is not None and first >= last:
+        return None, None, False, [(after, before)]
+
+    ranges: list[_Range] = []
+    if after is not None and first is not None and after < first:
+        ranges.append((after, first))
+    if before is not None and last is not None and last < before:
+        ranges.append((last, before))
+    return (
+        first.date() if first else None,
+        last.date() if last else None,
+        True,
+        ranges,
+    )
+
+
+async def custom_leaderboard(
+    starboard_id: int,
+    limit: int,
+    after: datetime | None = None,
+    before: datetime | None = None,
+) -> list[tuple[int, int]]:
+    first, last, use_rollups, ranges = split_window(after, before)
+    ranges += [(None, None)] * (2 - len(ranges))
+    rows = await queries.CUSTOM_LEADERBOARD.fetchraw(
+        starboard_id, limit, first, last, use_rollups, *ranges[0], *ranges[1]
+    )
+    return [(r["target_author_id"], r["points"]) for r in rows]
 
 
 @dataclass
@@ -26,7 +26,8 @@ from typing import TYPE_CHECKING
 
 import hikari
 
-from starboard.database import Message, SBMessage
+from starboard.database import Message, queries
+from starboard.tracing import traced
 
 from .embed_message import embed_message, get_raw_message_text
 from .emojis import stored_to_emoji
@@ -37,15 +38,13 @@ if TYPE_CHECKING:
 
 
 async def get_orig_message(message_id: int) -> Message | None:
-    if sbm := await SBMessage.exists(sb_message_id=message_id):
-        return await Message.fetch(message_id=sbm.message_id)
+    if sbm := await queries.SBMESSAGE_BY_SB_MESSAGE_ID.fetchone(message_id):
+        return await queries.MESSAGE.fetchone(sbm.message_id)
 
-    if m := await Message.exists(message_id=message_id):
-        return m
-
-    return None
+    return await queries.MESSAGE.fetchone(message_id)
 
 
+@traced("render")
 async def get_sbmsg_content(
     bot: Bot,
     config: StarboardConfig,
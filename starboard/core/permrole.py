@@ -27,7 +27,8 @@ from typing import Iterable
 
 import hikari
 
-from starboard.database import PermRole, PermRoleStarboard
+from starboard.database import PermRole, PermRoleStarboard, queries
+from starboard.tracing import traced
 
 
 @dataclass
@@ -48,17 +49,16 @@ class PermRoleConfig:
 
 
 async def get_permroles(guild: hikari.Guild) -> list[PermRoleConfig]:
-    configs: list[PermRoleConfig] = []
-    pr = await PermRole.fetch_query().where(guild_id=guild.id).fetchmany()
-    pr_ids: set[int] = set()
-    for r in pr:
-        pr_ids.add(r.role_id)
-        sr = (
-            await PermRoleStarboard.fetch_query()
-            .where(permrole_id=r.role_id)
-            .fetchmany()
-        )
-        configs.append(PermRoleConfig(r, sr))
+    pr = await queries.PERMROLES.fetchmany(guild.id)
+    if not pr:
+        return []
+
+    pr_ids: set[int] = {r.role_id for r in pr}
+    sr: dict[int, list[PermRoleStarboard]] = {}
+    for s in await queries.PERMROLE_STARBOARDS.fetchmany(list(pr_ids)):
+        sr.setdefault(s.permrole_id, []).append(s)
+
+    configs = [PermRoleConfig(r, sr.get(r.role_id, [])) for r in pr]
 
     role_indices: dict[int, int] = {
         r.id: r.position for r in guild.get_roles().values() if r.id in pr_ids
@@ -67,6 +67,7 @@ async def get_permroles(guild: hikari.Guild) -> list[PermRoleConfig]:
     return configs
 
 
+@traced("get_permissions")
 async def get_permissions(
     guild: hikari.Guild,
     role_ids: set[int] | None = None,
@@ -22,103 +22,171 @@
 
 from __future__ import annotations
 
-from contextlib import suppress
-from typing import TYPE_CHECKING
+import time
+from itertools import accumulate
+from typing import Dict, Set, Tuple
 
-import hikari
-from apgorm import sql
+from cachetools import LRUCache
 from pycooldown import FixedCooldown
 
 from starboard.config import CONFIG
-from starboard.database import PosRole, PosRoleMember
-
-from .leaderboard import get_leaderboard
-
-if TYPE_CHECKING:
-    from starboard.bot import Bot
+from starboard.database import queries
 
+from .leaderboard import GuildLeaderboard, guild_leaderboard
+from .role_jobs import queue_roles
 
 LOCK: set[int] = set()
 COOLDOWN: FixedCooldown[int] = FixedCooldown(*CONFIG.guild_pr_cooldown)
 
 
-async def update_posroles(bot: Bot, guild_id: int) -> bool:
-    if guild_id in LOCK or COOLDOWN.update_ratelimit(guild_id):
+class _GuildPosRoles:
+    # What the posroles of a guild look like after the last update. Between
+    # full reconciliations, only the members that crossed a posrole boundary
+    # on the guild's leaderboard are checked.
+
+    __slots__ = ("posroles", "boundaries", "leaderboard", "members", "synced")
+
+    def __init__(
+        self,
+        posroles: list[tuple[int, int]],
+        leaderboard: GuildLeaderboard,
+        members: dict[int, int],
+    ) -> None:
+        # (role_id, max_members), in order
+        self.posroles = posroles
+        self.boundaries = list(accumulate(m for _, m in posroles))
+        self.leaderboard = leaderboard
+        # user_id: role_id
+        self.members = members
+        self.synced = time.monotonic()
+
+        leaderboard.watch(self.boundaries)
+
+    def wanted(self, user_id: int) -> int | None:
+        stats = self.leaderboard.get(user_id)
+        if stats is None:
+            return None
+        for (role_id, _), boundary in zip(self.posroles, self.boundaries):
+            if stats.rank <= boundary:
+                return role_id
+        return None
+
+
+# these hold on to the guild's leaderboard, so they're limited the same way
+_STATE: LRUCache[int, _GuildPosRoles] = LRUCache(CONFIG.leaderboard_cache_size)
+
+_Updates = Tuple[Dict[int, Set[int]], Dict[int, Set[int]]]
+
+
+async def update_posroles(guild_id: int, *, full: bool = False) -> bool:
+    if guild_id in LOCK:
         return False
 
     LOCK.add(guild_id)
     try:
-        await _update_posroles(bot, guild_id)
+        return await _update_posroles(guild_id, full)
     finally:
         LOCK.remove(guild_id)
 
-    return True
 
+async def _update_posroles(guild_id: int, full: bool) -> bool:
+    posroles = [
+        (p.role_id, p.max_members)
+        for p in await queries.POSROLES.fetchmany(guild_id)
+    ]
+    if not posroles:
+        _STATE.pop(guild_id, None)
+        return True
+
+    leaderboard = await guild_leaderboard(guild_id)
+    state = _STATE.get(guild_id)
+    if (
+        full
+        or state is None
+        or state.posroles != posroles
+        # a new leaderboard (after being evicted) isn't being watched
+        or state.leaderboard is not leaderboard
+        or time.monotonic() - state.synced > CONFIG.posrole_reconcile_delay
+    ):
+        if COOLDOWN.update_ratelimit(guild_id):
+            return False
+        state, updates = await _reconcile(guild_id, posroles, leaderboard)
+        _STATE[guild_id] = state
+    else:
+        updates = _get_updates(state)
+
+    await _apply(guild_id, state, *updates)
+    return True
 
-async def _update_posroles(bot: Bot, guild_id: int) -> None:
-    ret = await _get_updates(guild_id)
-    if not ret:
-        return
-    add, remove = ret
 
+async def _apply(
+    guild_id: int,
+    state: _GuildPosRoles,
+    add: dict[int, set[int]],
+    remove: dict[int, set[int]],
+) -> None:
+    changes: list[tuple[int, int, bool]] = []
+    for roleid, users in remove.items():
+        for uid in users:
+            changes.append((uid, roleid, False))
+            if state.members.get(uid) == roleid:
+                del state.members[uid]
     for roleid, users in add.items():
         for uid in users:
-            with suppress(hikari.NotFoundError, hikari.ForbiddenError):
-                await bot.rest.add_role_to_member(
-                    guild_id, uid, roleid, reason="Position-based Role Awards"
-                )
-            await PosRoleMember(user_id=uid, role_id=roleid).create()
+            changes.append((uid, roleid, True))
+            state.members[uid] = roleid
 
-    for roleid, users in remove.items():
-        await PosRoleMember.delete_query().where(role_id=roleid).where(
-            PosRoleMember.user_id.eq(sql(users).any)
-        ).execute()
-        for uid in users:
-            with suppress(hikari.NotFoundError, hikari.ForbiddenError):
-                await bot.rest.remove_role_from_member(
-                    guild_id, uid, roleid, reason="Position-based Role Awards"
-                )
+    removed = [(r, u) for u, r, a in changes if not a]
+    added = [(r, u) for u, r, a in changes if a]
+    if removed:
+        await queries.POSROLE_MEMBERS_REMOVE.execute(*zip(*removed))
+    if added:
+        await queries.POSROLE_MEMBERS_ADD.execute(*zip(*added))
+    await queue_roles(guild_id, changes, "Position-based Role Awards")
 
 
-async def _get_updates(
-    guild_id: int,
-) -> tuple[dict[int, set[int]], dict[int, set[int]]] | None:
-    posroles = (
-        await PosRole.fetch_query()
-        .where(guild_id=guild_id)
-        .order_by(PosRole.max_members)
-        .fetchmany()
-    )
-    if not posroles:
-        return None
+def _get_updates(state: _GuildPosRoles) -> _Updates:
+    adds: dict[int, set[int]] = {}
+    removals: dict[int, set[int]] = {}
+    for uid in state.leaderboard.drain_crossed():
+        current = state.members.get(uid)
+        wanted = state.wanted(uid)
+        if current == wanted:
+            continue
+        if current is not None:
+            removals.setdefault(current, set()).add(uid)
+        if wanted is not None:
+            adds.setdefault(wanted, set()).add(uid)
+    return adds, removals
+
 
-    # get the description of what the posrole setup should look like
-    leaderboard = list(
-        (
-            await get_leaderboard(
-                guild_id, sum(r.max_members for r in posroles)
-            )
-        ).keys()
-    )
+async def _reconcile(
+    guild_id: int,
+    posroles: list[tuple[int, int]],
+    leaderboard: GuildLeaderboard,
+) -> tuple[_GuildPosRoles, _Updates]:
+    # get the description of what the posrole setup actually looks like
+    current: dict[int, set[int]] = {role_id: set() for role_id, _ in posroles}
+    members: dict[int, int] = {}
+    for m in await queries.POSROLE_MEMBERS.fetchmany(list(current)):
+        current[m.role_id].add(m.user_id)
+        members[m.user_id] = m.role_id
+
+    # get the description of what the posrole setup should look like. this
+    # is done after the fetch, with no awaits until the leaderboard is
+    # watched (by _GuildPosRoles), so that no change in XP is missed
+    ranked = list(leaderboard.top(sum(m for _, m in posroles)))
     wanted: dict[int, set[int]] = {}
-    for p in posroles:
-        uids = leaderboard[: p.max_members]
-        leaderboard = leaderboard[p.max_members :]
-        wanted[p.role_id] = set(uids)
+    for role_id, max_members in posroles:
+        wanted[role_id] = set(ranked[:max_members])
+        ranked = ranked[max_members:]
 
-    # get the description of what the posrole setup actually looks like, and
-    # generate updates from it
+    # generate updates from them
     removals: dict[int, set[int]] = {}
     adds: dict[int, set[int]] = {}
+    for role_id, _ in posroles:
+        curr = current[role_id]
+        adds[role_id] = wanted[role_id].difference(curr)
+        removals[role_id] = curr.difference(wanted[role_id])
 
-    for p in posroles:
-        curr = {
-            m.user_id
-            for m in await PosRoleMember.fetch_query()
-            .where(role_id=p.role_id)
-            .fetchmany()
-        }
-        adds[p.role_id] = wanted[p.role_id].difference(curr)
-        removals[p.role_id] = curr.difference(wanted[p.role_id])
-
-    return adds, removals
+    return _GuildPosRoles(posroles, leaderboard, members), (adds, removals)
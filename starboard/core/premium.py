@@ -39,24 +39,13 @@ from starboard.database import (
     User,
 )
 
+from .config import invalidate_configs
+from .role_jobs import queue_roles
+
 if TYPE_CHECKING:
     from starboard.bot import Bot
 
 
-async def _add_role(member: hikari.Member, role_id: int | None) -> None:
-    if role_id in member.role_ids or role_id is None:
-        return
-    with suppress(hikari.ForbiddenError, hikari.NotFoundError):
-        await member.add_role(role_id)
-
-
-async def _rm_role(member: hikari.Member, role_id: int | None) -> None:
-    if role_id not in member.role_ids or role_id is None:
-        return
-    with suppress(hikari.ForbiddenError, hikari.NotFoundError):
-        await member.remove_role(role_id)
-
-
 async def _try_send(bot: Bot, channel: int, message: str) -> None:
     with suppress(hikari.ForbiddenError, hikari.NotFoundError):
         await bot.rest.create_message(channel, message)
@@ -74,6 +63,7 @@ async def update_prem_locks(bot: Bot, guild_id: int) -> None:
         await AutoStarChannel.update_query().where(guild_id=guild_id).set(
             prem_locked=False
         ).execute()
+        await bot.database.refresh_asc(guild_id)
         return
 
     # if we get here, the guild doesn't have premium
@@ -106,6 +96,8 @@ async def update_prem_locks(bot: Bot, guild_id: int) -> None:
             sb.prem_locked = False
             await sb.save()
 
+    invalidate_configs(guild_id)
+
     num_asc = await AutoStarChannel.count(guild_id=guild_id, prem_locked=False)
     if (to_lock := num_asc - CONFIG.np_max_autostar) > 0:
         asc_to_lock = (
@@ -133,6 +125,8 @@ async def update_prem_locks(bot: Bot, guild_id: int) -> None:
             asc.prem_locked = False
             await asc.save()
 
+    await bot.database.refresh_asc(guild_id)
+
 
 async def update_supporter_roles(bot: Bot, user: User) -> None:
     if not CONFIG.main_guild:
@@ -144,14 +138,21 @@ async def update_supporter_roles(bot: Bot, user: User) -> None:
         user.patreon_status is PatreonStatus.ACTIVE
         or user.patreon_status is PatreonStatus.DECLINED
     ):
-        await _add_role(member, CONFIG.patron_role)
-        await _add_role(member, CONFIG.donor_role)
+        wanted = {CONFIG.patron_role: True, CONFIG.donor_role: True}
     elif user.patreon_status is PatreonStatus.FORMER:
-        await _add_role(member, CONFIG.donor_role)
-        await _rm_role(member, CONFIG.patron_role)
+        wanted = {CONFIG.patron_role: False, CONFIG.donor_role: True}
     else:
-        await _rm_role(member, CONFIG.patron_role)
-        await _rm_role(member, CONFIG.donor_role)
+        wanted = {CONFIG.patron_role: False, CONFIG.donor_role: False}
+
+    await queue_roles(
+        CONFIG.main_guild,
+        [
+            (user.user_id, role_id, add)
+            for role_id, add in wanted.items()
+            if role_id is not None and add != (role_id in member.role_ids)
+        ],
+        "Supporter roles",
+    )
 
 
 async def try_autoredeem(bot: Bot, guild: Guild) -> hikari.Member | None:
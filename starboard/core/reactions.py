@@ -33,8 +33,8 @@ from starboard.config import CONFIG
 from starboard.core.leaderboard import refresh_xp
 from starboard.core.posrole import update_posroles
 from starboard.core.xprole import refresh_xpr
-from starboard.database import Guild, Member, Message, Starboard
-from starboard.database.models.user import User
+from starboard.database import Member, Message, queries
+from starboard.tracing import set_tag, traced
 
 from .config import StarboardConfig, get_config
 from .messages import get_orig_message
@@ -48,10 +48,13 @@ if TYPE_CHECKING:
 COOLDOWN: FixedCooldown[int] = FixedCooldown(*CONFIG.guild_vote_cooldown)
 
 
+@traced("reaction_add")
 async def handle_reaction_add(event: hikari.GuildReactionAddEvent) -> None:
     if event.member.is_bot:
         return
     bot = cast("Bot", event.app)
+    set_tag("guild_id", event.guild_id)
+    set_tag("message_id", event.message_id)
 
     emoji_str = _get_emoji_str_from_event(event)
     if (
@@ -77,6 +80,7 @@ async def handle_reaction_add(event: hikari.GuildReactionAddEvent) -> None:
         channel_nsfw = await bot.cache.gof_guild_channel_nsfw(event.channel_id)
         assert channel_nsfw is not None
 
+        # also creates the person who reacted
         orig_msg = await Message.get_or_create(
             event.guild_id,
             event.channel_id,
@@ -84,14 +88,16 @@ async def handle_reaction_add(event: hikari.GuildReactionAddEvent) -> None:
             channel_nsfw,
             _m.author.id,
             _m.author.is_bot,
+            members={event.member.id: event.member.is_bot},
+        )
+    else:
+        # data for the person who reacted
+        await Member.get_or_create(
+            event.guild_id, event.member.id, event.member.is_bot
         )
 
-    # data for the person who reacted
-    await Member.get_or_create(
-        event.guild_id, event.member.id, event.member.is_bot
-    )
-
-    author = await User.fetch(user_id=orig_msg.author_id)
+    author = await queries.USER.fetchone(orig_msg.author_id)
+    assert author
     author_obj = await bot.cache.gof_member(event.guild_id, author.user_id)
     valid_upvote_starboard_ids: set[int] = set()
     valid_downvote_starboard_ids: set[int] = set()
@@ -150,7 +156,8 @@ async def handle_reaction_add(event: hikari.GuildReactionAddEvent) -> None:
         is_downvote=True,
     )
 
-    guild = await Guild.fetch(guild_id=event.guild_id)
+    guild = await queries.GUILD.fetchone(event.guild_id)
+    assert guild
     ip = guild.premium_end is not None
 
     await refresh_message(
@@ -165,13 +172,16 @@ async def handle_reaction_add(event: hikari.GuildReactionAddEvent) -> None:
         asyncio.create_task(
             refresh_xpr(bot, event.guild_id, orig_msg.author_id)
         )
-        asyncio.create_task(update_posroles(bot, event.guild_id))
+        asyncio.create_task(update_posroles(event.guild_id))
 
 
+@traced("reaction_remove")
 async def handle_reaction_remove(
     event: hikari.GuildReactionDeleteEvent,
 ) -> None:
     bot = cast("Bot", event.app)
+    set_tag("guild_id", event.guild_id)
+    set_tag("message_id", event.message_id)
 
     emoji_str = _get_emoji_str_from_event(event)
     if not emoji_str or emoji_str not in await bot.cache.guild_vote_emojis(
@@ -195,7 +205,8 @@ async def handle_reaction_remove(
 
     await remove_votes(orig_msg.message_id, event.user_id, valid_sbids)
 
-    guild = await Guild.fetch(guild_id=event.guild_id)
+    guild = await queries.GUILD.fetchone(event.guild_id)
+    assert guild
     ip = guild.premium_end is not None
 
     await refresh_message(
@@ -205,7 +216,7 @@ async def handle_reaction_remove(
 
     if ip:
         await refresh_xpr(bot, event.guild_id, orig_msg.author_id)
-        await update_posroles(bot, event.guild_id)
+        await update_posroles(event.guild_id)
 
 
 def _get_emoji_str_from_event(
@@ -222,12 +233,11 @@ def _get_emoji_str_from_event(
         return str(event.emoji_name)
 
 
+@traced("get_configs")
 async def _get_configs_for_emoji(
     bot: Bot, emoji_str: str, guild_id: int, channel_id: int
 ) -> tuple[list[StarboardConfig], list[StarboardConfig]]:
-    starboards = (
-        await Starboard.fetch_query().where(guild_id=guild_id).fetchmany()
-    )
+    starboards = await queries.STARBOARDS.fetchmany(guild_id)
     upvote_configs: list[StarboardConfig] = []
     downvote_configs: list[StarboardConfig] = []
 
@@ -235,9 +245,9 @@ async def _get_configs_for_emoji(
         config = await get_config(bot, sb, channel_id)
         if not config.enabled:
             continue
-        if emoji_str in config.upvote_emojis:
+        if emoji_str in config.upvote_emoji_set:
             upvote_configs.append(config)
-        elif emoji_str in config.downvote_emojis:
+        elif emoji_str in config.downvote_emoji_set:
             downvote_configs.append(config)
 
     return upvote_configs, downvote_configs
@@ -0,0 +1,199 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import asyncio
+import traceback
+from contextlib import suppress
+from typing import TYPE_CHECKING, Iterable
+
+import hikari
+
+from starboard.config import CONFIG
+from starboard.database import RoleJob, queries
+
+if TYPE_CHECKING:
+    from starboard.bot import Bot
+
+
+# Role changes (for PosRoles, XPRoles and supporter roles) are queued in the
+# role_jobs table and applied by the cluster the guild is on, so that they
+# survive restarts. All of a member's queued changes are applied with a
+# single request (adding or removing the role if there's only one, or
+# editing the member's roles if there are more).
+
+# set when jobs are queued, so the worker doesn't wait for its next run
+_QUEUED: asyncio.Event | None = None
+
+
+async def queue_roles(
+    guild_id: int, changes: Iterable[tuple[int, int, bool]], reason: str
+) -> None:
+    # changes are (user_id, role_id, add)
+    user_ids: list[int] = []
+    role_ids: list[int] = []
+    adds: list[bool] = []
+    for user_id, role_id, add in changes:
+        user_ids.append(user_id)
+        role_ids.append(role_id)
+        adds.append(add)
+    if not user_ids:
+        return
+
+    await queries.ENQUEUE_ROLE_JOBS.execute(
+        guild_id, user_ids, role_ids, adds, reason
+    )
+    if _QUEUED:
+        _QUEUED.set()
+
+
+async def wait_for_jobs(timeout: float) -> None:
+    global _QUEUED
+    if _QUEUED is None:
+        _QUEUED = asyncio.Event()
+
+    with suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(_QUEUED.wait(), timeout)
+    _QUEUED.clear()
+
+
+async def run_role_jobs(bot: Bot) -> int:
+    jobs = await queries.ROLE_JOBS.fetchmany(
+        bot.cluster.shard_count,
+        list(bot.cluster.shard_ids),
+        CONFIG.role_job_batch_size,
+    )
+
+    guilds: dict[int, dict[int, list[RoleJob]]] = {}
+    for job in jobs:
+        guilds.setdefault(job.guild_id, {}).setdefault(job.user_id, []).append(
+            job
+        )
+
+    done: list[RoleJob] = []
+    failed: list[RoleJob] = []
+    await asyncio.gather(
+        *(
+            _run_guild(bot, guild_id, members, done, failed)
+            for guild_id, members in guilds.items()
+        )
+    )
+
+    # jobs that keep failing are given up on
+    retry: list[RoleJob] = []
+    for job in failed:
+        if job.attempts + 1 < CONFIG.role_job_max_attempts:
+            retry.append(job)
+        else:
+            done.append(job)
+
+    if done:
+        await queries.DELETE_ROLE_JOBS.execute(*_keys(done))
+    if retry:
+        await queries.RETRY_ROLE_JOBS.execute(*_keys(retry))
+
+    return len(jobs)
+
+
+def _keys(
+    jobs: list[RoleJob],
+) -> tuple[list[int], list[int], list[int], list[object]]:
+    return (
+        [j.guild_id for j in jobs],
+        [j.user_id for j in jobs],
+        [j.role_id for j in jobs],
+        [j.created_at for j in jobs],
+    )
+
+
+async def _run_guild(
+    bot: Bot,
+    guild_id: int,
+    members: dict[int, list[RoleJob]],
+    done: list[RoleJob],
+    failed: list[RoleJob],
+) -> None:
+    # edits to members of a guild share a rate limit (which hikari waits
+    # for), so they're made one at a time
+    for user_id, jobs in members.items():
+        try:
+            await _apply(bot, guild_id, user_id, jobs)
+        except Exception:
+            traceback.print_exc()
+            failed.extend(jobs)
+        else:
+            done.extend(jobs)
+
+
+async def _apply(
+    bot: Bot, guild_id: int, user_id: int, jobs: list[RoleJob]
+) -> None:
+    if len(jobs) == 1:
+        await _apply_each(bot, guild_id, user_id, jobs)
+        return
+
+    # edit_member replaces all of the member's roles, so this has to start
+    # from their current roles and not from the cache, or roles given since
+    # they were cached would be removed
+    try:
+        member = await bot.rest.fetch_member(guild_id, user_id)
+    except hikari.NotFoundError:
+        return
+    bot.cache.set_member(member)
+
+    roles = set(member.role_ids)
+    for job in jobs:
+        if job.add:
+            roles.add(hikari.Snowflake(job.role_id))
+        else:
+            roles.discard(hikari.Snowflake(job.role_id))
+    if roles == set(member.role_ids):
+        return
+
+    reason = ", ".join(sorted({j.reason for j in jobs}))
+    try:
+        member = await bot.rest.edit_member(
+            guild_id, user_id, roles=list(roles), reason=reason
+        )
+    except (hikari.ForbiddenError, hikari.BadRequestError):
+        # one of the roles can't be given (it might be above the bot's
+        # highest role, or deleted), so give the others one at a time
+        await _apply_each(bot, guild_id, user_id, jobs)
+    else:
+        bot.cache.set_member(member)
+
+
+async def _apply_each(
+    bot: Bot, guild_id: int, user_id: int, jobs: list[RoleJob]
+) -> None:
+    for job in jobs:
+        with suppress(hikari.NotFoundError, hikari.ForbiddenError):
+            if job.add:
+                await bot.rest.add_role_to_member(
+                    guild_id, user_id, job.role_id, reason=job.reason
+                )
+            else:
+                await bot.rest.remove_role_from_member(
+                    guild_id, user_id, job.role_id, reason=job.reason
+                )
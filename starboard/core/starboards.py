@@ -29,11 +29,11 @@ from dataclasses import dataclass
 from typing import TYPE_CHECKING, Iterable
 
 import hikari
-from apgorm import sql
 from pycooldown import FixedCooldown
 
 from starboard.config import CONFIG
-from starboard.database import Guild, Message, SBMessage, Starboard, Vote
+from starboard.database import Guild, Message, SBMessage, queries
+from starboard.tracing import set_tag, traced
 
 from .config import StarboardConfig, get_config
 from .has_image import has_image
@@ -46,6 +46,7 @@ if TYPE_CHECKING:
 LOCK: set[int] = set()
 
 
+@traced("refresh_message")
 async def refresh_message(
     bot: Bot,
     orig_message: Message,
@@ -73,16 +74,11 @@ async def refresh_message(
 
 
 async def _handle_trashed_message(bot: Bot, orig_message: Message) -> None:
-    starboards = {
-        sb.id: sb
-        for sb in await Starboard.fetch_query()
-        .where(guild_id=orig_message.guild_id)
-        .fetchmany()
-    }
-    for sid, sb in starboards.items():
+    starboards = await queries.STARBOARDS.fetchmany(orig_message.guild_id)
+    for sb in starboards:
         config = await get_config(bot, sb, orig_message.channel_id)
-        sbmsg = await SBMessage.exists(
-            message_id=orig_message.message_id, starboard_id=sid
+        sbmsg = await queries.SBMESSAGE.fetchone(
+            orig_message.message_id, sb.id
         )
         if not (sbmsg and sbmsg.sb_message_id):
             continue
@@ -118,19 +114,9 @@ async def _refresh_message(
     premium: bool,
 ) -> None:
     if sbids:
-        _s = (
-            await Starboard.fetch_query()
-            .where(Starboard.id.eq(sql(sbids).any))
-            .where(prem_locked=False)
-            .fetchmany()
-        )
+        _s = await queries.UNLOCKED_STARBOARDS_BY_ID.fetchmany(list(sbids))
     else:
-        _s = (
-            await Starboard.fetch_query()
-            .where(guild_id=orig_message.guild_id)
-            .where(prem_locked=False)
-            .fetchmany()
-        )
+        _s = await queries.UNLOCKED_STARBOARDS.fetchmany(orig_message.guild_id)
     configs = [await get_config(bot, s, orig_message.channel_id) for s in _s]
 
     for c in configs:
@@ -144,6 +130,7 @@ async def _refresh_message(
             traceback.print_exc()
 
 
+@traced("refresh_starboard")
 async def _refresh_message_for_starboard(
     bot: Bot,
     orig_msg: Message,
@@ -151,6 +138,7 @@ async def _refresh_message_for_starboard(
     force: bool,
     premium: bool,
 ) -> None:
+    set_tag("starboard_id", config.starboard.id)
     orig_msg_obj = await bot.cache.gof_message(
         orig_msg.channel_id, orig_msg.message_id
     )
@@ -162,8 +150,8 @@ async def _refresh_message_for_starboard(
         orig_msg, orig_msg_obj, config, points, orig_msg_obj is None, nsfw
     )
 
-    sbmsg = await SBMessage.exists(
-        message_id=orig_msg.message_id, starboard_id=config.starboard.id
+    sbmsg = await queries.SBMESSAGE.fetchone(
+        orig_msg.message_id, config.starboard.id
     )
     if (
         sbmsg is not None
@@ -243,8 +231,9 @@ async def _refresh_message_for_starboard(
     await sbmsg.save()
 
 
+@traced("add_reactions")
 async def _add_reactions(
-    bot: Bot, emojis: list[str], sbmsg_obj: hikari.Message
+    bot: Bot, emojis: Iterable[str], sbmsg_obj: hikari.Message
 ) -> None:
     for emoji in emojis:
         _emoji: hikari.UnicodeEmoji | hikari.CustomEmoji
@@ -266,6 +255,7 @@ EDIT_COOLDOWN: FixedCooldown[int] = FixedCooldown(
 )
 
 
+@traced("edit")
 async def _edit(
     bot: Bot,
     config: StarboardConfig,
@@ -302,6 +292,7 @@ DELETE_COOLDOWN: FixedCooldown[int] = FixedCooldown(
 )
 
 
+@traced("delete")
 async def _delete(
     bot: Bot, config: StarboardConfig, message: hikari.Message
 ) -> None:
@@ -325,6 +316,7 @@ SEND_COOLDOWN: FixedCooldown[int] = FixedCooldown(
 )
 
 
+@traced("send")
 async def _send(
     bot: Bot,
     config: StarboardConfig,
@@ -392,23 +384,10 @@ async def _webhook(
 
 
 async def _get_points(orig_msg_id: int, starboard_id: int) -> int:
-    upvotes = (
-        await Vote.fetch_query()
-        .where(
-            message_id=orig_msg_id,
-            starboard_id=starboard_id,
-            is_downvote=False,
-        )
-        .count()
-    )
-    downvotes = (
-        await Vote.fetch_query()
-        .where(
-            message_id=orig_msg_id, starboard_id=starboard_id, is_downvote=True
-        )
-        .count()
+    points: int = await queries.MESSAGE_POINTS.fetchval(
+        orig_msg_id, starboard_id
     )
-    return upvotes - downvotes
+    return points
 
 
 @dataclass(order=True)
@@ -25,13 +25,12 @@ from __future__ import annotations
 import datetime
 from typing import TYPE_CHECKING, Iterable
 
-import apgorm
-import asyncpg
 import hikari
 from pycooldown import FlexibleCooldown
 
 from starboard.config import CONFIG
-from starboard.database import Message, User, Vote
+from starboard.database import Message, User, queries
+from starboard.tracing import traced
 
 from .config import StarboardConfig
 from .permrole import get_permissions
@@ -45,6 +44,7 @@ COOLDOWN: FlexibleCooldown[tuple[int, int]] = FlexibleCooldown(
 )
 
 
+@traced("is_vote_valid_for")
 async def is_vote_valid_for(
     bot: Bot,
     config: StarboardConfig,
@@ -99,6 +99,7 @@ async def is_vote_valid_for(
     return author_perms.recv_votes
 
 
+@traced("add_votes")
 async def add_votes(
     orig_message_id: int,
     user_id: int,
@@ -106,26 +107,17 @@ async def add_votes(
     target_author_id: int,
     is_downvote: bool,
 ) -> None:
-    for sbid in starboard_ids:
-        try:
-            await Vote(
-                message_id=orig_message_id,
-                user_id=user_id,
-                starboard_id=sbid,
-                target_author_id=target_author_id,
-                is_downvote=is_downvote,
-            ).create()
-        except asyncpg.UniqueViolationError:
-            await Vote.update_query().where(
-                message_id=orig_message_id, user_id=user_id, starboard_id=sbid
-            ).set(is_downvote=is_downvote).execute()
+    starboard_ids = list(starboard_ids)
+    if not starboard_ids:
+        return
+
+    await queries.UPSERT_VOTES.execute(
+        orig_message_id, user_id, target_author_id, is_downvote, starboard_ids
+    )
 
 
+@traced("remove_votes")
 async def remove_votes(
     orig_message_id: int, user_id: int, starboard_ids: list[int]
 ) -> None:
-    await Vote.delete_query().where(
-        message_id=orig_message_id,
-        user_id=user_id,
-        starboard_id=apgorm.sql(starboard_ids).any,
-    ).execute()
+    await queries.DELETE_VOTES.execute(orig_message_id, user_id, starboard_ids)
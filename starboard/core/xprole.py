@@ -22,14 +22,15 @@
 
 from __future__ import annotations
 
-from contextlib import suppress
+import asyncio
 from typing import TYPE_CHECKING
 
-import hikari
 from pycooldown import FixedCooldown
 
 from starboard.config import CONFIG
-from starboard.database import Member, XPRole
+from starboard.database import Member
+
+from .role_jobs import queue_roles
 
 if TYPE_CHECKING:
     from starboard.bot import Bot
@@ -37,34 +38,53 @@ if TYPE_CHECKING:
 
 COOLDOWN: FixedCooldown[int] = FixedCooldown(*CONFIG.user_xpr_cooldown)
 
+# refreshes that hit the cooldown, by (guild_id, user_id). They're run once
+# the cooldown expires instead of being dropped, and any more refreshes for
+# the same member in the meantime are covered by the pending one.
+_DEFERRED: dict[tuple[int, int], asyncio.Task[None]] = {}
+
 
 async def refresh_xpr(bot: Bot, guild_id: int, user_id: int) -> bool:
-    if COOLDOWN.update_ratelimit(user_id):
+    # returns False if the refresh was deferred
+    if (retry_after := COOLDOWN.update_ratelimit(user_id)) is not None:
+        key = (guild_id, user_id)
+        if key not in _DEFERRED:
+            _DEFERRED[key] = asyncio.create_task(
+                _deferred_refresh(bot, guild_id, user_id, retry_after)
+            )
         return False
 
+    await _refresh(bot, guild_id, user_id)
+    return True
+
+
+async def _deferred_refresh(
+    bot: Bot, guild_id: int, user_id: int, retry_after: float
+) -> None:
+    try:
+        delay: float | None = retry_after
+        while delay is not None:
+            await asyncio.sleep(delay)
+            delay = COOLDOWN.update_ratelimit(user_id)
+        await _refresh(bot, guild_id, user_id)
+    finally:
+        del _DEFERRED[(guild_id, user_id)]
+
+
+async def _refresh(bot: Bot, guild_id: int, user_id: int) -> None:
+    xpr = await bot.cache.guild_xproles(guild_id)
+    if not xpr:
+        return
+
     obj = await bot.cache.gof_member(guild_id, user_id)
     if not obj:
-        return True
+        return
     member = await Member.get_or_create(guild_id, user_id, obj.is_bot)
 
-    xpr = await XPRole.fetch_query().where(guild_id=guild_id).fetchmany()
-    if not xpr:
-        return True
-
-    add = [
-        r
-        for r in xpr
-        if member.xp >= r.required and r.role_id not in obj.role_ids
+    # the member should have exactly the XPRoles they have enough XP for
+    changes = [
+        (user_id, role_id, member.xp >= required)
+        for role_id, required in xpr
+        if (member.xp >= required) != (role_id in obj.role_ids)
     ]
-    remove = [
-        r for r in xpr if member.xp < r.required and r.role_id in obj.role_ids
-    ]
-
-    with suppress(hikari.ForbiddenError):
-        for r in remove:
-            with suppress(hikari.NotFoundError):
-                await obj.remove_role(r.role_id, reason="XPRoles")
-        for r in add:
-            with suppress(hikari.NotFoundError):
-                await obj.add_role(r.role_id, reason="XPRoles")
-    return True
+    await queue_roles(guild_id, changes, "XPRoles")
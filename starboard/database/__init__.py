@@ -20,14 +20,16 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from .database import Database
+from .database import Database, on_primary, use_replica
 from .models.aschannel import AutoStarChannel
+from .models.gif_url import GifUrl
 from .models.guild import Guild
 from .models.member import Member
 from .models.message import Message
 from .models.override import Override
 from .models.permrole import PermRole, PermRoleStarboard
 from .models.posrole import PosRole, PosRoleMember
+from .models.role_job import RoleJob
 from .models.sb_message import SBMessage
 from .models.starboard import Starboard, validate_sb_changes
 from .models.user import PatreonStatus, Patron, User
@@ -37,6 +39,7 @@ from .models.xprole import XPRole
 __all__ = (
     "Database",
     "AutoStarChannel",
+    "GifUrl",
     "Guild",
     "Member",
     "Message",
@@ -45,6 +48,7 @@ __all__ = (
     "PermRoleStarboard",
     "PosRole",
     "PosRoleMember",
+    "RoleJob",
     "SBMessage",
     "Vote",
     "Starboard",
@@ -53,4 +57,6 @@ __all__ = (
     "PatreonStatus",
     "XPRole",
     "validate_sb_changes",
+    "use_replica",
+    "on_primary",
 )
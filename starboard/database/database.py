@@ -22,17 +22,47 @@
 
 from __future__ import annotations
 
+import asyncio
+import math
+import random
+import re
+import time
+from collections import Counter
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from contextvars import ContextVar, Token
+from functools import lru_cache
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    Sequence,
+    TypeVar,
+)
+
 import apgorm
-from apgorm import Index, IndexType
+import asyncpg
+from apgorm import Block, Index, IndexType, raw
+from apgorm.connection import Connection, Pool
+from apgorm.utils.lazy_list import LazyList
+
+from starboard.config import CONFIG
+from starboard.metrics import QueryStats
 
+from . import queries
 from .models import (
     aschannel,
+    gif_url,
     guild,
     member,
     message,
     override,
     permrole,
     posrole,
+    role_job,
     sb_message,
     starboard,
     user,
@@ -40,30 +70,426 @@ from .models import (
     xprole,
 )
 
+if TYPE_CHECKING:
+    from asyncpg.cursor import CursorFactory
+
+    from .queries import Statement
+
+_T = TypeVar("_T")
+
+_PARAM_LIST = re.compile(r"\$\d+(\s*,\s*\$\d+)*")
+
+# how many seconds behind the primary a replica can be for reads in the
+# current context to use it, or None if reads should go to the primary
+_REPLICA_MAX_LAG: ContextVar[float | None] = ContextVar(
+    "_REPLICA_MAX_LAG", default=None
+)
+
+# 0 on a primary or a replica that has replayed everything it received,
+# otherwise how long ago the last replayed transaction was committed
+_REPLICA_LAG = """SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+END"""
+
+# errors that mean a replica is unusable, rather than the query being bad
+_REPLICA_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.ConnectionDoesNotExistError,
+    asyncpg.CannotConnectNowError,
+    # e.g. a query cancelled because of a conflict with recovery
+    asyncpg.TransactionRollbackError,
+)
+
+
+@lru_cache(maxsize=1_024)
+def query_shape(query: str) -> str:
+    # the query builder inlines lists of values as $1, $2, ..., so collapse
+    # those so that all queries of the same shape are grouped together
+    return " ".join(_PARAM_LIST.sub("$n", query).split())
+
+
+def use_replica(max_lag: float | None = None) -> Token[float | None]:
+    # Reads for the rest of the current context (usually the task handling
+    # an interaction) go to a replica at most max_lag seconds behind the
+    # primary, falling back to the primary if there isn't one.
+    return _REPLICA_MAX_LAG.set(
+        CONFIG.replica_max_lag if max_lag is None else max_lag
+    )
+
+
+@contextmanager
+def on_primary() -> Iterator[None]:
+    # for reads that can't be stale, even in a read-only command
+    token = _REPLICA_MAX_LAG.set(None)
+    try:
+        yield
+    finally:
+        _REPLICA_MAX_LAG.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, counter: QueryCounter) -> None:
+        self.counter = counter
+        super().__init__(
+            f"{counter.name} made {counter.count} queries, but its budget is "
+            f"{counter.budget}: {counter.describe()}"
+        )
+
+
+class QueryCounter:
+    __slots__: Iterable[str] = ("name", "budget", "count", "shapes")
+
+    def __init__(self, name: str, budget: int | None) -> None:
+        self.name = name
+        self.budget = budget
+        self.count = 0
+        self.shapes: Counter[str] = Counter()
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+    def describe(self, limit: int = 5) -> str:
+        return ", ".join(
+            f"{c}x {shape[:80]}" for shape, c in self.shapes.most_common(limit)
+        )
+
+
+# counts the queries made while handling the current event or command
+_QUERY_COUNTER: ContextVar[QueryCounter | None] = ContextVar(
+    "_QUERY_COUNTER", default=None
+)
+
+
+class Replica:
+    __slots__: Iterable[str] = ("dsn", "pool", "lag")
+
+    def __init__(self, dsn: str) -> None:
+        self.dsn = dsn
+        self.pool: Pool | None = None
+        self.lag: float = math.inf
+
+
+class PartialIndex(Index):
+    __slots__: Iterable[str] = ("where",)
+
+    def __init__(self, *args: Any, where: str, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.where = where
+
+    def _creation_sql(self) -> Block[Any]:
+        return Block(super()._creation_sql(), raw("WHERE"), raw(self.where))
+
 
 class Database(apgorm.Database):
     def __init__(self) -> None:
         super().__init__("starboard/database/migrations")
 
-        self.asc: set[int] = set()
+        # autostar channel configs, by channel_id
+        self.asc: dict[int, list[aschannel.AutoStarChannel]] = {}
+        self._asc_channels: dict[int, set[int]] = {}
+        self.stats = QueryStats()
+        self.replicas: list[Replica] = []
+        self._replica_task: asyncio.Task[None] | None = None
 
     async def connect(
-        self, *, migrate: bool = False, **connect_kwargs
+        self,
+        *,
+        migrate: bool = False,
+        replicas: Sequence[str] = (),
+        **connect_kwargs,
     ) -> None:
         await super().connect(**connect_kwargs)
+        if replicas:
+            self.replicas = [Replica(dsn) for dsn in replicas]
+            await self._check_replicas()
+            self._replica_task = asyncio.create_task(
+                self._loop_check_replicas()
+            )
         if self.must_create_migrations():
             raise Exception("There are uncreated migrations.")
         if migrate and await self.must_apply_migrations():
             print("Applying migrations...")
             await self.apply_migrations()
 
+    async def load_asc(
+        self, shard_count: int, shard_ids: Iterable[int]
+    ) -> None:
+        # only the autostar channels for guilds on this cluster's shards are
+        # loaded, a chunk at a time
         print("Loading autostar channels...")
-        self.asc = {
-            a.channel_id
-            for a in await aschannel.AutoStarChannel.fetch_query().fetchmany()
-        }
+        self.asc.clear()
+        self._asc_channels.clear()
+        shards = list(shard_ids)
+        last_id = 0
+        while chunk := await queries.ASCHANNELS_FOR_SHARDS.fetchmany(
+            shard_count, shards, last_id, CONFIG.asc_load_chunk_size
+        ):
+            for a in chunk:
+                self._add_asc(a)
+            last_id = chunk[-1].id
         print("Autostar channels loaded.")
 
+    async def refresh_asc(self, guild_id: int) -> None:
+        # must be called whenever a guild's autostar channels are changed
+        self._set_asc(
+            guild_id,
+            await aschannel.AutoStarChannel.fetch_query()
+            .where(guild_id=guild_id)
+            .fetchmany(),
+        )
+
+    def forget_asc(self, guild_id: int) -> None:
+        self._set_asc(guild_id, ())
+
+    def _set_asc(
+        self, guild_id: int, ascs: Iterable[aschannel.AutoStarChannel]
+    ) -> None:
+        for channel_id in self._asc_channels.pop(guild_id, ()):
+            del self.asc[channel_id]
+        for a in ascs:
+            self._add_asc(a)
+
+    def _add_asc(self, asc: aschannel.AutoStarChannel) -> None:
+        self.asc.setdefault(asc.channel_id, []).append(asc)
+        self._asc_channels.setdefault(asc.guild_id, set()).add(asc.channel_id)
+
+    async def cleanup(self, timeout: float = 30) -> None:
+        if self._replica_task is not None:
+            self._replica_task.cancel()
+        for r in self.replicas:
+            if r.pool is not None:
+                await asyncio.wait_for(r.pool.close(), timeout=timeout)
+        await super().cleanup(timeout)
+
+    def start_counting(
+        self, name: str, budget: int | None = None
+    ) -> Token[QueryCounter | None]:
+        # Counts the queries made in the current context (usually the task
+        # handling an event or command) until finish_counting is called.
+        # Budgets in the config take priority over the ones in the code.
+        return _QUERY_COUNTER.set(
+            QueryCounter(name, CONFIG.query_budgets.get(name, budget))
+        )
+
+    def finish_counting(
+        self, token: Token[QueryCounter | None] | None = None
+    ) -> QueryCounter | None:
+        counter = _QUERY_COUNTER.get()
+        if token is not None:
+            _QUERY_COUNTER.reset(token)
+        else:
+            _QUERY_COUNTER.set(None)
+        if counter is None:
+            return None
+
+        self.stats.record_queries(counter.name, counter.count)
+        if counter.over_budget:
+            if CONFIG.strict_query_budgets:
+                raise QueryBudgetExceeded(counter)
+            if random.random() < CONFIG.query_budget_sample_rate:
+                print(
+                    f"Over query budget ({counter.count}/{counter.budget}) "
+                    f"in {counter.name}: {counter.describe()}"
+                )
+        return counter
+
+    @contextmanager
+    def count_queries(
+        self, name: str, budget: int | None = None
+    ) -> Iterator[QueryCounter]:
+        token = self.start_counting(name, budget)
+        counter = _QUERY_COUNTER.get()
+        assert counter is not None
+        try:
+            yield counter
+        except BaseException:
+            # the error says more than the count would
+            _QUERY_COUNTER.reset(token)
+            raise
+        self.finish_counting(token)
+
+    @contextmanager
+    def replica(self, max_lag: float | None = None) -> Iterator[None]:
+        token = use_replica(max_lag)
+        try:
+            yield
+        finally:
+            _REPLICA_MAX_LAG.reset(token)
+
+    async def run_statement(
+        self, statement: Statement[Any], method: str, params: Sequence[Any]
+    ) -> Any:
+        # single statements are atomic on their own, so unlike the other
+        # methods this skips the BEGIN/COMMIT round trips
+        async def run(con: Connection) -> Any:
+            return await getattr(con.con, method)(statement.query, *params)
+
+        return await self._run(
+            statement.name, statement.query, run, read=method != "execute"
+        )
+
+    async def execute(self, query: str, params: list[Any]) -> None:
+        async def run(con: Connection) -> None:
+            async with con.transaction():
+                await con.execute(query, params)
+
+        await self._run(query_shape(query), query, run, read=False)
+
+    async def fetchrow(
+        self, query: str, params: list[Any]
+    ) -> dict[str, Any] | None:
+        async def run(con: Connection) -> dict[str, Any] | None:
+            async with con.transaction():
+                return await con.fetchrow(query, params)
+
+        return await self._run(query_shape(query), query, run)
+
+    async def fetchmany(
+        self, query: str, params: list[Any], *, read: bool = True
+    ) -> LazyList[asyncpg.Record, dict[str, Any]]:
+        # read=False is for queries that write and return rows, which have
+        # to go to the primary
+        async def run(
+            con: Connection,
+        ) -> LazyList[asyncpg.Record, dict[str, Any]]:
+            async with con.transaction():
+                return await con.fetchmany(query, params)
+
+        return await self._run(query_shape(query), query, run, read=read)
+
+    async def fetchval(self, query: str, params: list[Any]) -> Any:
+        async def run(con: Connection) -> Any:
+            async with con.transaction():
+                return await con.fetchval(query, params)
+
+        return await self._run(query_shape(query), query, run, rows=1)
+
+    @asynccontextmanager
+    async def cursor(
+        self, query: str, params: list[Any], con: Connection | None = None
+    ) -> AsyncGenerator[CursorFactory, None]:
+        if con:
+            yield con.cursor(query, params)
+            return
+
+        # how long a cursor is open depends on the consumer, so only the time
+        # it took to acquire a connection is tracked. rows are fetched as the
+        # cursor is consumed, so this can only fall back to the primary if
+        # the replica can't be connected to.
+        async with AsyncExitStack() as stack:
+            con = None
+            if (replica := self._pick_replica()) is not None:
+                try:
+                    con = await stack.enter_async_context(
+                        self._acquire(replica)
+                    )
+                except _REPLICA_ERRORS:
+                    replica.lag = math.inf
+            if con is None:
+                con = await stack.enter_async_context(self._acquire())
+
+            async with con.transaction():
+                yield con.cursor(query, params)
+
+    async def _run(
+        self,
+        shape: str,
+        query: str,
+        run: Callable[[Connection], Awaitable[_T]],
+        *,
+        read: bool = True,
+        rows: int | None = None,
+    ) -> _T:
+        if read and (replica := self._pick_replica()) is not None:
+            try:
+                return await self._run_on(replica, shape, query, run, rows)
+            except asyncpg.ReadOnlySQLTransactionError:
+                # something wrote while reads were routed to a replica
+                pass
+            except _REPLICA_ERRORS:
+                replica.lag = math.inf
+
+        return await self._run_on(None, shape, query, run, rows)
+
+    async def _run_on(
+        self,
+        replica: Replica | None,
+        shape: str,
+        query: str,
+        run: Callable[[Connection], Awaitable[_T]],
+        rows: int | None,
+    ) -> _T:
+        async with self._acquire(replica) as con:
+            start = time.perf_counter()
+            ret = await run(con)
+            self._record(shape, query, start, ret if rows is None else rows)
+            return ret
+
+    @asynccontextmanager
+    async def _acquire(
+        self, replica: Replica | None = None
+    ) -> AsyncGenerator[Connection, None]:
+        pool = self.pool if replica is None else replica.pool
+        assert pool is not None
+        start = time.perf_counter()
+        async with pool.acquire() as con:
+            self.stats.acquire.observe((time.perf_counter() - start) * 1_000)
+            yield con
+
+    def _pick_replica(self) -> Replica | None:
+        max_lag = _REPLICA_MAX_LAG.get()
+        if max_lag is None:
+            return None
+
+        usable = [
+            r for r in self.replicas if r.pool is not None and r.lag <= max_lag
+        ]
+        return random.choice(usable) if usable else None
+
+    async def _check_replicas(self) -> None:
+        for x, r in enumerate(self.replicas):
+            try:
+                if r.pool is None:
+                    r.pool = Pool(await asyncpg.create_pool(r.dsn, timeout=5))
+                async with r.pool.acquire() as con:
+                    lag = await con.con.fetchval(_REPLICA_LAG, timeout=5)
+            except _REPLICA_ERRORS as e:
+                if r.lag != math.inf:
+                    print(f"Replica #{x} is unavailable: {e!r}")
+                r.lag = math.inf
+            else:
+                r.lag = float(lag)
+
+    async def _loop_check_replicas(self) -> None:
+        while True:
+            await asyncio.sleep(CONFIG.replica_check_delay)
+            await self._check_replicas()
+
+    def _record(self, shape: str, query: str, start: float, ret: Any) -> None:
+        ms = (time.perf_counter() - start) * 1_000
+        if ret is None or isinstance(ret, str):
+            rows = 0
+        elif isinstance(ret, (list, LazyList)):
+            rows = len(ret)
+        else:
+            rows = 1
+        self.stats.record(shape, ms, rows)
+        if (counter := _QUERY_COUNTER.get()) is not None:
+            counter.count += 1
+            counter.shapes[shape] += 1
+
+        if (
+            CONFIG.slow_query_threshold is not None
+            and ms >= CONFIG.slow_query_threshold
+        ):
+            query = " ".join(query.split())
+            print(f"Slow query ({ms:.0f}ms, {rows} rows): {query}")
+
     guilds = guild.Guild
     users = user.User
     patrons = user.Patron
@@ -78,10 +504,14 @@ class Database(apgorm.Database):
     xproles = xprole.XPRole
     posroles = posrole.PosRole
     posrole_members = posrole.PosRoleMember
+    role_jobs = role_job.RoleJob
 
     messages = message.Message
     sb_messages = sb_message.SBMessage
     votes = vote.Vote
+    vote_rollups = vote.VoteRollup
+
+    gif_urls = gif_url.GifUrl
 
     indexes = [
         # patrons
@@ -97,6 +527,12 @@ class Database(apgorm.Database):
         Index(members, members.guild_id, IndexType.BTREE),
         Index(members, members.autoredeem_enabled, IndexType.BTREE),
         Index(members, members.xp, IndexType.BTREE),
+        # for ranks
+        Index(
+            members,
+            (members.guild_id, members.xp, members.user_id),
+            IndexType.BTREE,
+        ),
         # overrides
         Index(
             overrides,
@@ -108,8 +544,21 @@ class Database(apgorm.Database):
         Index(overrides, overrides.channel_ids, IndexType.GIN),
         # sbmessages
         Index(sb_messages, sb_messages.sb_message_id, unique=True),
-        Index(sb_messages, sb_messages.last_known_point_count),
         Index(sb_messages, sb_messages.starboard_id, IndexType.BTREE),
+        # for /moststarred
+        PartialIndex(
+            sb_messages,
+            (sb_messages.starboard_id, sb_messages.last_known_point_count),
+            IndexType.BTREE,
+            where="sb_message_id IS NOT NULL",
+        ),
+        # for /random
+        PartialIndex(
+            sb_messages,
+            (sb_messages.starboard_id, sb_messages.message_id),
+            IndexType.BTREE,
+            where="sb_message_id IS NOT NULL",
+        ),
         # permroles
         Index(permroles, permroles.guild_id, IndexType.BTREE),
         # posroles
@@ -123,10 +572,21 @@ class Database(apgorm.Database):
         Index(starboards, starboards.channel_id, IndexType.BTREE),
         # xproles
         Index(xproles, xproles.guild_id, IndexType.BTREE),
-        # votes
-        Index(votes, votes.starboard_id, IndexType.BTREE),
+        # role jobs
+        Index(role_jobs, role_jobs.created_at, IndexType.BTREE),
+        # votes (also for the edges of /custom-leaderboard windows)
+        Index(votes, (votes.starboard_id, votes.created_at), IndexType.BTREE),
         Index(votes, votes.user_id, IndexType.BTREE),
-        Index(votes, votes.message_id, IndexType.BTREE),
-        Index(votes, votes.target_author_id, IndexType.BTREE),
-        Index(votes, votes.is_downvote, IndexType.BTREE),
+        # for counting points
+        Index(
+            votes,
+            (votes.message_id, votes.starboard_id, votes.is_downvote),
+            IndexType.BTREE,
+        ),
+        # for counting xp
+        Index(
+            votes,
+            (votes.target_author_id, votes.starboard_id, votes.is_downvote),
+            IndexType.BTREE,
+        ),
     ]
@@ -0,0 +1,7 @@
+DROP INDEX _btree_index_sb_messages__last_known_point_count;
+DROP INDEX _btree_index_votes__message_id;
+DROP INDEX _btree_index_votes__target_author_id;
+DROP INDEX _btree_index_votes__is_downvote;
+CREATE INDEX _btree_index_sb_messages__starboard_id_last_known_point_count ON sb_messages USING BTREE ( ( starboard_id ) , ( last_known_point_count ) ) WHERE sb_message_id IS NOT NULL;
+CREATE INDEX _btree_index_votes__message_id_starboard_id_is_downvote ON votes USING BTREE ( ( message_id ) , ( starboard_id ) , ( is_downvote ) );
+CREATE INDEX _btree_index_votes__target_author_id_starboard_id_is_downvote ON votes USING BTREE ( ( target_author_id ) , ( starboard_id ) , ( is_downvote ) );
\ No newline at end of file
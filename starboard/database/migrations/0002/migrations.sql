@@ -0,0 +1,45 @@
+ALTER TABLE votes
+    ALTER COLUMN message_id TYPE BIGINT,
+    ALTER COLUMN user_id TYPE BIGINT,
+    ALTER COLUMN target_author_id TYPE BIGINT;
+ALTER TABLE sb_messages
+    ALTER COLUMN message_id TYPE BIGINT,
+    ALTER COLUMN sb_message_id TYPE BIGINT;
+ALTER TABLE messages
+    ALTER COLUMN message_id TYPE BIGINT,
+    ALTER COLUMN guild_id TYPE BIGINT,
+    ALTER COLUMN channel_id TYPE BIGINT,
+    ALTER COLUMN author_id TYPE BIGINT;
+ALTER TABLE posrole_members
+    ALTER COLUMN role_id TYPE BIGINT,
+    ALTER COLUMN user_id TYPE BIGINT;
+ALTER TABLE members
+    ALTER COLUMN user_id TYPE BIGINT,
+    ALTER COLUMN guild_id TYPE BIGINT;
+ALTER TABLE permrole_starboards
+    ALTER COLUMN permrole_id TYPE BIGINT;
+ALTER TABLE overrides
+    ALTER COLUMN guild_id TYPE BIGINT,
+    ALTER COLUMN channel_ids TYPE BIGINT[];
+ALTER TABLE aschannels
+    ALTER COLUMN channel_id TYPE BIGINT,
+    ALTER COLUMN guild_id TYPE BIGINT;
+ALTER TABLE xproles
+    ALTER COLUMN role_id TYPE BIGINT,
+    ALTER COLUMN guild_id TYPE BIGINT;
+ALTER TABLE posroles
+    ALTER COLUMN role_id TYPE BIGINT,
+    ALTER COLUMN guild_id TYPE BIGINT;
+ALTER TABLE permroles
+    ALTER COLUMN role_id TYPE BIGINT,
+    ALTER COLUMN guild_id TYPE BIGINT;
+ALTER TABLE starboards
+    ALTER COLUMN channel_id TYPE BIGINT,
+    ALTER COLUMN guild_id TYPE BIGINT,
+    ALTER COLUMN webhook_id TYPE BIGINT;
+ALTER TABLE patrons
+    ALTER COLUMN discord_id TYPE BIGINT;
+ALTER TABLE users
+    ALTER COLUMN user_id TYPE BIGINT;
+ALTER TABLE guilds
+    ALTER COLUMN guild_id TYPE BIGINT;
@@ -0,0 +1,52 @@
+CREATE TABLE vote_rollups ();
+DROP INDEX _btree_index_votes__starboard_id;
+ALTER TABLE votes ADD COLUMN created_at TIMESTAMPTZ;
+ALTER TABLE vote_rollups ADD COLUMN starboard_id INTEGER;
+ALTER TABLE vote_rollups ADD COLUMN day DATE;
+ALTER TABLE vote_rollups ADD COLUMN target_author_id BIGINT;
+ALTER TABLE vote_rollups ADD COLUMN upvotes INTEGER;
+ALTER TABLE vote_rollups ADD COLUMN downvotes INTEGER;
+-- the actual vote time isn't known for existing votes, so use the time the
+-- message was sent (from its snowflake). Changing the type rewrites the
+-- table once, where an UPDATE would leave a dead copy of every row.
+ALTER TABLE votes ALTER COLUMN created_at TYPE TIMESTAMPTZ USING to_timestamp(((message_id >> 22) + 1420070400000) / 1000.0);
+ALTER TABLE votes ALTER COLUMN created_at SET DEFAULT now();
+ALTER TABLE votes ALTER COLUMN created_at SET NOT NULL;
+ALTER TABLE vote_rollups ALTER COLUMN starboard_id SET NOT NULL;
+ALTER TABLE vote_rollups ALTER COLUMN day SET NOT NULL;
+ALTER TABLE vote_rollups ALTER COLUMN target_author_id SET NOT NULL;
+ALTER TABLE vote_rollups ALTER COLUMN upvotes SET NOT NULL;
+ALTER TABLE vote_rollups ALTER COLUMN downvotes SET NOT NULL;
+CREATE INDEX _btree_index_votes__starboard_id_created_at ON votes USING BTREE ( ( starboard_id ) , ( created_at ) );
+ALTER TABLE vote_rollups ADD CONSTRAINT _vote_rollups_starboard_id_day_target_author_id_primary_key PRIMARY KEY ( starboard_id , day , target_author_id );
+ALTER TABLE vote_rollups ADD CONSTRAINT starboard_id_fk FOREIGN KEY ( starboard_id ) REFERENCES starboards ( id ) MATCH SIMPLE ON DELETE CASCADE ON UPDATE CASCADE;
+INSERT INTO vote_rollups (starboard_id, day, target_author_id, upvotes, downvotes)
+SELECT starboard_id, (created_at AT TIME ZONE 'UTC')::date, target_author_id,
+    count(*) FILTER (WHERE NOT is_downvote), count(*) FILTER (WHERE is_downvote)
+FROM votes GROUP BY 1, 2, 3;
+
+CREATE FUNCTION _rollup_vote(sb INTEGER, author BIGINT, at TIMESTAMPTZ, down BOOLEAN, n INTEGER) RETURNS VOID LANGUAGE SQL AS $$
+    -- the starboard is gone if its votes are being deleted by the cascade
+    INSERT INTO vote_rollups AS r (starboard_id, day, target_author_id, upvotes, downvotes)
+    SELECT sb, (at AT TIME ZONE 'UTC')::date, author, CASE WHEN down THEN 0 ELSE n END, CASE WHEN down THEN n ELSE 0 END
+    WHERE EXISTS (SELECT 1 FROM starboards WHERE id = sb)
+    ON CONFLICT (starboard_id, day, target_author_id) DO UPDATE
+    SET upvotes = r.upvotes + EXCLUDED.upvotes, downvotes = r.downvotes + EXCLUDED.downvotes
+$$;
+
+CREATE FUNCTION _rollup_votes() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM _rollup_vote(OLD.starboard_id, OLD.target_author_id, OLD.created_at, OLD.is_downvote, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM _rollup_vote(NEW.starboard_id, NEW.target_author_id, NEW.created_at, NEW.is_downvote, 1);
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER _rollup_votes AFTER INSERT OR DELETE ON votes FOR EACH ROW EXECUTE FUNCTION _rollup_votes();
+CREATE TRIGGER _rollup_votes_update AFTER UPDATE ON votes FOR EACH ROW
+WHEN ((OLD.starboard_id, OLD.target_author_id, OLD.created_at, OLD.is_downvote) IS DISTINCT FROM (NEW.starboard_id, NEW.target_author_id, NEW.created_at, NEW.is_downvote))
+EXECUTE FUNCTION _rollup_votes();
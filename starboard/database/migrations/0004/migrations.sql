@@ -0,0 +1 @@
+CREATE INDEX _btree_index_sb_messages__starboard_id_message_id ON sb_messages USING BTREE ( ( starboard_id ) , ( message_id ) ) WHERE sb_message_id IS NOT NULL;
\ No newline at end of file
@@ -0,0 +1 @@
+CREATE INDEX _btree_index_members__guild_id_xp_user_id ON members USING BTREE ( ( guild_id ) , ( xp ) , ( user_id ) );
\ No newline at end of file
@@ -0,0 +1,17 @@
+CREATE TABLE role_jobs ();
+ALTER TABLE role_jobs ADD COLUMN guild_id BIGINT;
+ALTER TABLE role_jobs ADD COLUMN user_id BIGINT;
+ALTER TABLE role_jobs ADD COLUMN role_id BIGINT;
+ALTER TABLE role_jobs ADD COLUMN add BOOLEAN;
+ALTER TABLE role_jobs ADD COLUMN reason TEXT;
+ALTER TABLE role_jobs ADD COLUMN attempts SMALLINT;
+ALTER TABLE role_jobs ADD COLUMN created_at TIMESTAMPTZ;
+ALTER TABLE role_jobs ALTER COLUMN guild_id SET NOT NULL;
+ALTER TABLE role_jobs ALTER COLUMN user_id SET NOT NULL;
+ALTER TABLE role_jobs ALTER COLUMN role_id SET NOT NULL;
+ALTER TABLE role_jobs ALTER COLUMN add SET NOT NULL;
+ALTER TABLE role_jobs ALTER COLUMN reason SET NOT NULL;
+ALTER TABLE role_jobs ALTER COLUMN attempts SET NOT NULL;
+ALTER TABLE role_jobs ALTER COLUMN created_at SET NOT NULL;
+CREATE INDEX _btree_index_role_jobs__created_at ON role_jobs USING BTREE ( ( created_at ) );
+ALTER TABLE role_jobs ADD CONSTRAINT _role_jobs_guild_id_user_id_role_id_primary_key PRIMARY KEY ( guild_id , user_id , role_id );
\ No newline at end of file
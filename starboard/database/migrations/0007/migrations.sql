@@ -0,0 +1,9 @@
+CREATE TABLE gif_urls ();
+ALTER TABLE gif_urls ADD COLUMN service TEXT;
+ALTER TABLE gif_urls ADD COLUMN gif_id TEXT;
+ALTER TABLE gif_urls ADD COLUMN url TEXT;
+ALTER TABLE gif_urls ADD COLUMN expires_at TIMESTAMPTZ;
+ALTER TABLE gif_urls ALTER COLUMN service SET NOT NULL;
+ALTER TABLE gif_urls ALTER COLUMN gif_id SET NOT NULL;
+ALTER TABLE gif_urls ALTER COLUMN expires_at SET NOT NULL;
+ALTER TABLE gif_urls ADD CONSTRAINT _gif_urls_service_gif_id_primary_key PRIMARY KEY ( service , gif_id );
\ No newline at end of file
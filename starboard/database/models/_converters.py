@@ -22,38 +22,10 @@
 
 from __future__ import annotations
 
-from decimal import Decimal
 from typing import Generic, Sequence, TypeVar
 
 import apgorm
 
-
-class NullDecimalC(apgorm.Converter["Decimal | None", "int | None"]):
-    def from_stored(self, value: Decimal | None) -> int | None:
-        return value if value is None else int(value)
-
-    def to_stored(self, value: int | None) -> Decimal | None:
-        return value if value is None else Decimal(value)
-
-
-class DecimalC(apgorm.Converter[Decimal, int]):
-    def from_stored(self, value: Decimal) -> int:
-        return int(value)
-
-    def to_stored(self, value: int) -> Decimal:
-        return Decimal(value)
-
-
-class DecimalArrayC(
-    apgorm.Converter["Sequence[Decimal | None]", "Sequence[int]"]
-):
-    def from_stored(self, value: Sequence[Decimal | None]) -> Sequence[int]:
-        return [int(v) for v in value if v is not None]
-
-    def to_stored(self, value: Sequence[int]) -> Sequence[Decimal | None]:
-        return [Decimal(v) for v in value]
-
-
 _T = TypeVar("_T")
 
 
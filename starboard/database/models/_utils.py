@@ -20,41 +20,178 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+
 from __future__ import annotations
 
-from typing import Any, TypeVar
+from typing import TYPE_CHECKING, Any, Dict, Iterable, TypeVar, cast
+
+from apgorm import (
+    BaseField,
+    Block,
+    ConverterField,
+    Model,
+    join,
+    raw,
+    sql,
+    types,
+)
+from apgorm.exceptions import UndefinedFieldValue
 
-from apgorm import Model, join, raw, sql
+if TYPE_CHECKING:
+    from apgorm.types.base_type import SqlType
+
+    from ..database import Database
 
 _T = TypeVar("_T", bound=Model)
+_Rows = Iterable[Dict[str, Any]]
 
+# what the values of each type are cast to. this is kept here instead of
+# using apgorm's private names for them
+_SQL_TYPES: dict[type[SqlType[Any]], str] = {
+    types.BigInt: "bigint",
+    types.Boolean: "boolean",
+    types.Date: "date",
+    types.Int: "int",
+    types.Json: "json",
+    types.Real: "real",
+    types.Serial: "int",
+    types.SmallInt: "smallint",
+    types.Text: "text",
+    types.TimestampTZ: "timestamptz",
+    types.VarChar: "varchar",
+}
+_FIELDS: dict[type[Model], dict[str, BaseField[Any, Any, Any]]] = {}
 
-async def goc(
-    model: type[_T], get_fields: dict[str, Any], create_fields: dict[str, Any]
-) -> _T:
-    ins = sql(
-        raw(f"INSERT INTO {model.tablename}"),
-        join(raw(","), *(raw(n) for n in create_fields), wrap=True),
-        raw("VALUES"),
-        join(raw(","), *create_fields.values(), wrap=True),
-        raw("ON CONFLICT"),
-        join(raw(","), *(raw(n) for n in get_fields), wrap=True),
-        raw("DO NOTHING RETURNING *"),
-    )
-    sel = sql(
-        raw(f"SELECT * FROM {model.tablename} WHERE"),
+
+def _sql_type(sql_type: SqlType[Any]) -> str:
+    if isinstance(sql_type, types.Array):
+        return f"{_sql_type(sql_type.subtype)}[]"
+    return _SQL_TYPES[type(sql_type)]
+
+
+def _fields(model: type[Model]) -> dict[str, BaseField[Any, Any, Any]]:
+    if (fields := _FIELDS.get(model)) is None:
+        fields = _FIELDS[model] = {
+            f.name: f
+            for f in (getattr(model, n) for n in dir(model))
+            if isinstance(f, BaseField)
+        }
+    return fields
+
+
+def _stored(model: type[Model], row: dict[str, Any]) -> dict[str, Any]:
+    # converts the values and fills in defaults
+    inst = model(**row)
+    values: dict[str, Any] = {}
+    for name, field in _fields(model).items():
+        try:
+            value = getattr(inst, name)
+        except UndefinedFieldValue:
+            # no value or default, like a serial column
+            continue
+        if isinstance(field, ConverterField):
+            value = field.converter.to_stored(value)
+        values[name] = value
+    return values
+
+
+def _unnest(sql_types: list[str], values: list[list[Any]]) -> Block[Any]:
+    return sql(
+        raw("unnest("),
         join(
-            raw("AND"),
-            *(sql(raw(k), raw("="), v) for k, v in get_fields.items()),
+            raw(","),
+            *(sql(v, raw(f"::{t}[]")) for t, v in zip(sql_types, values)),
         ),
+        raw(")"),
     )
+
+
+def _insert(
+    model: type[Model], rows: _Rows
+) -> tuple[Block[Any], list[dict[str, Any]]]:
+    # Renders an INSERT ... ON CONFLICT DO NOTHING for any number of rows.
+    # The values are passed as one array per column, so the SQL is the same
+    # regardless of how many rows there are.
+    #
+    # Columns the rows leave out use the field's default, which is passed
+    # once instead of per row. Array columns can only be left to default,
+    # since postgres can't unnest an array of arrays into rows.
+    pk = [f.name for f in model.primary_key]
+    unique: dict[tuple[Any, ...], dict[str, Any]] = {}
+    given: list[str] = []
+    for r in rows:
+        given = list(r)
+        unique[tuple(r[k] for k in pk)] = _stored(model, r)
+    values = list(unique.values())
+    assert values
+    defaults = [c for c in values[0] if c not in given]
+    fields = _fields(model)
+
+    block = sql(
+        raw(f"INSERT INTO {model.tablename}"),
+        join(raw(","), *(raw(c) for c in given + defaults), wrap=True),
+        raw("SELECT _u.*"),
+        *(
+            sql(
+                raw(","),
+                values[0][c],
+                raw(f"::{_sql_type(fields[c].sql_type)}"),
+            )
+            for c in defaults
+        ),
+        raw("FROM"),
+        _unnest(
+            [_sql_type(fields[c].sql_type) for c in given],
+            [[v[c] for v in values] for c in given],
+        ),
+        raw("AS _u ON CONFLICT"),
+        join(raw(","), *(raw(c) for c in pk), wrap=True),
+        raw("DO NOTHING"),
+    )
+    return block, values
+
+
+async def goc(
+    model: type[_T], rows: _Rows, *parents: tuple[type[Model], _Rows]
+) -> list[_T]:
+    # Gets or creates any number of rows in a single query. Every row must
+    # specify the primary key and the same set of fields. Parents are rows
+    # that need to exist first (for example, the guild and user of a member)
+    # and are inserted in the order given. Rows are returned in no
+    # particular order.
+
+    ctes: list[Block[Any]] = []
+    for x, (pmodel, prows) in enumerate(parents):
+        ins, _ = _insert(pmodel, prows)
+        ctes.append(sql(raw(f"_p{x} AS"), sql(ins, wrap=True)))
+    ins, values = _insert(model, rows)
+    ctes.append(sql(raw("_ins AS"), sql(ins, raw("RETURNING *"), wrap=True)))
+
+    # every part of the query sees the same snapshot, so the rows inserted
+    # above aren't visible to the SELECT and there are no duplicates.
+    pk = [f.name for f in model.primary_key]
     final = sql(
-        raw("WITH ins AS"),
-        sql(ins, wrap=True),
-        raw(", sel AS"),
-        sql(sel, wrap=True),
-        raw("\nSELECT * FROM ins UNION SELECT * FROM sel"),
+        raw("WITH"),
+        join(raw(","), *ctes),
+        raw(f"SELECT * FROM _ins UNION ALL SELECT * FROM {model.tablename}"),
+        raw("WHERE"),
+        join(raw(","), *(raw(c) for c in pk), wrap=True),
+        raw("IN (SELECT * FROM"),
+        _unnest(
+            [_sql_type(_fields(model)[c].sql_type) for c in pk],
+            [[v[c] for v in values] for c in pk],
+        ),
+        raw(")"),
     )
-    dct = await model.database.fetchrow(*final.render())
-    assert dct
-    return model._from_raw(**dct)
+
+    # this writes, so it's sent to the primary even where reads go to a
+    # replica
+    db = cast("Database", model.database)
+    query, params = final.render()
+    found = await db.fetchmany(query, params, read=False)
+    if len(found) < len(values):
+        # a row was inserted by another transaction after this query
+        # started, so neither the INSERT nor the SELECT returned it. Running
+        # the query again will find it.
+        found = await db.fetchmany(query, params, read=False)
+    return [model._from_raw(**r) for r in found]
@@ -30,7 +30,7 @@ from apgorm import Unique, types
 from starboard.config import CONFIG
 from starboard.exceptions import ASCNotFound
 
-from ._converters import DecimalC, NonNullArray
+from ._converters import NonNullArray
 from ._validators import num_range, str_len
 from .guild import Guild
 
@@ -40,8 +40,8 @@ class AutoStarChannel(apgorm.Model):
 
     id = types.Serial().field()
     name = types.Text().field()
-    channel_id = types.Numeric().field().with_converter(DecimalC)
-    guild_id = types.Numeric().field().with_converter(DecimalC)
+    channel_id = types.BigInt().field()
+    guild_id = types.BigInt().field()
 
     prem_locked = types.Boolean().field(default=False)
 
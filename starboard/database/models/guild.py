@@ -26,15 +26,14 @@ from typing import Iterable
 
 import apgorm
 from apgorm import types
-from asyncpg import UniqueViolationError
 
-from ._converters import DecimalC
+from ._utils import goc
 
 
 class Guild(apgorm.Model):
     __slots__: Iterable[str] = ()
 
-    guild_id = types.Numeric().field().with_converter(DecimalC)
+    guild_id = types.BigInt().field()
 
     # config options
     premium_end = types.TimestampTZ().nullablefield()
@@ -45,7 +44,4 @@ class Guild(apgorm.Model):
     # methods
     @staticmethod
     async def get_or_create(guild_id: int) -> Guild:
-        try:
-            return await Guild(guild_id=guild_id).create()
-        except UniqueViolationError:
-            return await Guild.fetch(guild_id=guild_id)
+        return (await goc(Guild, [{"guild_id": guild_id}]))[0]
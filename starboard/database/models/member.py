@@ -26,11 +26,10 @@ from typing import Iterable
 
 import apgorm
 from apgorm import types
-from asyncpg import UniqueViolationError
 
 from starboard.config import CONFIG
 
-from ._converters import DecimalC
+from ._utils import goc
 from ._validators import num_range
 from .guild import Guild
 from .user import User
@@ -39,8 +38,8 @@ from .user import User
 class Member(apgorm.Model):
     __slots__: Iterable[str] = ()
 
-    user_id = types.Numeric().field().with_converter(DecimalC)
-    guild_id = types.Numeric().field().with_converter(DecimalC)
+    user_id = types.BigInt().field()
+    guild_id = types.BigInt().field()
 
     xp = types.Real().field(default=0)
 
@@ -58,15 +57,17 @@ class Member(apgorm.Model):
     async def get_or_create(
         guild_id: int, user_id: int, is_bot: bool
     ) -> Member:
-        if (
-            m := await Member.exists(guild_id=guild_id, user_id=user_id)
-        ) is not None:
-            return m
+        members = await Member.get_or_create_many(guild_id, {user_id: is_bot})
+        return members[0]
 
-        await Guild.get_or_create(guild_id)
-        await User.get_or_create(user_id, is_bot)
-
-        try:
-            return await Member(guild_id=guild_id, user_id=user_id).create()
-        except UniqueViolationError:
-            return await Member.fetch(guild_id=guild_id, user_id=user_id)
+    @staticmethod
+    async def get_or_create_many(
+        guild_id: int, users: dict[int, bool]
+    ) -> list[Member]:
+        # users is user_id: is_bot
+        return await goc(
+            Member,
+            [{"guild_id": guild_id, "user_id": uid} for uid in users],
+            (Guild, [{"guild_id": guild_id}]),
+            (User, [{"user_id": u, "is_bot": b} for u, b in users.items()]),
+        )
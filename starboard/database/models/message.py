@@ -26,9 +26,9 @@ from typing import Iterable
 
 import apgorm
 from apgorm import types
-from asyncpg import UniqueViolationError
 
-from ._converters import DecimalC, NonNullArray
+from ._converters import NonNullArray
+from ._utils import goc
 from .guild import Guild
 from .member import Member
 from .user import User
@@ -37,10 +37,10 @@ from .user import User
 class Message(apgorm.Model):
     __slots__: Iterable[str] = ()
 
-    message_id = types.Numeric().field().with_converter(DecimalC)
-    guild_id = types.Numeric().field().with_converter(DecimalC)
-    channel_id = types.Numeric().field().with_converter(DecimalC)
-    author_id = types.Numeric().field().with_converter(DecimalC)
+    message_id = types.BigInt().field()
+    guild_id = types.BigInt().field()
+    channel_id = types.BigInt().field()
+    author_id = types.BigInt().field()
 
     is_nsfw = types.Boolean().field()
 
@@ -67,19 +67,24 @@ class Message(apgorm.Model):
         is_nsfw: bool,
         author_id: int,
         is_author_bot: bool,
+        members: dict[int, bool] | None = None,
     ) -> Message:
-        if (m := await Message.exists(message_id=message_id)) is not None:
-            return m
-
-        await Member.get_or_create(guild_id, author_id, is_author_bot)
-
-        try:
-            return await Message(
-                guild_id=guild_id,
-                author_id=author_id,
-                channel_id=channel_id,
-                message_id=message_id,
-                is_nsfw=is_nsfw,
-            ).create()
-        except UniqueViolationError:
-            return await Message.fetch(message_id=message_id)
+        # members (user_id: is_bot) are any other members that should be
+        # created in the same query, such as the user who reacted.
+        users = {author_id: is_author_bot, **(members or {})}
+        msg = await goc(
+            Message,
+            [
+                {
+                    "message_id": message_id,
+                    "guild_id": guild_id,
+                    "channel_id": channel_id,
+                    "author_id": author_id,
+                    "is_nsfw": is_nsfw,
+                }
+            ],
+            (Guild, [{"guild_id": guild_id}]),
+            (User, [{"user_id": u, "is_bot": b} for u, b in users.items()]),
+            (Member, [{"guild_id": guild_id, "user_id": u} for u in users]),
+        )
+        return msg[0]
@@ -30,7 +30,7 @@ from apgorm import ForeignKey, Model, types
 from starboard.config import CONFIG
 from starboard.exceptions import OverrideNotFound
 
-from ._converters import DecimalArrayC, DecimalC
+from ._converters import NonNullArray
 from ._validators import array_len, str_len
 from .guild import Guild
 from .starboard import Starboard
@@ -40,15 +40,15 @@ class Override(Model):
     __slots__: Iterable[str] = "__loaded_overrides"
 
     id = types.Serial().field()
-    guild_id = types.Numeric().field().with_converter(DecimalC)
+    guild_id = types.BigInt().field()
     name = types.Text().field()
 
     starboard_id = types.Int().field()
 
     channel_ids = (
-        types.Array(types.Numeric())
+        types.Array(types.BigInt())
         .field(default_factory=list)
-        .with_converter(DecimalArrayC)
+        .with_converter(NonNullArray(int))
     )
 
     _overrides = types.Json().field(default="{}")
@@ -64,7 +64,8 @@ class Override(Model):
 
     @property
     def overrides(self) -> dict[str, Any]:
-        if not hasattr(self, "__loaded_overrides"):
+        # the attribute name is mangled, so hasattr needs the mangled name
+        if not hasattr(self, "_Override__loaded_overrides"):
             self.__loaded_overrides = json.loads(self._overrides)
         return self.__loaded_overrides  # type: ignore
 
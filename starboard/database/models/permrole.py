@@ -26,7 +26,6 @@ from typing import Iterable
 
 from apgorm import ForeignKey, Model, types
 
-from ._converters import DecimalC
 from .guild import Guild
 from .starboard import Starboard
 
@@ -34,8 +33,8 @@ from .starboard import Starboard
 class PermRole(Model):
     __slots__: Iterable[str] = ()
 
-    role_id = types.Numeric().field().with_converter(DecimalC)
-    guild_id = types.Numeric().field().with_converter(DecimalC)
+    role_id = types.BigInt().field()
+    guild_id = types.BigInt().field()
 
     xproles = types.Boolean().nullablefield()
     vote = types.Boolean().nullablefield()
@@ -49,7 +48,7 @@ class PermRole(Model):
 class PermRoleStarboard(Model):
     __slots__: Iterable[str] = ()
 
-    permrole_id = types.Numeric().field().with_converter(DecimalC)
+    permrole_id = types.BigInt().field()
     starboard_id = types.Int().field()
 
     vote = types.Boolean().nullablefield()
@@ -29,7 +29,6 @@ from apgorm import types
 
 from starboard.config import CONFIG
 
-from ._converters import DecimalC
 from ._validators import num_range
 from .guild import Guild
 from .user import User
@@ -38,8 +37,8 @@ from .user import User
 class PosRole(apgorm.Model):
     __slots__: Iterable[str] = ()
 
-    role_id = types.Numeric().field().with_converter(DecimalC)
-    guild_id = types.Numeric().field().with_converter(DecimalC)
+    role_id = types.BigInt().field()
+    guild_id = types.BigInt().field()
     max_members = types.Int().field()
 
     guild_id_fk = apgorm.ForeignKey(guild_id, Guild.guild_id)
@@ -54,8 +53,8 @@ class PosRole(apgorm.Model):
 class PosRoleMember(apgorm.Model):
     __slots__: Iterable[str] = ()
 
-    role_id = types.Numeric().field().with_converter(DecimalC)
-    user_id = types.Numeric().field().with_converter(DecimalC)
+    role_id = types.BigInt().field()
+    user_id = types.BigInt().field()
 
     role_id_fk = apgorm.ForeignKey(role_id, PosRole.role_id)
     user_id_fk = apgorm.ForeignKey(user_id, User.user_id)
@@ -0,0 +1,53 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Iterable
+
+import apgorm
+from apgorm import types
+
+
+class RoleJob(apgorm.Model):
+    # A role that should be added to or removed from a member. Jobs are
+    # applied by the cluster the guild's shard is on, and a newer job for the
+    # same role replaces an older one. There's no foreign key to guilds, since
+    # supporter roles are given in the main guild, which doesn't have to be
+    # in the database.
+
+    __slots__: Iterable[str] = ()
+
+    guild_id = types.BigInt().field()
+    user_id = types.BigInt().field()
+    role_id = types.BigInt().field()
+
+    add = types.Boolean().field()
+    reason = types.Text().field()
+    attempts = types.SmallInt().field(default=0)
+    created_at = types.TimestampTZ().field(
+        default_factory=lambda: datetime.now(timezone.utc)
+    )
+
+    primary_key = (guild_id, user_id, role_id)
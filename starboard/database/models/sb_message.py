@@ -27,7 +27,6 @@ from typing import Iterable
 import apgorm
 from apgorm import types
 
-from ._converters import DecimalC, NullDecimalC
 from .message import Message
 from .starboard import Starboard
 
@@ -35,11 +34,9 @@ from .starboard import Starboard
 class SBMessage(apgorm.Model):
     __slots__: Iterable[str] = ()
 
-    message_id = types.Numeric().field().with_converter(DecimalC)
+    message_id = types.BigInt().field()
     starboard_id = types.Int().field()
-    sb_message_id = (
-        types.Numeric().nullablefield().with_converter(NullDecimalC)
-    )
+    sb_message_id = types.BigInt().nullablefield()
 
     last_known_point_count = types.SmallInt().field(default=0)
 
@@ -32,7 +32,7 @@ from starboard.config import CONFIG
 from starboard.exceptions import StarboardNotFound
 from starboard.utils import seconds_to_human
 
-from ._converters import DecimalC, NonNullArray, NullDecimalC
+from ._converters import NonNullArray
 from ._validators import num_range, str_len, valid_emoji
 from .guild import Guild
 
@@ -110,10 +110,10 @@ class Starboard(apgorm.Model):
 
     id = types.Serial().field()
     name = types.Text().field()
-    channel_id = types.Numeric().field().with_converter(DecimalC)
-    guild_id = types.Numeric().field().with_converter(DecimalC)
+    channel_id = types.BigInt().field()
+    guild_id = types.BigInt().field()
 
-    webhook_id = types.Numeric().nullablefield().with_converter(NullDecimalC)
+    webhook_id = types.BigInt().nullablefield()
     prem_locked = types.Boolean().field(default=False)
 
     # General Style
@@ -27,9 +27,8 @@ from typing import Iterable
 
 import apgorm
 from apgorm import types
-from asyncpg import UniqueViolationError
 
-from ._converters import DecimalC, NullDecimalC
+from ._utils import goc
 
 
 class PatreonStatus(IntEnum):
@@ -42,7 +41,7 @@ class PatreonStatus(IntEnum):
 class User(apgorm.Model):
     __slots__: Iterable[str] = ()
 
-    user_id = types.Numeric().field().with_converter(DecimalC)
+    user_id = types.BigInt().field()
 
     is_bot = types.Boolean().field()
     credits = types.Int().field(default=0)
@@ -60,17 +59,14 @@ class User(apgorm.Model):
     # methods
     @staticmethod
     async def get_or_create(user_id: int, is_bot: bool) -> User:
-        try:
-            return await User(user_id=user_id, is_bot=is_bot).create()
-        except UniqueViolationError:
-            return await User.fetch(user_id=user_id)
+        return (await goc(User, [{"user_id": user_id, "is_bot": is_bot}]))[0]
 
 
 class Patron(apgorm.Model):
     __slots__: Iterable[str] = ()
 
     patreon_id = types.VarChar(64).field()
-    discord_id = types.Numeric().nullablefield().with_converter(NullDecimalC)
+    discord_id = types.BigInt().nullablefield()
     last_patreon_total_cents = types.BigInt().field(default=0)
 
     primary_key = (patreon_id,)
@@ -78,7 +74,4 @@ class Patron(apgorm.Model):
     # methods
     @staticmethod
     async def get_or_create(patreon_id: str) -> Patron:
-        try:
-            return await Patron(patreon_id=patreon_id).create()
-        except UniqueViolationError:
-            return await Patron.fetch(patreon_id=patreon_id)
+        return (await goc(Patron, [{"patreon_id": patreon_id}]))[0]
@@ -22,12 +22,12 @@
 
 from __future__ import annotations
 
+from datetime import datetime, timezone
 from typing import Iterable
 
 import apgorm
 from apgorm import types
 
-from ._converters import DecimalC
 from .message import Message
 from .starboard import Starboard
 from .user import User
@@ -36,12 +36,15 @@ from .user import User
 class Vote(apgorm.Model):
     __slots__: Iterable[str] = ()
 
-    message_id = types.Numeric().field().with_converter(DecimalC)
+    message_id = types.BigInt().field()
     starboard_id = types.Int().field()
-    user_id = types.Numeric().field().with_converter(DecimalC)
+    user_id = types.BigInt().field()
 
-    target_author_id = types.Numeric().field().with_converter(DecimalC)
+    target_author_id = types.BigInt().field()
     is_downvote = types.Boolean().field(default=False)
+    created_at = types.TimestampTZ().field(
+        default_factory=lambda: datetime.now(timezone.utc)
+    )
 
     message_id_fk = apgorm.ForeignKey(message_id, Message.message_id)
     starboard_id_fk = apgorm.ForeignKey(starboard_id, Starboard.id)
@@ -49,3 +52,21 @@ class Vote(apgorm.Model):
     target_author_id_fk = apgorm.ForeignKey(target_author_id, User.user_id)
 
     primary_key = (message_id, starboard_id, user_id)
+
+
+class VoteRollup(apgorm.Model):
+    # The number of votes each author got on each starboard per (UTC) day.
+    # Maintained by triggers on votes (see migration 0003).
+
+    __slots__: Iterable[str] = ()
+
+    starboard_id = types.Int().field()
+    day = types.Date().field()
+    target_author_id = types.BigInt().field()
+
+    upvotes = types.Int().field(default=0)
+    downvotes = types.Int().field(default=0)
+
+    starboard_id_fk = apgorm.ForeignKey(starboard_id, Starboard.id)
+
+    primary_key = (starboard_id, day, target_author_id)
@@ -29,7 +29,6 @@ from apgorm import types
 
 from starboard.config import CONFIG
 
-from ._converters import DecimalC
 from ._validators import num_range
 from .guild import Guild
 
@@ -37,8 +36,8 @@ from .guild import Guild
 class XPRole(apgorm.Model):
     __slots__: Iterable[str] = ()
 
-    role_id = types.Numeric().field().with_converter(DecimalC)
-    guild_id = types.Numeric().field().with_converter(DecimalC)
+    role_id = types.BigInt().field()
+    guild_id = types.BigInt().field()
     required = types.SmallInt().field()
 
     guild_id_fk = apgorm.ForeignKey(guild_id, Guild.guild_id)
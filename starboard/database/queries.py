@@ -0,0 +1,415 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
+
+import apgorm
+import asyncpg
+
+from .models import (
+    aschannel,
+    gif_url,
+    guild,
+    member,
+    message,
+    override,
+    permrole,
+    posrole,
+    role_job,
+    sb_message,
+    starboard,
+    user,
+    vote,
+    xprole,
+)
+
+if TYPE_CHECKING:
+    from .database import Database
+
+_T = TypeVar("_T", bound=apgorm.Model)
+
+STATEMENTS: dict[str, Statement[Any]] = {}
+
+
+class Statement(Generic[_T]):
+    # The query builder re-renders SQL on every call, and queries that inline
+    # a variable number of values get a different query string each time.
+    # asyncpg caches prepared statements by query text, so statements here
+    # have fixed SQL (arrays are passed as parameters) to always hit it.
+    #
+    # Statements that don't return rows (counts, etc.) still specify the
+    # model of the table they query, which is used to find the database.
+
+    __slots__ = ("name", "model", "query")
+
+    def __init__(self, name: str, model: type[_T], query: str) -> None:
+        assert name not in STATEMENTS, f"Duplicate statement {name}."
+
+        self.name = name
+        self.model = model
+        self.query = " ".join(query.split())
+
+        STATEMENTS[name] = self
+
+    @property
+    def database(self) -> Database:
+        return self.model.database  # type: ignore
+
+    async def fetchone(self, *params: Any) -> _T | None:
+        row = await self.database.run_statement(self, "fetchrow", params)
+        if row is None:
+            return None
+        return self.model._from_raw(**row)
+
+    async def fetchmany(self, *params: Any) -> list[_T]:
+        rows = await self.database.run_statement(self, "fetch", params)
+        return [self.model._from_raw(**r) for r in rows]
+
+    async def fetchraw(self, *params: Any) -> list[asyncpg.Record]:
+        rows: list[asyncpg.Record] = await self.database.run_statement(
+            self, "fetch", params
+        )
+        return rows
+
+    async def fetchval(self, *params: Any) -> Any:
+        return await self.database.run_statement(self, "fetchval", params)
+
+    async def execute(self, *params: Any) -> None:
+        await self.database.run_statement(self, "execute", params)
+
+    def __repr__(self) -> str:
+        return f"<Statement {self.name}>"
+
+
+# guilds, users & members
+GUILD = Statement(
+    "guild", guild.Guild, "SELECT * FROM guilds WHERE guild_id=$1"
+)
+USER = Statement("user", user.User, "SELECT * FROM users WHERE user_id=$1")
+MEMBER = Statement(
+    "member",
+    member.Member,
+    "SELECT * FROM members WHERE guild_id=$1 AND user_id=$2",
+)
+LEADERBOARD = Statement(
+    "leaderboard",
+    member.Member,
+    """SELECT * FROM members WHERE guild_id=$1 AND xp > 0
+    ORDER BY xp DESC LIMIT $2""",
+)
+LEADERBOARD_XP = Statement(
+    "leaderboard_xp",
+    member.Member,
+    "SELECT user_id, xp FROM members WHERE guild_id=$1 AND xp > 0",
+)
+# ranks are by XP (highest first), with ties broken by user id, and only
+# members with more than 0 XP are ranked
+MEMBER_RANK = Statement(
+    "member_rank",
+    member.Member,
+    """SELECT m.xp, 1 + (
+        SELECT count(*) FROM members
+        WHERE guild_id=$1 AND xp > m.xp
+    ) + (
+        SELECT count(*) FROM members
+        WHERE guild_id=$1 AND xp = m.xp AND user_id < m.user_id
+    ) AS rank
+    FROM members m WHERE guild_id=$1 AND user_id=$2 AND xp > 0""",
+)
+# the $3 members ranked just above and below a member, closest first
+MEMBER_NEIGHBORS = Statement(
+    "member_neighbors",
+    member.Member,
+    """WITH me AS (
+        SELECT xp, user_id FROM members WHERE guild_id=$1 AND user_id=$2
+    )
+    (
+        SELECT user_id, xp, false AS below FROM members
+        WHERE guild_id=$1 AND xp >= (SELECT xp FROM me)
+            AND (
+                xp > (SELECT xp FROM me)
+                OR user_id < (SELECT user_id FROM me)
+            )
+        ORDER BY xp ASC, user_id DESC LIMIT $3
+    ) UNION ALL (
+        SELECT user_id, xp, true AS below FROM members
+        WHERE guild_id=$1 AND xp > 0 AND xp <= (SELECT xp FROM me)
+            AND (
+                xp < (SELECT xp FROM me)
+                OR user_id > (SELECT user_id FROM me)
+            )
+        ORDER BY xp DESC, user_id ASC LIMIT $3
+    )""",
+)
+
+# starboards & overrides
+STARBOARDS = Statement(
+    "starboards",
+    starboard.Starboard,
+    "SELECT * FROM starboards WHERE guild_id=$1",
+)
+UNLOCKED_STARBOARDS = Statement(
+    "unlocked_starboards",
+    starboard.Starboard,
+    "SELECT * FROM starboards WHERE guild_id=$1 AND prem_locked=false",
+)
+UNLOCKED_STARBOARDS_BY_ID = Statement(
+    "unlocked_starboards_by_id",
+    starboard.Starboard,
+    """SELECT * FROM starboards WHERE id = ANY($1::int[])
+    AND prem_locked=false""",
+)
+CHANNEL_OVERRIDES = Statement(
+    "channel_overrides",
+    override.Override,
+    """SELECT * FROM overrides WHERE starboard_id=$1
+    AND channel_ids && $2::bigint[]""",
+)
+
+# messages
+MESSAGE = Statement(
+    "message", message.Message, "SELECT * FROM messages WHERE message_id=$1"
+)
+SBMESSAGE = Statement(
+    "sbmessage",
+    sb_message.SBMessage,
+    "SELECT * FROM sb_messages WHERE message_id=$1 AND starboard_id=$2",
+)
+SBMESSAGE_BY_SB_MESSAGE_ID = Statement(
+    "sbmessage_by_sb_message_id",
+    sb_message.SBMessage,
+    "SELECT * FROM sb_messages WHERE sb_message_id=$1",
+)
+# /random picks a random snowflake between the first and last posted
+# message and takes the nearest match after it (or before it, if there are
+# none after), instead of sorting every match by random(). Messages that
+# follow a long gap are a bit more likely to be picked.
+# $2 is the channel, $3 and $4 the min and max points (NULL for any) and
+# $5 whether to allow NSFW messages.
+_SBMESSAGE_FILTER = """s.starboard_id=$1 AND s.sb_message_id IS NOT NULL
+    AND NOT m.trashed AND ($5 OR NOT m.is_nsfw)
+    AND ($2::bigint IS NULL OR m.channel_id=$2)
+    AND ($3::smallint IS NULL OR s.last_known_point_count >= $3)
+    AND ($4::smallint IS NULL OR s.last_known_point_count <= $4)"""
+RANDOM_SBMESSAGE = Statement(
+    "random_sbmessage",
+    sb_message.SBMessage,
+    f"""WITH pivot AS (
+        SELECT min(message_id)
+            + ((max(message_id) - min(message_id)) * random())::bigint AS id
+        FROM sb_messages WHERE starboard_id=$1 AND sb_message_id IS NOT NULL
+    )
+    (
+        SELECT s.* FROM sb_messages s JOIN messages m USING (message_id)
+        WHERE {_SBMESSAGE_FILTER}
+            AND s.message_id >= (SELECT id FROM pivot)
+        ORDER BY s.message_id LIMIT 1
+    ) UNION ALL (
+        SELECT s.* FROM sb_messages s JOIN messages m USING (message_id)
+        WHERE {_SBMESSAGE_FILTER}
+            AND s.message_id < (SELECT id FROM pivot)
+        ORDER BY s.message_id DESC LIMIT 1
+    ) LIMIT 1""",
+)
+# /moststarred pages through this instead of using a cursor, since cursors
+# opened over the protocol are planned to return every row, which means
+# sorting them all. $1 to $5 are the same as for RANDOM_SBMESSAGE, $6 and
+# $7 the points and message_id of the last row of the previous page (NULL
+# for the first page) and $8 the page size.
+MOSTSTARRED = Statement(
+    "moststarred",
+    sb_message.SBMessage,
+    f"""SELECT s.* FROM sb_messages s JOIN messages m USING (message_id)
+    WHERE {_SBMESSAGE_FILTER}
+        AND ($6::smallint IS NULL
+            OR (s.last_known_point_count, s.message_id) < ($6, $7::bigint))
+    ORDER BY s.last_known_point_count DESC, s.message_id DESC LIMIT $8""",
+)
+
+# votes
+MESSAGE_POINTS = Statement(
+    "message_points",
+    vote.Vote,
+    """SELECT count(*) FILTER (WHERE NOT is_downvote)
+        - count(*) FILTER (WHERE is_downvote)
+    FROM votes WHERE message_id=$1 AND starboard_id=$2""",
+)
+AUTHOR_XP = Statement(
+    "author_xp",
+    vote.Vote,
+    """SELECT coalesce(sum(v.points * s.xp_multiplier), 0)
+    FROM starboards s JOIN (
+        SELECT starboard_id, count(*) FILTER (WHERE NOT is_downvote)
+            - count(*) FILTER (WHERE is_downvote) AS points
+        FROM votes WHERE target_author_id=$2 GROUP BY starboard_id
+    ) v ON v.starboard_id=s.id
+    WHERE s.guild_id=$1""",
+)
+# $3 and $4 are the range of whole days to use rollups for (NULL for no
+# limit), and $5 is false if there are none. $6 to $9 are two ranges of
+# vote times to count individually (NULL for none).
+CUSTOM_LEADERBOARD = Statement(
+    "custom_leaderboard",
+    vote.VoteRollup,
+    """SELECT target_author_id, sum(points) AS points FROM (
+        SELECT target_author_id, upvotes - downvotes AS points
+        FROM vote_rollups WHERE starboard_id=$1 AND $5
+            AND ($3::date IS NULL OR day >= $3)
+            AND ($4::date IS NULL OR day < $4)
+        UNION ALL
+        SELECT target_author_id, CASE WHEN is_downvote THEN -1 ELSE 1 END
+        FROM votes WHERE starboard_id=$1 AND (
+            (created_at >= $6 AND created_at < $7)
+            OR (created_at >= $8 AND created_at < $9)
+        )
+    ) p GROUP BY target_author_id ORDER BY points DESC LIMIT $2""",
+)
+UPSERT_VOTES = Statement(
+    "upsert_votes",
+    vote.Vote,
+    """INSERT INTO votes
+        (message_id, user_id, starboard_id, target_author_id, is_downvote)
+    SELECT $1, $2, sbid, $3, $4 FROM unnest($5::int[]) AS sbid
+    ON CONFLICT (message_id, starboard_id, user_id)
+    DO UPDATE SET is_downvote=EXCLUDED.is_downvote
+    WHERE votes.is_downvote <> EXCLUDED.is_downvote""",
+)
+DELETE_VOTES = Statement(
+    "delete_votes",
+    vote.Vote,
+    """DELETE FROM votes WHERE message_id=$1 AND user_id=$2
+    AND starboard_id = ANY($3::int[])""",
+)
+
+# permroles
+PERMROLES = Statement(
+    "permroles", permrole.PermRole, "SELECT * FROM permroles WHERE guild_id=$1"
+)
+PERMROLE_STARBOARDS = Statement(
+    "permrole_starboards",
+    permrole.PermRoleStarboard,
+    "SELECT * FROM permrole_starboards WHERE permrole_id = ANY($1::bigint[])",
+)
+
+# autostar channels
+ASCHANNELS_FOR_SHARDS = Statement(
+    "aschannels_for_shards",
+    aschannel.AutoStarChannel,
+    """SELECT * FROM aschannels WHERE (guild_id >> 22) % $1 = ANY($2::int[])
+    AND id > $3 ORDER BY id LIMIT $4""",
+)
+
+# award roles
+XPROLES = Statement(
+    "xproles", xprole.XPRole, "SELECT * FROM xproles WHERE guild_id=$1"
+)
+POSROLES = Statement(
+    "posroles",
+    posrole.PosRole,
+    "SELECT * FROM posroles WHERE guild_id=$1 ORDER BY max_members ASC",
+)
+POSROLE_MEMBERS = Statement(
+    "posrole_members",
+    posrole.PosRoleMember,
+    "SELECT * FROM posrole_members WHERE role_id = ANY($1::bigint[])",
+)
+POSROLE_MEMBERS_ADD = Statement(
+    "posrole_members_add",
+    posrole.PosRoleMember,
+    """INSERT INTO posrole_members (role_id, user_id)
+    SELECT * FROM unnest($1::bigint[], $2::bigint[])
+    ON CONFLICT DO NOTHING""",
+)
+POSROLE_MEMBERS_REMOVE = Statement(
+    "posrole_members_remove",
+    posrole.PosRoleMember,
+    """DELETE FROM posrole_members
+    WHERE (role_id, user_id) IN (
+        SELECT * FROM unnest($1::bigint[], $2::bigint[])
+    )""",
+)
+
+# role jobs
+ENQUEUE_ROLE_JOBS = Statement(
+    "enqueue_role_jobs",
+    role_job.RoleJob,
+    """INSERT INTO role_jobs
+        (guild_id, user_id, role_id, add, reason, attempts, created_at)
+    SELECT $1, *, $5, 0, now()
+    FROM unnest($2::bigint[], $3::bigint[], $4::bool[])
+    ON CONFLICT (guild_id, user_id, role_id) DO UPDATE
+    SET add=EXCLUDED.add, reason=EXCLUDED.reason, attempts=0,
+        created_at=EXCLUDED.created_at""",
+)
+# $1 is the shard count and $2 the shards of the cluster
+ROLE_JOBS = Statement(
+    "role_jobs",
+    role_job.RoleJob,
+    """SELECT * FROM role_jobs WHERE (guild_id >> 22) % $1 = ANY($2::int[])
+    ORDER BY created_at LIMIT $3""",
+)
+# jobs are only deleted if they weren't replaced while being applied
+DELETE_ROLE_JOBS = Statement(
+    "delete_role_jobs",
+    role_job.RoleJob,
+    """DELETE FROM role_jobs WHERE (guild_id, user_id, role_id, created_at)
+    IN (
+        SELECT * FROM unnest(
+            $1::bigint[], $2::bigint[], $3::bigint[], $4::timestamptz[]
+        )
+    )""",
+)
+RETRY_ROLE_JOBS = Statement(
+    "retry_role_jobs",
+    role_job.RoleJob,
+    """UPDATE role_jobs SET attempts = attempts + 1
+    WHERE (guild_id, user_id, role_id, created_at) IN (
+        SELECT * FROM unnest(
+            $1::bigint[], $2::bigint[], $3::bigint[], $4::timestamptz[]
+        )
+    )""",
+)
+
+# gifs
+GIF_URLS = Statement(
+    "gif_urls",
+    gif_url.GifUrl,
+    """SELECT * FROM gif_urls WHERE service=$1 AND gif_id = ANY($2::text[])
+    AND expires_at > now()""",
+)
+# $3 is the urls (null if the gif wasn't found) and $4 how long they're kept
+UPSERT_GIF_URLS = Statement(
+    "upsert_gif_urls",
+    gif_url.GifUrl,
+    """INSERT INTO gif_urls (service, gif_id, url, expires_at)
+    SELECT $1, g.id, g.url, now() + g.ttl * interval '1 second'
+    FROM unnest($2::text[], $3::text[], $4::int[]) g(id, url, ttl)
+    ON CONFLICT (service, gif_id) DO UPDATE
+    SET url=EXCLUDED.url, expires_at=EXCLUDED.expires_at""",
+)
+DELETE_EXPIRED_GIF_URLS = Statement(
+    "delete_expired_gif_urls",
+    gif_url.GifUrl,
+    "DELETE FROM gif_urls WHERE expires_at <= now()",
+)
@@ -22,11 +22,17 @@
 
 from __future__ import annotations
 
+from typing import TYPE_CHECKING, cast
+
 import crescent
 import hikari
 
 from starboard.core import autostar
 
+if TYPE_CHECKING:
+    from starboard.bot import Bot
+
+
 plugin = crescent.Plugin()
 
 
@@ -34,3 +40,22 @@ plugin = crescent.Plugin()
 @crescent.event
 async def on_msg(event: hikari.GuildMessageCreateEvent) -> None:
     await autostar.handle_message(event)
+
+
+@plugin.include
+@crescent.event
+async def on_msg_update(event: hikari.GuildMessageUpdateEvent) -> None:
+    autostar.handle_message_update(event)
+
+
+@plugin.include
+@crescent.event
+async def on_guild_join(event: hikari.GuildJoinEvent) -> None:
+    # the guild might have had autostar channels before
+    await cast("Bot", event.app).database.refresh_asc(event.guild_id)
+
+
+@plugin.include
+@crescent.event
+async def on_guild_leave(event: hikari.GuildLeaveEvent) -> None:
+    cast("Bot", event.app).database.forget_asc(event.guild_id)
@@ -22,21 +22,38 @@
 
 from __future__ import annotations
 
+from typing import TYPE_CHECKING, cast
+
 import crescent
 import hikari
 
 from starboard.core import reactions
 
+if TYPE_CHECKING:
+    from starboard.bot import Bot
+
+
 plugin = crescent.Plugin()
 
+# the most queries handling a reaction should make. benchmarks.reaction_storm
+# peaks at 43 adding and 23 removing with its default guilds (3 starboards,
+# 2 overrides, 2 permroles). permroles are fetched for each starboard, so
+# guilds with many of both can go over these
+REACTION_ADD_BUDGET = 48
+REACTION_REMOVE_BUDGET = 30
+
 
 @plugin.include
 @crescent.event
 async def on_reaction_add(event: hikari.GuildReactionAddEvent):
-    await reactions.handle_reaction_add(event)
+    db = cast("Bot", event.app).database
+    with db.count_queries("reaction_add", REACTION_ADD_BUDGET):
+        await reactions.handle_reaction_add(event)
 
 
 @plugin.include
 @crescent.event
 async def on_reaction_delete(event: hikari.GuildReactionDeleteEvent):
-    await reactions.handle_reaction_remove(event)
+    db = cast("Bot", event.app).database
+    with db.count_queries("reaction_remove", REACTION_REMOVE_BUDGET):
+        await reactions.handle_reaction_remove(event)
@@ -0,0 +1,192 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import bisect
+from typing import Any, Sequence
+
+# upper bounds, in milliseconds
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1_000,
+    2_500,
+    5_000,
+    10_000,
+)
+# upper bounds for the number of queries an event or command makes
+QUERY_COUNT_BUCKETS: tuple[float, ...] = (
+    0,
+    1,
+    2,
+    3,
+    5,
+    8,
+    13,
+    20,
+    30,
+    50,
+    75,
+    100,
+    200,
+)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "total", "max")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        # the last count is for values larger than the largest bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        # estimated by interpolating within the bucket the percentile falls
+        # in, so it's only as accurate as the buckets are
+        if not self.count:
+            return 0.0
+
+        target = self.count * p / 100
+        seen = 0
+        for x, c in enumerate(self.counts):
+            if c and seen + c >= target:
+                break
+            seen += c
+
+        lower = self.buckets[x - 1] if x else 0.0
+        upper = self.buckets[x] if x < len(self.buckets) else self.max
+        est = lower + (upper - lower) * (target - seen) / c
+        return min(est, self.max)
+
+    def merge(self, other: Histogram) -> None:
+        assert self.buckets == other.buckets
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "buckets": list(self.buckets),
+            "counts": self.counts,
+            "total": self.total,
+            "max": self.max,
+        }
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> Histogram:
+        h = Histogram(data["buckets"])
+        h.counts = list(data["counts"])
+        h.count = sum(h.counts)
+        h.total = data["total"]
+        h.max = data["max"]
+        return h
+
+
+class QueryStats:
+    __slots__ = ("latency", "rows", "acquire", "queries")
+
+    def __init__(self) -> None:
+        self.latency: dict[str, Histogram] = {}
+        self.rows: dict[str, int] = {}
+        self.acquire = Histogram()
+        # queries made by each event or command, by name
+        self.queries: dict[str, Histogram] = {}
+
+    def record(self, shape: str, ms: float, rows: int) -> None:
+        if (h := self.latency.get(shape)) is None:
+            h = self.latency[shape] = Histogram()
+            self.rows[shape] = 0
+        h.observe(ms)
+        self.rows[shape] += rows
+
+    def record_queries(self, name: str, count: int) -> None:
+        if (h := self.queries.get(name)) is None:
+            h = self.queries[name] = Histogram(QUERY_COUNT_BUCKETS)
+        h.observe(count)
+
+    def reset(self) -> None:
+        self.latency.clear()
+        self.rows.clear()
+        self.acquire = Histogram()
+        self.queries.clear()
+
+    def merge(self, other: QueryStats) -> None:
+        for shape, h in other.latency.items():
+            if (mine := self.latency.get(shape)) is None:
+                self.latency[shape] = mine = Histogram(h.buckets)
+                self.rows[shape] = 0
+            mine.merge(h)
+            self.rows[shape] += other.rows[shape]
+        self.acquire.merge(other.acquire)
+        for name, h in other.queries.items():
+            if (mine := self.queries.get(name)) is None:
+                self.queries[name] = mine = Histogram(h.buckets)
+            mine.merge(h)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "latency": {s: h.to_dict() for s, h in self.latency.items()},
+            "rows": self.rows,
+            "acquire": self.acquire.to_dict(),
+            "queries": {n: h.to_dict() for n, h in self.queries.items()},
+        }
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> QueryStats:
+        s = QueryStats()
+        s.latency = {
+            k: Histogram.from_dict(v) for k, v in data["latency"].items()
+        }
+        s.rows = dict(data["rows"])
+        s.acquire = Histogram.from_dict(data["acquire"])
+        # clusters that haven't been restarted yet don't send these
+        s.queries = {
+            k: Histogram.from_dict(v)
+            for k, v in data.get("queries", {}).items()
+        }
+        return s
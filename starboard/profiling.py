@@ -0,0 +1,157 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from functools import lru_cache
+from types import FrameType
+
+from starboard.config import CONFIG
+from starboard.metrics import Histogram
+
+# only one profile can run at a time on each cluster
+_PROFILE_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=4_096)
+def _short_path(path: str) -> str:
+    for p in sorted(sys.path, key=len, reverse=True):
+        if p and path.startswith(p + os.sep):
+            return path[len(p) + 1 :]
+    return path
+
+
+def collapse_stack(frame: FrameType | None) -> str:
+    # the collapsed stack format used by flamegraph.pl and speedscope:
+    # frames from the outermost to the innermost, separated by semicolons
+    stack: list[str] = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(
+            f"{code.co_name} ({_short_path(code.co_filename)}:"
+            f"{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+async def profile(seconds: float, interval: float) -> Counter[str]:
+    # Samples the stack of the thread running the event loop every interval
+    # seconds from another thread, so it also catches code that blocks the
+    # loop. Time the loop spends waiting for IO shows up as the stack that
+    # started the loop.
+    if not _PROFILE_LOCK.acquire(blocking=False):
+        raise RuntimeError("A profile is already running.")
+
+    stacks: Counter[str] = Counter()
+    target = threading.get_ident()
+    stop = threading.Event()
+
+    def sample() -> None:
+        while not stop.wait(interval):
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                stacks[collapse_stack(frame)] += 1
+
+    thread = threading.Thread(target=sample, name="profiler", daemon=True)
+    try:
+        thread.start()
+        await asyncio.sleep(seconds)
+    finally:
+        stop.set()
+        thread.join()
+        _PROFILE_LOCK.release()
+    return stacks
+
+
+def format_stacks(stacks: Counter[str], prefix: str | None = None) -> str:
+    return "".join(
+        f"{prefix + ';' if prefix else ''}{stack} {count}\n"
+        for stack, count in stacks.most_common()
+    )
+
+
+class LoopLagMonitor:
+    # Measures how late the event loop wakes up from a short sleep, which is
+    # how long something was blocking it. A watchdog thread logs the stack of
+    # whatever is blocking the loop once it has been blocked for longer than
+    # CONFIG.loop_lag_threshold.
+    def __init__(self) -> None:
+        self.lag = Histogram()
+        self.stalls = 0
+        self._tick = time.monotonic()
+        self._thread_id: int | None = None
+
+    def reset(self) -> None:
+        self.lag = Histogram()
+        self.stalls = 0
+
+    async def run(self) -> None:
+        self._thread_id = threading.get_ident()
+        self._tick = time.monotonic()
+        stop = threading.Event()
+        if CONFIG.loop_lag_threshold is not None:
+            threading.Thread(
+                target=self._watch,
+                args=(stop, CONFIG.loop_lag_threshold / 1_000),
+                name="loop-lag-watchdog",
+                daemon=True,
+            ).start()
+
+        try:
+            while True:
+                start = time.monotonic()
+                await asyncio.sleep(CONFIG.loop_lag_interval)
+                self._tick = now = time.monotonic()
+                lag = now - start - CONFIG.loop_lag_interval
+                self.lag.observe(max(lag, 0) * 1_000)
+        finally:
+            stop.set()
+
+    def _watch(self, stop: threading.Event, threshold: float) -> None:
+        # runs in its own thread, since the loop can't watch itself
+        reported: float | None = None
+        while not stop.wait(threshold / 2):
+            tick = self._tick
+            blocked = time.monotonic() - tick - CONFIG.loop_lag_interval
+            if blocked < threshold or reported == tick:
+                continue
+
+            # only report each stall once
+            reported = tick
+            self.stalls += 1
+            assert self._thread_id is not None
+            frame = sys._current_frames().get(self._thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            print(
+                f"Event loop blocked for at least {blocked * 1_000:.0f}ms:\n"
+                f"{stack}",
+                end="",
+            )
@@ -0,0 +1,46 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import traceback
+from typing import TYPE_CHECKING
+
+from starboard.config import CONFIG
+from starboard.core.role_jobs import run_role_jobs, wait_for_jobs
+
+if TYPE_CHECKING:
+    from starboard.bot import Bot
+
+
+async def loop_role_jobs(bot: Bot) -> None:
+    while True:
+        try:
+            count = await run_role_jobs(bot)
+        except Exception:
+            traceback.print_exc()
+            count = 0
+
+        # a full batch means there are probably more waiting
+        if count < CONFIG.role_job_batch_size:
+            await wait_for_jobs(CONFIG.role_job_delay)
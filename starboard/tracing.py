@@ -0,0 +1,186 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Awaitable, Callable, Iterator, TypeVar, cast
+
+from starboard.config import CONFIG
+from starboard.metrics import Histogram
+
+_F = TypeVar("_F", bound=Callable[..., Awaitable[Any]])
+
+# Spans time parts of the vote pipeline. The durations of every span are
+# aggregated by name, and a sample of whole traces (a span with no parent and
+# everything under it) are written to CONFIG.trace_file in Zipkin's JSON v2
+# format, one span per line.
+
+_SPAN: ContextVar[Span | None] = ContextVar("_SPAN", default=None)
+
+# duration histograms, by span name
+SPAN_STATS: dict[str, Histogram] = {}
+
+_LOGGER = logging.getLogger("starboard.traces")
+_LOGGER.propagate = False
+_LISTENER: QueueListener | None = None
+
+
+class Span:
+    __slots__ = (
+        "trace",
+        "id",
+        "parent",
+        "name",
+        "timestamp",
+        "start",
+        "duration",
+        "tags",
+    )
+
+    def __init__(self, name: str, parent: Span | None) -> None:
+        self.name = name
+        self.parent = parent
+        self.id = os.urandom(8).hex()
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.tags: dict[str, str] = {}
+        # None if this trace isn't being sampled
+        self.trace: _Trace | None
+        if parent is not None:
+            self.trace = parent.trace
+        elif random.random() < CONFIG.trace_sample_rate:
+            self.trace = _Trace()
+        else:
+            self.trace = None
+
+    def to_zipkin(self) -> dict[str, Any]:
+        assert self.trace is not None
+        data: dict[str, Any] = {
+            "traceId": self.trace.id,
+            "id": self.id,
+            "name": self.name,
+            "timestamp": int(self.timestamp * 1_000_000),
+            "duration": max(int(self.duration * 1_000_000), 1),
+            "localEndpoint": {"serviceName": "starboard"},
+        }
+        if self.parent is not None:
+            data["parentId"] = self.parent.id
+        if self.tags:
+            data["tags"] = self.tags
+        return data
+
+
+class _Trace:
+    __slots__ = ("id", "spans")
+
+    def __init__(self) -> None:
+        self.id = os.urandom(16).hex()
+        self.spans: list[Span] = []
+
+
+def set_tag(key: str, value: Any) -> None:
+    # tags the current span, if it's being sampled
+    if (span := _SPAN.get()) is not None and span.trace is not None:
+        span.tags[key] = str(value)
+
+
+@contextmanager
+def span(name: str) -> Iterator[Span]:
+    s = Span(name, _SPAN.get())
+    token = _SPAN.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        if s.trace is not None:
+            s.tags["error"] = repr(e)
+        raise
+    finally:
+        _SPAN.reset(token)
+        s.duration = time.perf_counter() - s.start
+        _finish(s)
+
+
+def traced(name: str) -> Callable[[_F], _F]:
+    def decorator(func: _F) -> _F:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return cast(_F, wrapper)
+
+    return decorator
+
+
+def _finish(s: Span) -> None:
+    if (h := SPAN_STATS.get(s.name)) is None:
+        h = SPAN_STATS[s.name] = Histogram()
+    h.observe(s.duration * 1_000)
+
+    if s.trace is None:
+        return
+    s.trace.spans.append(s)
+    if s.parent is None:
+        for child in s.trace.spans:
+            _write(child)
+
+
+def _write(s: Span) -> None:
+    global _LISTENER
+    if _LISTENER is None:
+        # the file is written to from another thread, so the event loop
+        # isn't blocked
+        handler = RotatingFileHandler(
+            CONFIG.trace_file,
+            maxBytes=CONFIG.trace_file_max_bytes,
+            backupCount=CONFIG.trace_file_backups,
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        q: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        _LOGGER.addHandler(QueueHandler(q))
+        _LOGGER.setLevel(logging.INFO)
+        _LISTENER = QueueListener(q, handler)
+        _LISTENER.start()
+
+    _LOGGER.info(json.dumps(s.to_zipkin()))
+
+
+def stop_writing() -> None:
+    # flushes the spans that haven't been written yet
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        for h in list(_LOGGER.handlers):
+            _LOGGER.removeHandler(h)
+        _LISTENER = None
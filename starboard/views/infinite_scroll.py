@@ -23,55 +23,199 @@
 from __future__ import annotations
 
 import asyncio
-from typing import TYPE_CHECKING, Awaitable, Callable, List, Tuple, cast
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Generic,
+    List,
+    Tuple,
+    TypeVar,
+    cast,
+)
 
 import hikari
 import miru
+from cachetools import LRUCache
 
 if TYPE_CHECKING:
     from starboard.bot import Bot
 
 PAGE = Tuple[List[hikari.Embed], str]
+_T = TypeVar("_T")
 
 
-class InfiniteScroll(miru.View):
+class InfiniteScroll(miru.View, Generic[_T]):
+    # Pages are loaded in two stages: next_item reads the next item (e.g.
+    # from a cursor), one at a time, and render turns it into a page. Items
+    # are kept, but rendered pages are kept in a bounded cache and rendered
+    # again if they're needed after being evicted. The next `prefetch` pages
+    # are rendered concurrently in the background, so that switching pages
+    # doesn't have to wait for them.
+    #
+    # Items that fail to render are skipped.
+
     def __init__(
-        self, user_id: int, next_page: Callable[[], Awaitable[PAGE | None]]
+        self,
+        user_id: int,
+        next_item: Callable[[], Awaitable[_T | None]],
+        render: Callable[[_T], Coroutine[Any, Any, PAGE]],
+        *,
+        prefetch: int = 3,
+        cache_size: int = 10,
     ) -> None:
+        assert cache_size > prefetch
+
         self.user_id = user_id
-        self.next_page = next_page
+        self.next_item = next_item
+        self.render = render
+        self.prefetch = prefetch
         self.current_page = 0
-        self.cached_pages: list[PAGE] = []
+
+        self._lock = asyncio.Lock()
+        self._items: list[_T] = []
+        self._exhausted = False
+        # the item index of each page, for the items that have been rendered
+        # up to _checked
+        self._pages: list[int] = []
+        self._checked = 0
+        self._failed: set[int] = set()
+        self._cache: LRUCache[int, PAGE] = LRUCache(cache_size)
+
+        self._fetching: asyncio.Task[None] | None = None
+        self._rendering: dict[int, asyncio.Task[PAGE]] = {}
+        self._prefetching: set[asyncio.Task[None]] = set()
+
         super().__init__()
 
     async def wait(self, timeout: float | None = None) -> None:
         bot = cast("Bot", self.app)
         assert bot.cluster.stop_future
-        await asyncio.wait(
-            (
-                asyncio.create_task(super().wait(timeout)),
-                asyncio.create_task(bot.cluster.join()),
-            ),
-            return_when=asyncio.FIRST_COMPLETED,
-        )
+        try:
+            await asyncio.wait(
+                (
+                    asyncio.create_task(super().wait(timeout)),
+                    asyncio.create_task(bot.cluster.join()),
+                ),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            await self.cancel()
+
+    async def cancel(self) -> None:
+        # cancels any prefetching, and waits for it to stop so that whatever
+        # next_item reads from can be closed afterwards
+        tasks: list[asyncio.Task[object]] = [
+            *self._prefetching,
+            *self._rendering.values(),
+        ]
+        if self._fetching:
+            tasks.append(self._fetching)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pages)
 
     async def get_page(self, current_page: int) -> PAGE | None:
         if current_page < 0:
             return None
 
+        async with self._lock:
+            page = await self._get_page(current_page)
+        if page is None:
+            return None
+
         self.current_page = current_page
-        while self.current_page > (len(self.cached_pages) - 1):
-            try:
-                page = await self.next_page()
-            except Exception:
-                continue
-
-            if page is None:
-                self.current_page = len(self.cached_pages) - 1
+        self._start_prefetch(self._pages[current_page] + 1)
+        return page
+
+    async def _get_page(self, current_page: int) -> PAGE | None:
+        while len(self._pages) <= current_page:
+            await self._fetch(self._checked + 1)
+            if self._checked >= len(self._items):
                 return None
 
-            self.cached_pages.append(page)
-        return self.cached_pages[self.current_page]
+            index = self._checked
+            self._start_prefetch(index + 1)
+            page = await self._load(index)
+            self._checked += 1
+            if page is not None:
+                self._pages.append(index)
+                if len(self._pages) > current_page:
+                    return page
+
+        return await self._load(self._pages[current_page])
+
+    async def _fetch(self, count: int) -> None:
+        # only one task can read items at a time
+        while len(self._items) < count and not self._exhausted:
+            if not self._fetching:
+                self._fetching = asyncio.create_task(self._fetch_until(count))
+            await asyncio.shield(self._fetching)
+
+    async def _fetch_until(self, count: int) -> None:
+        try:
+            while len(self._items) < count:
+                item = await self.next_item()
+                if item is None:
+                    self._exhausted = True
+                    return
+                self._items.append(item)
+        finally:
+            self._fetching = None
+
+    async def _load(self, index: int) -> PAGE | None:
+        if (page := self._cache.get(index)) is not None:
+            return page
+        if index in self._failed:
+            return None
+
+        try:
+            return await asyncio.shield(self._render(index))
+        except Exception:
+            return None
+
+    def _render(self, index: int) -> asyncio.Task[PAGE]:
+        if (task := self._rendering.get(index)) is None:
+            task = asyncio.create_task(self.render(self._items[index]))
+            task.add_done_callback(partial(self._rendered, index))
+            self._rendering[index] = task
+        return task
+
+    def _rendered(self, index: int, task: asyncio.Task[PAGE]) -> None:
+        self._rendering.pop(index, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self._failed.add(index)
+        else:
+            self._cache[index] = task.result()
+
+    def _start_prefetch(self, start: int) -> None:
+        if self.prefetch <= 0:
+            return
+        task = asyncio.create_task(self._prefetch(start))
+        self._prefetching.add(task)
+        task.add_done_callback(self._prefetching.discard)
+
+    async def _prefetch(self, start: int) -> None:
+        try:
+            await self._fetch(start + self.prefetch)
+        except Exception:
+            # get_page will run into it again if it matters
+            pass
+
+        for index in range(
+            start, min(start + self.prefetch, len(self._items))
+        ):
+            if index not in self._cache and index not in self._failed:
+                self._render(index)
 
     async def finish(self) -> None:
         for item in self.children:
@@ -81,6 +225,7 @@ class InfiniteScroll(miru.View):
         await self.message.edit(components=self.build())
 
     async def on_timeout(self) -> None:
+        await self.cancel()
         await self.finish()
         return await super().on_timeout()
 
@@ -114,6 +259,6 @@ class InfiniteScroll(miru.View):
 
     @miru.button(label=">>", custom_id="infinite-scroll:last")
     async def last(self, btn: miru.Button, ctx: miru.Context) -> None:
-        page = await self.get_page(len(self.cached_pages) - 1)
+        page = await self.get_page(self.page_count - 1)
         if page:
             await self.set_page(page, ctx)
@@ -0,0 +1,65 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import asyncio
+from types import ModuleType, SimpleNamespace
+from typing import Any
+
+import pytest
+
+
+@pytest.fixture
+def autostar(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    from starboard.config import CONFIG
+    from starboard.core import autostar
+
+    monkeypatch.setattr(CONFIG, "asc_embed_timeout", 0.05)
+    return autostar
+
+
+def _update(message_id: int, embeds: Any) -> Any:
+    return SimpleNamespace(
+        message_id=message_id, message=SimpleNamespace(embeds=embeds)
+    )
+
+
+def test_embed_waiters(autostar: ModuleType) -> None:
+    async def _run() -> None:
+        fut = autostar._expect_embeds(1)
+        autostar.handle_message_update(_update(2, ["other"]))
+        # updates without embeds don't resolve the wait
+        autostar.handle_message_update(_update(1, []))
+        assert not fut.done()
+
+        autostar.handle_message_update(_update(1, ["embed"]))
+        assert await fut == ["embed"]
+        assert not autostar._EMBED_WAITERS
+
+        # messages that never get embeds time out
+        fut = autostar._expect_embeds(3)
+        assert await asyncio.wait_for(fut, 1) == ()
+        assert not autostar._EMBED_WAITERS
+
+    asyncio.run(_run())
@@ -0,0 +1,66 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import asyncio
+import time
+from types import ModuleType, SimpleNamespace
+from typing import Any
+
+import pytest
+
+
+@pytest.fixture
+def embed_message(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    from starboard.core import embed_message
+
+    async def get_gif_url(bot: Any, url: str) -> str:
+        await asyncio.sleep(float(url))
+        return f"gif {url}"
+
+    monkeypatch.setattr(embed_message, "get_gif_url", get_gif_url)
+    return embed_message
+
+
+def _embed(url: str) -> Any:
+    return SimpleNamespace(
+        title=None,
+        description=None,
+        fields=[],
+        url=url,
+        image=SimpleNamespace(url=f"image {url}", filename="image.png"),
+        thumbnail=None,
+    )
+
+
+def test_gifs_concurrent(embed_message: ModuleType) -> None:
+    message = SimpleNamespace(
+        attachments=[], embeds=[_embed("0.1"), _embed("0.1"), _embed("5")]
+    )
+
+    start = time.perf_counter()
+    urls = asyncio.run(embed_message._extract_images(None, message, True, 0.3))
+    # the slow GIF falls back to the embed's image
+    assert urls == ["gif 0.1", "gif 0.1", "image 5"]
+    assert time.perf_counter() - start < 1
@@ -0,0 +1,207 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Checks GIF URL lookups against a local stand-in for the Tenor and Giphy
+# APIs. Only runs if STARBOARD_TEST_DSN is set, since resolved URLs are
+# stored in the database.
+#
+# WARNING: this runs migrations on and writes to STARBOARD_TEST_DSN.
+
+from __future__ import annotations
+
+import asyncio
+import os
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, Coroutine, Iterator, TypeVar
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+if TYPE_CHECKING:
+    from starboard.database import Database
+
+_T = TypeVar("_T")
+
+DSN = os.getenv("STARBOARD_TEST_DSN")
+
+pytestmark = pytest.mark.skipif(
+    DSN is None, reason="STARBOARD_TEST_DSN is not set"
+)
+
+GIFS = {"1001": "https://media.tenor/1001.gif", "1002": None}
+
+
+class Env:
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        db: Database,
+        server: TestServer,
+        session: aiohttp.ClientSession,
+    ) -> None:
+        self.loop = loop
+        self.db = db
+        self.server = server
+        self.session = session
+        self.requests: list[dict[str, str]] = []
+        self.fail = False
+
+    def run(self, coro: Coroutine[Any, Any, _T]) -> _T:
+        return self.loop.run_until_complete(coro)
+
+
+class _Bot:
+    def __init__(self, env: Env) -> None:
+        self.env = env
+
+    async def session(self) -> aiohttp.ClientSession:
+        return self.env.session
+
+
+@pytest.fixture(scope="module")
+def env() -> Iterator[Env]:
+    from benchmarks._utils import connect
+
+    async def tenor(request: web.Request) -> web.Response:
+        env.requests.append(dict(request.query))
+        if env.fail:
+            return web.Response(status=500)
+        results = [
+            {"id": i, "media": [{"gif": {"url": GIFS[i]}}]}
+            for i in request.query["ids"].split(",")
+            if GIFS.get(i)
+        ]
+        return web.json_response({"results": results})
+
+    async def _start() -> Env:
+        app = web.Application()
+        app.router.add_get("/tenor", tenor)
+        server = TestServer(app)
+        await server.start_server()
+        db = await connect(dsn=DSN)
+        return Env(loop, db, server, aiohttp.ClientSession())
+
+    loop = asyncio.new_event_loop()
+    env = loop.run_until_complete(_start())
+    yield env
+    loop.run_until_complete(env.session.close())
+    loop.run_until_complete(env.server.close())
+    loop.run_until_complete(env.db.cleanup())
+    loop.close()
+
+
+@pytest.fixture
+def gifs(env: Env, monkeypatch: pytest.MonkeyPatch) -> Iterator[ModuleType]:
+    from starboard.config import CONFIG
+    from starboard.core import gifs
+
+    monkeypatch.setattr(CONFIG, "tenor_token", "token")
+    monkeypatch.setattr(gifs, "TENOR_BASE", str(env.server.make_url("/tenor")))
+    env.run(env.db.execute("DELETE FROM gif_urls", []))
+    env.requests.clear()
+    env.fail = False
+    yield gifs
+    gifs.FOUND.clear()
+    gifs.MISSING.clear()
+
+
+def _get(env: Env, gifs: ModuleType, *gifids: str) -> list[str | None]:
+    async def _run() -> list[str | None]:
+        return list(
+            await asyncio.gather(
+                *(
+                    gifs.get_gif_url(
+                        _Bot(env), f"https://tenor.com/view/some-gif-{i}"
+                    )
+                    for i in gifids
+                )
+            )
+        )
+
+    return env.run(_run())
+
+
+def test_batched(env: Env, gifs: ModuleType) -> None:
+    assert _get(env, gifs, "1001", "1002", "1001") == [
+        GIFS["1001"],
+        None,
+        GIFS["1001"],
+    ]
+    # one request, with each GIF once
+    assert [r["ids"] for r in env.requests] == ["1001,1002"]
+    assert not gifs._PENDING
+
+
+def test_persisted(env: Env, gifs: ModuleType) -> None:
+    _get(env, gifs, "1001", "1002")
+
+    # a restart loses the in-memory cache, but not the database
+    gifs.FOUND.clear()
+    gifs.MISSING.clear()
+    assert _get(env, gifs, "1001", "1002") == [GIFS["1001"], None]
+    assert len(env.requests) == 1
+
+    rows = env.run(
+        env.db.fetchmany(
+            "SELECT gif_id, expires_at - now() AS ttl FROM gif_urls "
+            "ORDER BY gif_id",
+            [],
+        )
+    )
+    # GIFs that weren't found expire sooner
+    assert [r["gif_id"] for r in rows] == ["1001", "1002"]
+    assert rows[0]["ttl"] > rows[1]["ttl"]
+
+
+def test_expired_deleted(env: Env, gifs: ModuleType) -> None:
+    from starboard.database import queries
+
+    _get(env, gifs, "1001", "1002")
+    env.run(
+        env.db.execute(
+            "UPDATE gif_urls SET expires_at = now() - interval '1 second' "
+            "WHERE gif_id = '1002'",
+            [],
+        )
+    )
+
+    env.run(queries.DELETE_EXPIRED_GIF_URLS.execute())
+    rows = env.run(env.db.fetchmany("SELECT gif_id FROM gif_urls", []))
+    assert [r["gif_id"] for r in rows] == ["1001"]
+
+
+def test_failed_request(
+    env: Env, gifs: ModuleType, capsys: pytest.CaptureFixture[str]
+) -> None:
+    env.fail = True
+    assert _get(env, gifs, "1001") == [None]
+    assert "ClientResponseError" in capsys.readouterr().err
+    # failures are only remembered in memory
+    assert not env.run(env.db.fetchmany("SELECT * FROM gif_urls", []))
+
+    env.fail = False
+    gifs.MISSING.clear()
+    assert _get(env, gifs, "1001") == [GIFS["1001"]]
+    assert len(env.requests) == 2
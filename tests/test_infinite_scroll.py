@@ -0,0 +1,144 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Iterator
+
+import hikari
+import miru
+import pytest
+
+if TYPE_CHECKING:
+    from starboard.views import InfiniteScroll
+
+_Scroll = Callable[..., "InfiniteScroll[int]"]
+
+
+@pytest.fixture
+def scroll() -> Iterator[_Scroll]:
+    from starboard.views import InfiniteScroll
+
+    # views can't be created until miru is installed
+    miru.install(hikari.GatewayBot("token", banner=None))
+    yield InfiniteScroll
+    miru.uninstall()
+
+
+def _run(coro: Coroutine[Any, Any, None]) -> None:
+    asyncio.run(asyncio.wait_for(coro, 5))
+
+
+class _Source:
+    def __init__(self, items: int, fail: frozenset[int] = frozenset()) -> None:
+        self.items = iter(range(items))
+        self.fail = fail
+        self.renders: list[int] = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def next_item(self) -> int | None:
+        await asyncio.sleep(0)
+        return next(self.items, None)
+
+    async def render(self, item: int) -> tuple[list[Any], str]:
+        self.renders.append(item)
+        await self.release.wait()
+        if item in self.fail:
+            raise Exception(item)
+        return [], str(item)
+
+
+def test_pages(scroll: _Scroll) -> None:
+    async def _test() -> None:
+        src = _Source(6, fail=frozenset({1, 4}))
+        view = scroll(0, src.next_item, src.render)
+
+        pages = [await view.get_page(x) for x in range(5)]
+        assert [p and p[1] for p in pages] == ["0", "2", "3", "5", None]
+        assert view.current_page == 3
+        assert view.page_count == 4
+        assert await view.get_page(-1) is None
+        assert (await view.get_page(1) or ([], ""))[1] == "2"
+        await view.cancel()
+
+    _run(_test())
+
+
+def test_prefetch(scroll: _Scroll) -> None:
+    async def _test() -> None:
+        src = _Source(20)
+        view = scroll(0, src.next_item, src.render, prefetch=3)
+
+        await view.get_page(0)
+        src.release.clear()
+        await asyncio.sleep(0.01)
+        # the next pages are rendered concurrently, and only once
+        assert sorted(src.renders) == [0, 1, 2, 3]
+
+        src.release.set()
+        await asyncio.sleep(0.01)
+        assert (await view.get_page(2) or ([], ""))[1] == "2"
+        await asyncio.sleep(0.01)
+        assert sorted(src.renders) == [0, 1, 2, 3, 4, 5]
+        await view.cancel()
+
+    _run(_test())
+
+
+def test_bounded_cache(scroll: _Scroll) -> None:
+    async def _test() -> None:
+        src = _Source(20)
+        view = scroll(0, src.next_item, src.render, prefetch=1, cache_size=3)
+
+        for x in range(10):
+            await view.get_page(x)
+        await asyncio.sleep(0.01)
+        assert len(view._cache) <= 3
+
+        # evicted pages are rendered again
+        assert (await view.get_page(0) or ([], ""))[1] == "0"
+        assert src.renders.count(0) == 2
+        await view.cancel()
+
+    _run(_test())
+
+
+def test_cancel(scroll: _Scroll) -> None:
+    async def _test() -> None:
+        src = _Source(20)
+        view = scroll(0, src.next_item, src.render)
+
+        await view.get_page(0)
+        src.release.clear()
+        await view.get_page(0)
+        await asyncio.sleep(0.01)
+        assert view._rendering
+
+        await view.cancel()
+        assert not view._rendering
+        assert not view._prefetching
+        assert not view._fetching
+
+    _run(_test())
@@ -0,0 +1,127 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import random
+from typing import TYPE_CHECKING
+
+import pytest
+
+if TYPE_CHECKING:
+    from starboard.core.leaderboard import GuildLeaderboard
+
+
+@pytest.fixture
+def lb_cls() -> type[GuildLeaderboard]:
+    from starboard.core.leaderboard import GuildLeaderboard
+
+    return GuildLeaderboard
+
+
+def _expected(xp: dict[int, float]) -> list[tuple[int, float]]:
+    return sorted(
+        ((u, x) for u, x in xp.items() if x > 0), key=lambda m: (-m[1], m[0])
+    )
+
+
+def test_ranks(lb_cls: type[GuildLeaderboard]) -> None:
+    lb = lb_cls([(1, 10), (2, 30), (3, 20), (4, 0), (5, 20)])
+
+    assert len(lb) == 4
+    assert list(lb.top(10)) == [2, 3, 5, 1]
+    assert [(s.xp, s.rank) for s in lb.top(10).values()] == [
+        (30, 1),
+        (20, 2),
+        (20, 3),
+        (10, 4),
+    ]
+    assert lb.get(5) == lb.top(10)[5]
+    assert lb.get(4) is None
+    assert list(lb.range(1, 3)) == [3, 5]
+    assert [s.rank for s in lb.range(1, 3).values()] == [2, 3]
+
+    lb.set(1, 40)
+    lb.set(2, 0)
+    assert list(lb.top(10)) == [1, 3, 5]
+    assert lb.get(2) is None
+
+
+def test_matches_sort(lb_cls: type[GuildLeaderboard]) -> None:
+    rand = random.Random(0)
+    xp = {u: float(rand.randint(-5, 50)) for u in range(200)}
+    lb = lb_cls(xp.items())
+
+    for _ in range(2_000):
+        uid = rand.randrange(250)
+        xp[uid] = float(rand.randint(-5, 50))
+        lb.set(uid, xp[uid])
+
+    expected = _expected(xp)
+    top = lb.top(len(expected) + 10)
+    assert [(u, s.xp) for u, s in top.items()] == expected
+    for rank, (uid, _) in enumerate(expected, 1):
+        stats = lb.get(uid)
+        assert stats and stats.rank == rank
+
+
+def test_neighbors(lb_cls: type[GuildLeaderboard]) -> None:
+    lb = lb_cls([(1, 10), (2, 30), (3, 20), (4, 0), (5, 20)])
+
+    assert [(u, s.rank) for u, s in lb.neighbors(3, 1).items()] == [
+        (2, 1),
+        (5, 3),
+    ]
+    assert [(u, s.rank) for u, s in lb.neighbors(2, 2).items()] == [
+        (3, 2),
+        (5, 3),
+    ]
+    assert lb.neighbors(4, 1) == {}
+
+
+def test_crossings(lb_cls: type[GuildLeaderboard]) -> None:
+    rng = random.Random(0)
+    xp = {uid: float(rng.randint(0, 50)) for uid in range(100)}
+    lb = lb_cls(xp.items())
+    watched = [3, 10, 25]
+    lb.watch(watched)
+
+    def _sides() -> dict[int, int]:
+        # how many watched positions are at or before each member
+        ranked = [u for u, _ in _expected(xp)]
+        return {u: sum(p <= ranked.index(u) for p in watched) for u in ranked}
+
+    for _ in range(200):
+        before = _sides()
+        for _ in range(rng.randint(1, 5)):
+            uid = rng.randrange(120)
+            xp[uid] = float(rng.randint(0, 50))
+            lb.set(uid, xp[uid])
+        after = _sides()
+
+        changed = {
+            u
+            for u in before.keys() | after.keys()
+            if before.get(u, len(watched)) != after.get(u, len(watched))
+        }
+        assert changed <= lb.drain_crossed()
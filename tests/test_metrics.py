@@ -0,0 +1,145 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import json
+from types import ModuleType
+from typing import TYPE_CHECKING
+
+import pytest
+
+if TYPE_CHECKING:
+    from starboard.metrics import Histogram
+
+
+@pytest.fixture
+def metrics() -> ModuleType:
+    from starboard import metrics
+
+    return metrics
+
+
+def _hist(metrics: ModuleType, *values: float) -> Histogram:
+    h: Histogram = metrics.Histogram((10, 20, 30))
+    for v in values:
+        h.observe(v)
+    return h
+
+
+def test_bucket_edges(metrics: ModuleType) -> None:
+    # buckets are upper bounds, so a value on an edge goes in that bucket
+    h = _hist(metrics, 0, 10, 10.5, 20, 30, 31)
+    assert h.counts == [2, 2, 1, 1]
+    assert h.count == 6
+    assert h.max == 31
+
+
+def test_percentile(metrics: ModuleType) -> None:
+    assert _hist(metrics).percentile(50) == 0
+
+    h = _hist(metrics, 5, 10, 15, 25)
+    assert h.percentile(0) == 0
+    # interpolated within the bucket
+    assert h.percentile(25) == 5
+    assert h.percentile(50) == 10
+    assert h.percentile(75) == 20
+    # but never above the largest value seen
+    assert h.percentile(100) == 25
+
+
+def test_percentile_overflow(metrics: ModuleType) -> None:
+    # past the last bucket, the max is used as the upper bound
+    h = _hist(metrics, 50, 100)
+    assert h.counts == [0, 0, 0, 2]
+    assert h.percentile(50) == 65
+    assert h.percentile(100) == 100
+
+
+def test_merge(metrics: ModuleType) -> None:
+    h = _hist(metrics, 5, 15)
+    h.merge(_hist(metrics, 25, 40))
+    assert h.counts == [1, 1, 1, 1]
+    assert h.count == 4
+    assert h.total == 85
+    assert h.max == 40
+    assert h.percentile(100) == 40
+
+    h.merge(_hist(metrics))
+    assert h.count == 4
+
+    with pytest.raises(AssertionError):
+        h.merge(metrics.Histogram((10, 20)))
+
+
+def test_round_trip(metrics: ModuleType) -> None:
+    h = _hist(metrics, 5, 15, 25, 50)
+    # stats are sent between clusters as JSON
+    h2 = metrics.Histogram.from_dict(json.loads(json.dumps(h.to_dict())))
+    assert h2.buckets == h.buckets
+    assert h2.counts == h.counts
+    assert h2.count == h.count
+    assert h2.total == h.total
+    assert h2.max == h.max
+    assert h2.percentile(90) == h.percentile(90)
+
+
+def test_query_stats_merge(metrics: ModuleType) -> None:
+    a = metrics.QueryStats()
+    a.record("SELECT 1", 1, 1)
+    a.record_queries("event", 3)
+
+    b = metrics.QueryStats()
+    b.record("SELECT 1", 2, 1)
+    b.record("SELECT 2", 3, 5)
+    b.acquire.observe(1)
+    b.record_queries("event", 5)
+    b.record_queries("command", 1)
+
+    a.merge(b)
+    assert a.latency["SELECT 1"].count == 2
+    assert a.latency["SELECT 2"].count == 1
+    assert a.rows == {"SELECT 1": 2, "SELECT 2": 5}
+    assert a.acquire.count == 1
+    assert a.queries["event"].count == 2
+    assert a.queries["event"].max == 5
+    assert a.queries["command"].buckets == metrics.QUERY_COUNT_BUCKETS
+
+    # merging doesn't share histograms with the other stats
+    b.record("SELECT 2", 3, 5)
+    assert a.latency["SELECT 2"].count == 1
+
+
+def test_query_stats_round_trip(metrics: ModuleType) -> None:
+    s = metrics.QueryStats()
+    s.record("SELECT 1", 1.5, 2)
+    s.acquire.observe(0.1)
+    s.record_queries("event", 7)
+
+    data = json.loads(json.dumps(s.to_dict()))
+    s2 = metrics.QueryStats.from_dict(data)
+    assert s2.to_dict() == s.to_dict()
+
+    # from clusters that don't count queries yet
+    del data["queries"]
+    assert metrics.QueryStats.from_dict(data).queries == {}
@@ -0,0 +1,99 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import asyncio
+import random
+from types import ModuleType
+
+import pytest
+
+
+@pytest.fixture
+def posrole() -> ModuleType:
+    from starboard.core import posrole
+
+    return posrole
+
+
+def test_incremental_updates(posrole: ModuleType) -> None:
+    from starboard.core.leaderboard import GuildLeaderboard
+
+    rng = random.Random(0)
+    posroles = [(1, 2), (2, 5), (3, 10)]
+    xp = {uid: float(rng.randint(0, 100)) for uid in range(100, 150)}
+    lb = GuildLeaderboard(xp.items())
+
+    def _wanted() -> dict[int, int]:
+        ranked = list(lb.top(17))
+        ret: dict[int, int] = {}
+        for role_id, max_members in posroles:
+            ret.update((u, role_id) for u in ranked[:max_members])
+            ranked = ranked[max_members:]
+        return ret
+
+    state = posrole._GuildPosRoles(posroles, lb, _wanted())
+    for _ in range(100):
+        for _ in range(rng.randint(1, 3)):
+            uid = rng.randrange(100, 160)
+            lb.set(uid, float(rng.randint(0, 100)))
+
+        adds, removals = posrole._get_updates(state)
+        members = dict(state.members)
+        for role_id, users in removals.items():
+            for uid in users:
+                assert members.pop(uid) == role_id
+        for role_id, users in adds.items():
+            for uid in users:
+                members[uid] = role_id
+        state.members = members
+
+        assert members == _wanted()
+
+
+def test_reconcile_during_fetch(
+    posrole: ModuleType, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from types import SimpleNamespace
+
+    from starboard.core.leaderboard import GuildLeaderboard
+
+    lb = GuildLeaderboard([(100, 10.0), (101, 5.0), (102, 1.0)])
+
+    async def fetchmany(role_ids: list[int]) -> list[object]:
+        # 102 passes everyone while the current posroles are fetched
+        lb.set(102, 20.0)
+        return [SimpleNamespace(role_id=1, user_id=100)]
+
+    monkeypatch.setattr(
+        posrole.queries,
+        "POSROLE_MEMBERS",
+        SimpleNamespace(fetchmany=fetchmany),
+    )
+    state, (adds, removals) = asyncio.run(
+        posrole._reconcile(1, [(1, 1), (2, 1)], lb)
+    )
+    assert adds == {1: {102}, 2: {100}}
+    assert removals == {1: {100}, 2: set()}
+    assert not posrole._get_updates(state)[0]
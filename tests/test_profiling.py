@@ -0,0 +1,105 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import asyncio
+import time
+from types import ModuleType
+
+import pytest
+
+
+@pytest.fixture
+def profiling(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    from starboard import profiling
+    from starboard.config import CONFIG
+
+    monkeypatch.setattr(CONFIG, "loop_lag_interval", 0.01)
+    monkeypatch.setattr(CONFIG, "loop_lag_threshold", 50)
+    return profiling
+
+
+def _block_the_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def test_profile(profiling: ModuleType) -> None:
+    async def _run() -> None:
+        task = asyncio.create_task(profiling.profile(0.2, 0.001))
+        await asyncio.sleep(0)
+        _block_the_loop(0.1)
+        stacks = await task
+
+        blocked = sum(c for s, c in stacks.items() if "_block_the_loop" in s)
+        assert blocked > 10
+        # the outermost frame comes first
+        stack = next(s for s in stacks if "_block_the_loop" in s)
+        assert stack.index("_run") < stack.index("_block_the_loop")
+
+        out = profiling.format_stacks(stacks, "cluster-0")
+        assert out.startswith("cluster-0;")
+        assert out.splitlines()[0].rsplit(" ", 1)[1].isdigit()
+
+    asyncio.run(_run())
+
+
+def test_one_profile_at_a_time(profiling: ModuleType) -> None:
+    async def _run() -> None:
+        task = asyncio.create_task(profiling.profile(0.05, 0.01))
+        await asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            await profiling.profile(0.05, 0.01)
+        await task
+        # the lock is released afterwards
+        await profiling.profile(0.01, 0.01)
+
+    asyncio.run(_run())
+
+
+def test_loop_lag(
+    profiling: ModuleType, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monitor = profiling.LoopLagMonitor()
+
+    async def _run() -> None:
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        _block_the_loop(0.2)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(_run())
+
+    assert monitor.lag.count > 5
+    assert monitor.lag.max >= 150
+    assert monitor.stalls == 1
+    out = capsys.readouterr().out
+    assert "Event loop blocked for at least" in out
+    assert "_block_the_loop" in out
+
+    monitor.reset()
+    assert monitor.lag.count == 0
+    assert monitor.stalls == 0
@@ -0,0 +1,202 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Checks that queries are counted per event/command and that budgets are
+# enforced. Only runs if STARBOARD_TEST_DSN is set.
+#
+# WARNING: this runs migrations on STARBOARD_TEST_DSN.
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+from typing import TYPE_CHECKING, Any, Coroutine, Iterator, TypeVar
+
+import hikari
+import pytest
+
+if TYPE_CHECKING:
+    from starboard.database import Database
+
+_T = TypeVar("_T")
+
+DSN = os.getenv("STARBOARD_TEST_DSN")
+
+pytestmark = pytest.mark.skipif(
+    DSN is None, reason="STARBOARD_TEST_DSN is not set"
+)
+
+
+class Env:
+    def __init__(self, loop: asyncio.AbstractEventLoop, db: Database) -> None:
+        self.loop = loop
+        self.db = db
+
+    def run(self, coro: Coroutine[Any, Any, _T]) -> _T:
+        return self.loop.run_until_complete(coro)
+
+    async def queries(self, count: int) -> None:
+        for x in range(count):
+            await self.db.fetchval("SELECT $1::int", [x])
+
+
+@pytest.fixture(scope="module")
+def env() -> Iterator[Env]:
+    from benchmarks._utils import connect
+
+    loop = asyncio.new_event_loop()
+    db = loop.run_until_complete(connect(dsn=DSN))
+    yield Env(loop, db)
+    loop.run_until_complete(db.cleanup())
+    loop.close()
+
+
+@pytest.fixture(autouse=True)
+def _reset(env: Env, monkeypatch: pytest.MonkeyPatch) -> None:
+    from starboard.config import CONFIG
+
+    monkeypatch.setattr(CONFIG, "query_budgets", {})
+    monkeypatch.setattr(CONFIG, "query_budget_sample_rate", 0)
+    monkeypatch.setattr(CONFIG, "strict_query_budgets", True)
+    env.db.stats.reset()
+
+
+def test_counts_queries(env: Env) -> None:
+    with env.db.count_queries("event", 5) as counter:
+        env.run(env.queries(3))
+    env.run(env.queries(2))
+
+    assert counter.count == 3
+    assert counter.shapes == {"SELECT $n::int": 3}
+    assert not counter.over_budget
+    assert env.db.stats.queries["event"].count == 1
+    assert env.db.stats.queries["event"].max == 3
+
+
+def test_budget_exceeded(env: Env) -> None:
+    from starboard.database.database import QueryBudgetExceeded
+
+    with pytest.raises(QueryBudgetExceeded, match="event made 3 queries"):
+        with env.db.count_queries("event", 2):
+            env.run(env.queries(3))
+
+    # still recorded
+    assert env.db.stats.queries["event"].max == 3
+
+
+def test_config_budget(env: Env, monkeypatch: pytest.MonkeyPatch) -> None:
+    from starboard.config import CONFIG
+    from starboard.database.database import QueryBudgetExceeded
+
+    monkeypatch.setattr(CONFIG, "query_budgets", {"event": 1})
+    with pytest.raises(QueryBudgetExceeded):
+        with env.db.count_queries("event", 10):
+            env.run(env.queries(2))
+
+    monkeypatch.setattr(CONFIG, "query_budgets", {"event": 10})
+    with env.db.count_queries("event", 1):
+        env.run(env.queries(2))
+
+
+def test_sampled(
+    env: Env,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    from starboard.config import CONFIG
+
+    monkeypatch.setattr(CONFIG, "strict_query_budgets", False)
+    with env.db.count_queries("event", 1):
+        env.run(env.queries(2))
+    assert "Over query budget" not in capsys.readouterr().out
+
+    monkeypatch.setattr(CONFIG, "query_budget_sample_rate", 1)
+    with env.db.count_queries("event", 1):
+        env.run(env.queries(2))
+    assert (
+        "Over query budget (2/1) in event: 2x SELECT $n::int"
+        in capsys.readouterr().out
+    )
+
+
+def test_tasks_counted_separately(env: Env) -> None:
+    async def handler(count: int) -> int:
+        token = env.db.start_counting("event")
+        await env.queries(count)
+        counter = env.db.finish_counting(token)
+        assert counter is not None
+        return counter.count
+
+    async def run() -> list[int]:
+        return list(await asyncio.gather(*(handler(x) for x in range(1, 4))))
+
+    assert env.run(run()) == [1, 2, 3]
+    assert env.db.stats.queries["event"].count == 3
+
+
+def test_errors_propagate(env: Env) -> None:
+    with pytest.raises(ZeroDivisionError):
+        with env.db.count_queries("event", 0):
+            env.run(env.queries(1))
+            1 / 0
+
+    assert "event" not in env.db.stats.queries
+
+
+def test_reaction_handlers(env: Env, monkeypatch: pytest.MonkeyPatch) -> None:
+    from pycooldown import FixedCooldown
+
+    from benchmarks import reaction_storm as storm
+    from starboard.core import reactions
+    from starboard.events.reactions import on_reaction_add, on_reaction_delete
+
+    monkeypatch.setattr(reactions, "COOLDOWN", FixedCooldown(1e9, 1))
+    random.seed(0)
+    args = argparse.Namespace(
+        guilds=1,
+        users=50,
+        messages=10,
+        starboards=3,
+        overrides=2,
+        permroles=2,
+        required=1,
+        premium=False,
+        rest_latency=0,
+        ratelimit=0,
+        retry_after=0,
+    )
+    world = storm.World(args)
+    env.run(storm.seed(env.db, world))
+    bot = storm.FakeBot(world, storm.FakeREST(world, args), env.db)
+
+    # strict_query_budgets is on, so this fails if any event goes over
+    for event in storm.events(bot, world, 200, 0.3):
+        if isinstance(event, hikari.GuildReactionAddEvent):
+            env.run(on_reaction_add.metadata(event))
+        else:
+            env.run(on_reaction_delete.metadata(event))
+
+    assert env.db.stats.queries["reaction_add"].count
+    assert env.db.stats.queries["reaction_remove"].count
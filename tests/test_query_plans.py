@@ -0,0 +1,534 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Seeds a Postgres database and checks that the hot queries use indexes and
+# stay within a latency budget. Only runs if STARBOARD_TEST_DSN is set, e.g.
+# STARBOARD_TEST_DSN=postgresql://postgres@localhost/starboard_test
+#
+# WARNING: this runs migrations on and writes seed data to that database.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Coroutine, Iterator, TypeVar
+
+import pytest
+
+if TYPE_CHECKING:
+    from benchmarks._utils import Seed
+    from starboard.database import Database
+
+_T = TypeVar("_T")
+
+DSN = os.getenv("STARBOARD_TEST_DSN")
+LATENCY_BUDGET_MS = float(os.getenv("STARBOARD_TEST_LATENCY_BUDGET", 5))
+RUNS = 50
+
+pytestmark = pytest.mark.skipif(
+    DSN is None, reason="STARBOARD_TEST_DSN is not set"
+)
+
+
+class Env:
+    def __init__(
+        self, loop: asyncio.AbstractEventLoop, db: Database, seed: Seed
+    ) -> None:
+        self.loop = loop
+        self.db = db
+        self.seed = seed
+
+    def run(self, coro: Coroutine[Any, Any, _T]) -> _T:
+        return self.loop.run_until_complete(coro)
+
+    def plan(self, query: str, *params: Any) -> dict[str, Any]:
+        async def _plan() -> str:
+            assert self.db.pool
+            async with self.db.pool.acquire() as con:
+                return str(
+                    await con.con.fetchval(
+                        f"EXPLAIN (FORMAT JSON) {query}", *params
+                    )
+                )
+
+        plan: dict[str, Any] = json.loads(self.run(_plan()))[0]["Plan"]
+        return plan
+
+    def median_ms(self, query: str, *params: Any) -> float:
+        async def _time() -> list[float]:
+            assert self.db.pool
+            times: list[float] = []
+            async with self.db.pool.acquire() as con:
+                for _ in range(RUNS):
+                    start = time.perf_counter()
+                    await con.con.fetch(query, *params)
+                    times.append((time.perf_counter() - start) * 1_000)
+            return times
+
+        return statistics.median(self.run(_time()))
+
+
+def _nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield plan
+    for p in plan.get("Plans", []):
+        yield from _nodes(p)
+
+
+def _indexes(plan: dict[str, Any]) -> set[str]:
+    return {n["Index Name"] for n in _nodes(plan) if "Index Name" in n}
+
+
+def _seq_scans(plan: dict[str, Any]) -> set[str]:
+    return {
+        n["Relation Name"]
+        for n in _nodes(plan)
+        if n["Node Type"] == "Seq Scan"
+    }
+
+
+@pytest.fixture(scope="module")
+def env() -> Iterator[Env]:
+    from benchmarks._utils import connect, seed
+
+    loop = asyncio.new_event_loop()
+    db = loop.run_until_complete(connect(dsn=DSN))
+    s = loop.run_until_complete(
+        seed(db, users=5_000, messages=50_000, votes_per_message=5)
+    )
+    yield Env(loop, db, s)
+    loop.run_until_complete(db.cleanup())
+    loop.close()
+
+
+def _window(after_days: float, before_days: float) -> tuple[Any, ...]:
+    from starboard.core.leaderboard import split_window
+
+    now = datetime.now(timezone.utc)
+    first, last, use_rollups, ranges = split_window(
+        now - timedelta(days=after_days), now - timedelta(days=before_days)
+    )
+    ranges += [(None, None)] * (2 - len(ranges))
+    return (first, last, use_rollups, *ranges[0], *ranges[1])
+
+
+def _cases(env: Env) -> list[tuple[str, str, tuple[Any, ...], str]]:
+    from starboard.database import queries
+
+    s = env.seed
+    mid = s.message_ids[len(s.message_ids) // 2]
+    sbmid = next(m for m in s.message_ids if m % 10 == 0)
+    sbmid += len(s.message_ids)
+    uid = s.user_ids[len(s.user_ids) // 2]
+    sbid = s.starboard_ids[0]
+
+    return [
+        (
+            "message_points",
+            queries.MESSAGE_POINTS.query,
+            (mid, sbid),
+            "_btree_index_votes__message_id_starboard_id_is_downvote",
+        ),
+        (
+            "author_xp",
+            queries.AUTHOR_XP.query,
+            (s.guild_id, uid),
+            "_btree_index_votes__target_author_id_starboard_id_is_downvote",
+        ),
+        (
+            "moststarred",
+            queries.MOSTSTARRED.query,
+            (sbid, None, None, None, False, 3, mid, 10),
+            "_btree_index_sb_messages__starboard_id_last_known_point_count",
+        ),
+        (
+            "sbmessage_by_sb_message_id",
+            queries.SBMESSAGE_BY_SB_MESSAGE_ID.query,
+            (sbmid,),
+            "_btree_index_sb_messages__sb_message_id",
+        ),
+        (
+            "sbmessage",
+            queries.SBMESSAGE.query,
+            (mid, sbid),
+            "_sb_messages_message_id_starboard_id_primary_key",
+        ),
+        (
+            "message",
+            queries.MESSAGE.query,
+            (mid,),
+            "_messages_message_id_primary_key",
+        ),
+        (
+            "member",
+            queries.MEMBER.query,
+            (s.guild_id, uid),
+            "_members_user_id_guild_id_primary_key",
+        ),
+        (
+            "member_neighbors",
+            queries.MEMBER_NEIGHBORS.query,
+            (s.guild_id, uid, 1),
+            "_btree_index_members__guild_id_xp_user_id",
+        ),
+        (
+            "random_sbmessage",
+            queries.RANDOM_SBMESSAGE.query,
+            (sbid, None, None, None, False),
+            "_btree_index_sb_messages__starboard_id_message_id",
+        ),
+        (
+            "custom_leaderboard",
+            queries.CUSTOM_LEADERBOARD.query,
+            (sbid, 10, *_window(7.5, 2.5)),
+            "_btree_index_votes__starboard_id_created_at",
+        ),
+    ]
+
+
+_TABLES = {
+    "message_points": "votes",
+    "author_xp": "votes",
+    "moststarred": "sb_messages",
+    "sbmessage_by_sb_message_id": "sb_messages",
+    "sbmessage": "sb_messages",
+    "message": "messages",
+    "member": "members",
+    "member_neighbors": "members",
+    "random_sbmessage": "sb_messages",
+    "custom_leaderboard": "votes",
+}
+
+
+@pytest.mark.parametrize("name", list(_TABLES))
+def test_uses_index(env: Env, name: str) -> None:
+    _, query, params, index = next(c for c in _cases(env) if c[0] == name)
+    plan = env.plan(query, *params)
+
+    table = _TABLES[name]
+    assert table not in _seq_scans(plan), f"{name} seq scans {table}"
+    assert index in _indexes(plan)
+
+
+# custom_leaderboard aggregates a whole window, so only its plan is checked
+@pytest.mark.parametrize(
+    "name", [n for n in _TABLES if n != "custom_leaderboard"]
+)
+def test_latency_budget(env: Env, name: str) -> None:
+    _, query, params, _ = next(c for c in _cases(env) if c[0] == name)
+    ms = env.median_ms(query, *params)
+    assert ms < LATENCY_BUDGET_MS, f"{name} took {ms:.2f}ms"
+
+
+def test_moststarred_pages(env: Env) -> None:
+    from starboard.database import queries
+
+    async def _pages() -> list[list[tuple[int, int]]]:
+        pages: list[list[tuple[int, int]]] = []
+        after: tuple[int | None, int | None] = (None, None)
+        for _ in range(3):
+            page = [
+                (m.last_known_point_count, m.message_id)
+                for m in await queries.MOSTSTARRED.fetchmany(
+                    env.seed.starboard_ids[0],
+                    None,
+                    None,
+                    None,
+                    True,
+                    *after,
+                    10,
+                )
+            ]
+            pages.append(page)
+            after = page[-1]
+        return pages
+
+    rows = [r for p in env.run(_pages()) for r in p]
+    assert len(rows) == 30
+    assert rows == sorted(rows, reverse=True)
+    assert len(set(rows)) == 30
+
+
+def test_get_or_create_chain(env: Env) -> None:
+    from starboard.database import Member, Message
+
+    guild_id = 2
+    author_id, reactor_id, message_id = 9_000, 9_001, 9_002
+
+    async def _run() -> None:
+        assert env.db.pool
+        async with env.db.pool.acquire() as con:
+            await con.con.execute("DELETE FROM guilds WHERE guild_id=2")
+
+        for _ in range(2):
+            msg = await Message.get_or_create(
+                guild_id,
+                3,
+                message_id,
+                False,
+                author_id,
+                False,
+                members={reactor_id: False},
+            )
+            assert msg.message_id == message_id
+            assert msg.author_id == author_id
+
+            members = await Member.get_or_create_many(
+                guild_id, {author_id: False, reactor_id: False}
+            )
+            assert {m.user_id for m in members} == {author_id, reactor_id}
+
+        # concurrent calls for the same rows all get them back
+        members = await asyncio.gather(
+            *(Member.get_or_create(guild_id, 9_100, True) for _ in range(20))
+        )
+        assert {m.user_id for m in members} == {9_100}
+
+    env.run(_run())
+
+
+def test_vote_rollups(env: Env) -> None:
+    from starboard.core.leaderboard import custom_leaderboard
+    from starboard.database import queries
+
+    s = env.seed
+    sbid = s.starboard_ids[0]
+    now = datetime.now(timezone.utc)
+    brute = """SELECT target_author_id,
+        count(*) FILTER (WHERE NOT is_downvote)
+            - count(*) FILTER (WHERE is_downvote) AS points
+    FROM votes WHERE starboard_id=$1
+        AND ($2::timestamptz IS NULL OR created_at >= $2)
+        AND ($3::timestamptz IS NULL OR created_at < $3)
+    GROUP BY target_author_id"""
+
+    async def _check(after: float | None, before: float | None) -> None:
+        a = None if after is None else now - timedelta(days=after)
+        b = None if before is None else now - timedelta(days=before)
+        rows = await env.db.fetchmany(brute, [sbid, a, b])
+        expected = {r["target_author_id"]: r["points"] for r in rows}
+        got = dict(await custom_leaderboard(sbid, 100_000, a, b))
+        assert {u: p for u, p in expected.items() if p} == {
+            u: p for u, p in got.items() if p
+        }, (after, before)
+
+    async def _run() -> None:
+        # new votes, flipped votes and removed votes
+        mid, uid = s.message_ids[0], s.user_ids[-1]
+        await env.db.execute(
+            queries.UPSERT_VOTES.query,
+            [mid, uid, s.user_ids[0], False, [sbid]],
+        )
+        await env.db.execute(
+            "UPDATE votes SET is_downvote = NOT is_downvote "
+            "WHERE starboard_id=$1 AND message_id=$2",
+            [sbid, s.message_ids[1]],
+        )
+        await env.db.execute(
+            "DELETE FROM votes WHERE starboard_id=$1 AND message_id=$2",
+            [sbid, s.message_ids[2]],
+        )
+
+        for after, before in [
+            (None, None),
+            (30, None),
+            (None, 30),
+            (45.5, 10.25),
+            (3.1, 3.05),
+            (0.5, None),
+        ]:
+            await _check(after, before)
+
+    env.run(_run())
+
+
+def test_ranks(env: Env) -> None:
+    from starboard.core import leaderboard
+
+    s = env.seed
+
+    async def _run() -> None:
+        # without a cached leaderboard, these are looked up in SQL
+        leaderboard._LEADERBOARDS.clear()
+        sql: dict[int, tuple[Any, Any]] = {}
+        for uid in s.user_ids[::97]:
+            stats = await leaderboard.get_rank(s.guild_id, uid)
+            neighbors = None
+            if stats:
+                neighbors = await leaderboard.get_neighbors(
+                    s.guild_id, uid, stats.rank, 2
+                )
+            sql[uid] = (stats, neighbors)
+
+        lb = await leaderboard.guild_leaderboard(s.guild_id)
+        for uid, (stats, neighbors) in sql.items():
+            assert stats == lb.get(uid)
+            if stats:
+                assert list(neighbors.items()) == list(
+                    lb.neighbors(uid, 2).items()
+                )
+
+    env.run(_run())
+
+
+def test_role_jobs(env: Env) -> None:
+    from starboard.core.role_jobs import queue_roles
+    from starboard.database import queries
+
+    s = env.seed
+    users = s.user_ids[:3]
+
+    async def _run() -> None:
+        await env.db.execute("DELETE FROM role_jobs", [])
+        await queue_roles(s.guild_id, [(u, 1, True) for u in users], "a")
+        # queueing the same change again replaces the old job
+        await queue_roles(s.guild_id, [(users[0], 1, False)], "b")
+
+        jobs = await queries.ROLE_JOBS.fetchmany(1, [0], 100)
+        assert {(j.user_id, j.role_id, j.add, j.reason) for j in jobs} == {
+            (users[0], 1, False, "b"),
+            (users[1], 1, True, "a"),
+            (users[2], 1, True, "a"),
+        }
+        # none of these belong to the second of two shards
+        assert not await queries.ROLE_JOBS.fetchmany(
+            2, [1 - (s.guild_id >> 22) % 2], 100
+        )
+
+        retry = next(j for j in jobs if j.user_id == users[1])
+        await queries.RETRY_ROLE_JOBS.execute(
+            [s.guild_id], [users[1]], [1], [retry.created_at]
+        )
+        # a job queued again after it was fetched isn't deleted with the
+        # old one
+        await queue_roles(s.guild_id, [(users[2], 1, False)], "c")
+        await queries.DELETE_ROLE_JOBS.execute(
+            [j.guild_id for j in jobs],
+            [j.user_id for j in jobs],
+            [j.role_id for j in jobs],
+            [j.created_at for j in jobs],
+        )
+        left = await queries.ROLE_JOBS.fetchmany(1, [0], 100)
+        assert [(j.user_id, j.add, j.attempts) for j in left] == [
+            (users[2], False, 0)
+        ]
+        await env.db.execute("DELETE FROM role_jobs", [])
+
+    env.run(_run())
+
+
+def test_asc_cache(env: Env, monkeypatch: pytest.MonkeyPatch) -> None:
+    from starboard.config import CONFIG
+    from starboard.database import AutoStarChannel
+
+    s = env.seed
+
+    async def _run() -> None:
+        await AutoStarChannel.delete_query().where(
+            guild_id=s.guild_id
+        ).execute()
+        a = await AutoStarChannel(
+            channel_id=1, guild_id=s.guild_id, name="aaa"
+        ).create()
+        await AutoStarChannel(
+            channel_id=1, guild_id=s.guild_id, name="bbb"
+        ).create()
+        await AutoStarChannel(
+            channel_id=2, guild_id=s.guild_id, name="ccc"
+        ).create()
+        await env.db.refresh_asc(s.guild_id)
+        assert {
+            c: sorted(x.name for x in v) for c, v in env.db.asc.items()
+        } == {1: ["aaa", "bbb"], 2: ["ccc"]}
+
+        # loading a chunk at a time, for the guild's shard and another
+        monkeypatch.setattr(CONFIG, "asc_load_chunk_size", 1)
+        shard = (s.guild_id >> 22) % 2
+        await env.db.load_asc(2, [shard])
+        assert sorted(env.db.asc) == [1, 2]
+        assert len(env.db.asc[1]) == 2
+        await env.db.load_asc(2, [1 - shard])
+        assert 1 not in env.db.asc and 2 not in env.db.asc
+        await env.db.load_asc(1, [0])
+
+        await a.delete()
+        await AutoStarChannel.update_query().where(
+            guild_id=s.guild_id, name="ccc"
+        ).set(min_chars=10).execute()
+        await env.db.refresh_asc(s.guild_id)
+        assert [x.name for x in env.db.asc[1]] == ["bbb"]
+        assert [x.min_chars for x in env.db.asc[2]] == [10]
+
+        await AutoStarChannel.delete_query().where(
+            guild_id=s.guild_id
+        ).execute()
+        await env.db.refresh_asc(s.guild_id)
+        assert not env.db.asc
+
+    env.run(_run())
+
+
+def test_config_cache(env: Env) -> None:
+    from starboard.core.config import get_config, invalidate_configs
+    from starboard.database import Override, Starboard
+
+    s = env.seed
+
+    class _Cache:
+        async def gof_channel(self, channel: int) -> None:
+            return None
+
+    class _Bot:
+        cache = _Cache()
+
+    bot: Any = _Bot()
+
+    async def _run() -> None:
+        sb = await Starboard.fetch(id=s.starboard_ids[0])
+        ov = await Override.fetch(guild_id=s.guild_id, name="override-0")
+        invalidate_configs(s.guild_id)
+
+        with env.db.count_queries("config") as counter:
+            c1 = await get_config(bot, sb, s.channel_chain[0])
+        assert counter.count == 1
+        with env.db.count_queries("config") as counter:
+            c2 = await get_config(bot, sb, s.channel_chain[0])
+        assert counter.count == 0
+        assert c2 is c1
+        assert c1.required == sb.required
+
+        ov.overrides = {"required": sb.required + 5}
+        await ov.save()
+        invalidate_configs(s.guild_id)
+        try:
+            c3 = await get_config(bot, sb, s.channel_chain[0])
+            assert c3.required == sb.required + 5
+        finally:
+            ov.overrides = {}
+            await ov.save()
+            invalidate_configs(s.guild_id)
+
+    env.run(_run())
@@ -0,0 +1,300 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Benchmarks for rendering starboard messages, using synthetic messages and a
+# bot with a stub cache. Run with `pytest tests/test_render_benchmarks.py`,
+# and compare runs with --benchmark-autosave/--benchmark-compare.
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Coroutine, Iterator, TypeVar
+
+import hikari
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+_T = TypeVar("_T")
+
+GUILD_ID = 1
+CHANNEL_ID = 2
+MESSAGE_ID = 3 << 22
+
+
+class _Cache:
+    def get_emoji(self, emoji_id: int) -> None:
+        return None
+
+    def get_guild(self, guild_id: int) -> Any:
+        return SimpleNamespace(name="guild")
+
+    async def gof_member(self, guild: Any, user: Any) -> None:
+        return None
+
+    async def gof_message(self, channel: Any, message: Any) -> None:
+        return None
+
+
+class _Bot:
+    cache = _Cache()
+
+
+def _user(user_id: int, name: str) -> hikari.User:
+    return hikari.impl.entity_factory.user_models.UserImpl(  # type: ignore
+        id=hikari.Snowflake(user_id),
+        app=None,  # type: ignore
+        discriminator="0001",
+        username=name,
+        avatar_hash=None,
+        banner_hash=None,
+        accent_color=None,
+        is_bot=False,
+        is_system=False,
+        flags=hikari.UserFlag.NONE,
+    )
+
+
+def _attachment(i: int, media_type: str = "image/png") -> hikari.Attachment:
+    return hikari.Attachment(
+        id=hikari.Snowflake(i),
+        url=f"https://cdn.example/{i}.png",
+        filename=f"SPOILER_{i}.png" if i % 5 == 0 else f"{i}.png",
+        media_type=media_type,
+        size=1_000,
+        proxy_url=f"https://media.example/{i}.png",
+        height=100,
+        width=100,
+        is_ephemeral=False,
+    )
+
+
+def _rich_embed(i: int) -> hikari.Embed:
+    embed = hikari.Embed(
+        title=f"Embed {i}",
+        description="description " * 50,
+        url=f"https://example.com/{i}",
+        color=0xFFFFFF,
+        timestamp=datetime.now(timezone.utc),
+    )
+    for f in range(10):
+        embed.add_field(name=f"field {f}", value="value " * 20)
+    embed.set_author(name="author", url="https://example.com")
+    embed.set_footer("footer")
+    embed.set_image("https://example.com/image.png")
+    embed.set_thumbnail("https://example.com/thumb.png")
+    return embed
+
+
+def _message(
+    *,
+    content: str = "",
+    type: hikari.MessageType = hikari.MessageType.DEFAULT,
+    attachments: int = 0,
+    embeds: list[hikari.Embed] | None = None,
+    reply: hikari.Message | None = None,
+) -> hikari.Message:
+    author = _user(10, "author")
+    return hikari.Message(
+        app=_Bot(),  # type: ignore
+        id=hikari.Snowflake(MESSAGE_ID),
+        channel_id=hikari.Snowflake(CHANNEL_ID),
+        guild_id=hikari.Snowflake(GUILD_ID),
+        user_mentions={author.id: _user(11, "target")},
+        role_mention_ids=[],
+        channel_mentions={},
+        mentions_everyone=False,
+        author=author,
+        member=None,
+        content=content,
+        timestamp=datetime.now(timezone.utc),
+        edited_timestamp=None,
+        is_tts=False,
+        attachments=[_attachment(i) for i in range(attachments)],
+        embeds=embeds or [],
+        reactions=[],
+        is_pinned=False,
+        webhook_id=None,
+        type=type,
+        activity=None,
+        application=None,
+        message_reference=(
+            hikari.MessageReference(
+                app=None,  # type: ignore
+                id=reply.id,
+                channel_id=reply.channel_id,
+                guild_id=reply.guild_id,
+            )
+            if reply
+            else None
+        ),
+        flags=hikari.MessageFlag.NONE,
+        stickers=[],
+        nonce=None,
+        referenced_message=reply,
+        interaction=None,
+        application_id=None,
+        components=[],
+    )
+
+
+MESSAGES: dict[str, Callable[[], hikari.Message]] = {
+    "short": lambda: _message(content="hello world"),
+    "long": lambda: _message(content="long content " * 1_000),
+    "attachments": lambda: _message(content="files", attachments=50),
+    "rich_embeds": lambda: _message(
+        content="embeds", embeds=[_rich_embed(i) for i in range(10)]
+    ),
+    "reply": lambda: _message(
+        content="reply",
+        reply=_message(content="replied to " * 500, attachments=3),
+    ),
+}
+SYSTEM_TYPES = [
+    hikari.MessageType.RECIPIENT_ADD,
+    hikari.MessageType.CHANNEL_NAME_CHANGE,
+    hikari.MessageType.CHANNEL_PINNED_MESSAGE,
+    hikari.MessageType.GUILD_MEMBER_JOIN,
+    hikari.MessageType.USER_PREMIUM_GUILD_SUBSCRIPTION_TIER_3,
+]
+
+
+@pytest.fixture
+def loop() -> Iterator[asyncio.AbstractEventLoop]:
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def _sync(
+    loop: asyncio.AbstractEventLoop,
+    func: Callable[[], Coroutine[Any, Any, _T]],
+) -> Callable[[], _T]:
+    return lambda: loop.run_until_complete(func())
+
+
+@pytest.mark.parametrize("kind", MESSAGES)
+def test_embed_message(
+    benchmark: Any, loop: asyncio.AbstractEventLoop, kind: str
+) -> None:
+    from starboard.core.embed_message import embed_message
+
+    message = MESSAGES[kind]()
+
+    def _render() -> Coroutine[Any, Any, Any]:
+        return embed_message(
+            _Bot(),  # type: ignore
+            message,
+            GUILD_ID,
+            color=0xFFFFFF,
+            display_emoji=None,
+            server_profile=True,
+            ping_author=True,
+            point_count=10,
+            frozen=False,
+            forced=False,
+            gifs=False,
+            attachments_list=True,
+            jump_to_message=True,
+            replied_to=True,
+        )
+
+    content, embed, _ = benchmark(_sync(loop, _render))
+    assert content and embed.author
+
+
+@pytest.mark.parametrize("kind", MESSAGES)
+def test_get_sbmsg_content(
+    benchmark: Any, loop: asyncio.AbstractEventLoop, kind: str
+) -> None:
+    from starboard.core.config import StarboardConfig
+    from starboard.core.messages import get_sbmsg_content
+    from starboard.database import Message, Starboard
+
+    config = StarboardConfig(
+        Starboard(id=1, guild_id=GUILD_ID, channel_id=4, name="starboard"),
+        None,
+    )
+    sql_message = Message(
+        message_id=MESSAGE_ID,
+        guild_id=GUILD_ID,
+        channel_id=CHANNEL_ID,
+        author_id=10,
+        is_nsfw=False,
+    )
+    message = MESSAGES[kind]()
+
+    def _render() -> Coroutine[Any, Any, Any]:
+        return get_sbmsg_content(
+            _Bot(), config, message, sql_message, 10, False  # type: ignore
+        )
+
+    benchmark(_sync(loop, _render))
+
+
+def test_extract_extra_embeds(
+    benchmark: Any, loop: asyncio.AbstractEventLoop
+) -> None:
+    from starboard.core.embed_message import _extract_extra_embeds
+
+    message = MESSAGES["rich_embeds"]()
+    assert len(benchmark(_extract_extra_embeds, message)) == 10
+
+
+@pytest.mark.parametrize("kind", ["attachments", "rich_embeds", "short"])
+def test_has_image(
+    benchmark: Any, loop: asyncio.AbstractEventLoop, kind: str
+) -> None:
+    from starboard.core.has_image import has_image
+
+    benchmark(has_image, MESSAGES[kind]())
+
+
+def test_rendered_content(
+    benchmark: Any, loop: asyncio.AbstractEventLoop
+) -> None:
+    from starboard.utils import rendered_content
+
+    messages = [_message(content="name", type=t) for t in SYSTEM_TYPES]
+
+    def _render() -> list[str | None]:
+        return [rendered_content(m) for m in messages]
+
+    assert all(benchmark(_render))
+
+
+def test_truncate(benchmark: Any, loop: asyncio.AbstractEventLoop) -> None:
+    from starboard.utils import trunc_list, truncate
+
+    text = "x" * 10_000
+    files = [
+        f"[file{i}.png](https://cdn.example/{i}.png)\n" for i in range(200)
+    ]
+
+    def _truncate() -> None:
+        truncate(text, 4_096)
+        trunc_list(files, 1_024)
+
+    benchmark(_truncate)
@@ -0,0 +1,168 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Checks that reads are routed to read replicas. Only runs if both
+# STARBOARD_TEST_DSN and STARBOARD_TEST_REPLICA_DSN are set. The replica has
+# to be read-only, either a streaming standby of the first database or any
+# other database with ?default_transaction_read_only=on in the DSN.
+#
+# WARNING: this runs migrations on and writes to STARBOARD_TEST_DSN.
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import TYPE_CHECKING, Any, Coroutine, Iterator, TypeVar
+
+import pytest
+
+if TYPE_CHECKING:
+    from starboard.database import Database
+
+_T = TypeVar("_T")
+
+DSN = os.getenv("STARBOARD_TEST_DSN")
+REPLICA_DSN = os.getenv("STARBOARD_TEST_REPLICA_DSN")
+UNREACHABLE_DSN = "postgresql://postgres@localhost:1/starboard"
+
+pytestmark = pytest.mark.skipif(
+    DSN is None or REPLICA_DSN is None,
+    reason="STARBOARD_TEST_DSN or STARBOARD_TEST_REPLICA_DSN is not set",
+)
+
+# identifies which server a query ran on
+WHO = (
+    "SELECT pg_is_in_recovery()"
+    " OR current_setting('transaction_read_only')::bool"
+)
+
+
+class Env:
+    def __init__(self, loop: asyncio.AbstractEventLoop, db: Database) -> None:
+        self.loop = loop
+        self.db = db
+
+    def run(self, coro: Coroutine[Any, Any, _T]) -> _T:
+        return self.loop.run_until_complete(coro)
+
+    def on_replica(self) -> bool:
+        return bool(self.run(self.db.fetchval(WHO, [])))
+
+
+@pytest.fixture(scope="module")
+def env() -> Iterator[Env]:
+    from benchmarks._utils import connect
+
+    loop = asyncio.new_event_loop()
+    db = loop.run_until_complete(
+        connect(dsn=DSN, replicas=[REPLICA_DSN, UNREACHABLE_DSN])
+    )
+    yield Env(loop, db)
+    loop.run_until_complete(db.cleanup())
+    loop.close()
+
+
+@pytest.fixture(autouse=True)
+def _reset_lag(env: Env) -> Iterator[None]:
+    yield
+    env.run(env.db._check_replicas())
+
+
+def test_lag_checked(env: Env) -> None:
+    replica, unreachable = env.db.replicas
+    assert replica.pool is not None
+    assert replica.lag < 1
+    assert unreachable.pool is None
+    assert unreachable.lag == float("inf")
+
+
+def test_reads_use_primary_by_default(env: Env) -> None:
+    assert not env.on_replica()
+
+
+def test_reads_use_replica(env: Env) -> None:
+    with env.db.replica():
+        assert env.on_replica()
+        assert all(
+            env.on_replica() for _ in range(10)
+        ), "the unreachable replica should never be picked"
+    assert not env.on_replica()
+
+
+def test_stale_replica_falls_back(env: Env) -> None:
+    env.db.replicas[0].lag = 60
+    with env.db.replica(max_lag=10):
+        assert not env.on_replica()
+    with env.db.replica(max_lag=120):
+        assert env.on_replica()
+
+
+def test_writes_fall_back(env: Env) -> None:
+    query = """INSERT INTO guilds (guild_id) VALUES (4)
+    ON CONFLICT (guild_id) DO UPDATE SET premium_end=NULL
+    RETURNING guild_id"""
+    with env.db.replica():
+        assert env.run(env.db.fetchval(query, [])) == 4
+    # falling back because of a write doesn't mark the replica as down
+    assert env.db.replicas[0].lag < 1
+
+
+def test_broken_replica_falls_back(env: Env) -> None:
+    import asyncpg
+    from apgorm.connection import Pool
+
+    replica = env.db.replicas[0]
+    pool = replica.pool
+
+    async def _broken_pool() -> Pool:
+        # min_size=0 so that it only fails to connect once it's used
+        return Pool(await asyncpg.create_pool(UNREACHABLE_DSN, min_size=0))
+
+    replica.pool = env.run(_broken_pool())
+    try:
+        with env.db.replica():
+            assert not env.on_replica()
+            assert replica.lag == float("inf")
+    finally:
+        env.run(replica.pool.close())
+        replica.pool = pool
+
+
+def test_get_or_create_uses_primary(
+    env: Env, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from starboard.database import Guild
+
+    used: list[Any] = []
+    run_on = env.db._run_on
+
+    async def _run_on(replica: Any, *args: Any) -> Any:
+        used.append(replica)
+        return await run_on(replica, *args)
+
+    monkeypatch.setattr(env.db, "_run_on", _run_on)
+    with env.db.replica():
+        guild = env.run(Guild.get_or_create(5))
+    assert guild.guild_id == 5
+    # straight to the primary, instead of failing on the replica first
+    assert used == [None]
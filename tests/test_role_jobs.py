@@ -0,0 +1,104 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import asyncio
+from types import ModuleType, SimpleNamespace
+from typing import Any
+
+import pytest
+
+
+class _REST:
+    def __init__(self, role_ids: list[int]) -> None:
+        self.role_ids = role_ids
+        self.calls: list[tuple[Any, ...]] = []
+
+    async def fetch_member(self, guild_id: int, user_id: int) -> Any:
+        self.calls.append(("fetch_member",))
+        return SimpleNamespace(role_ids=list(self.role_ids))
+
+    async def edit_member(
+        self, guild_id: int, user_id: int, *, roles: list[int], reason: str
+    ) -> Any:
+        self.calls.append(("edit_member", sorted(roles)))
+        self.role_ids = roles
+        return SimpleNamespace(role_ids=roles)
+
+    async def add_role_to_member(
+        self, guild_id: int, user_id: int, role_id: int, *, reason: str
+    ) -> None:
+        self.calls.append(("add_role_to_member", role_id))
+
+    async def remove_role_from_member(
+        self, guild_id: int, user_id: int, role_id: int, *, reason: str
+    ) -> None:
+        self.calls.append(("remove_role_from_member", role_id))
+
+
+class _Cache:
+    async def gof_member(self, guild_id: int, user_id: int) -> Any:
+        raise AssertionError("the cached member may be out of date")
+
+    def set_member(self, member: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def role_jobs() -> ModuleType:
+    from starboard.core import role_jobs
+
+    return role_jobs
+
+
+def _job(role_id: int, add: bool) -> Any:
+    return SimpleNamespace(role_id=role_id, add=add, reason="test")
+
+
+def _apply(role_jobs: ModuleType, rest: _REST, *jobs: Any) -> None:
+    bot = SimpleNamespace(rest=rest, cache=_Cache())
+    asyncio.run(role_jobs._apply(bot, 1, 2, list(jobs)))
+
+
+def test_single_job(role_jobs: ModuleType) -> None:
+    rest = _REST([10])
+    _apply(role_jobs, rest, _job(20, True))
+    assert rest.calls == [("add_role_to_member", 20)]
+
+    rest = _REST([10])
+    _apply(role_jobs, rest, _job(10, False))
+    assert rest.calls == [("remove_role_from_member", 10)]
+
+
+def test_keeps_current_roles(role_jobs: ModuleType) -> None:
+    # 30 was given by someone else since the member was cached
+    rest = _REST([10, 30])
+    _apply(role_jobs, rest, _job(10, False), _job(20, True))
+    assert rest.calls == [("fetch_member",), ("edit_member", [20, 30])]
+
+
+def test_no_changes(role_jobs: ModuleType) -> None:
+    rest = _REST([10, 20])
+    _apply(role_jobs, rest, _job(10, True), _job(20, True))
+    assert rest.calls == [("fetch_member",)]
@@ -0,0 +1,132 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Iterator
+
+import pytest
+
+
+@pytest.fixture
+def tracing(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[ModuleType]:
+    from starboard import tracing
+    from starboard.config import CONFIG
+
+    monkeypatch.setattr(CONFIG, "trace_sample_rate", 1)
+    monkeypatch.setattr(CONFIG, "trace_file", str(tmp_path / "traces.jsonl"))
+    # the file is opened when the first sampled trace is written, which
+    # might've been in another test
+    tracing.stop_writing()
+    tracing.SPAN_STATS.clear()
+    yield tracing
+    tracing.stop_writing()
+
+
+def _read(tracing: ModuleType, path: Path) -> list[dict[str, Any]]:
+    tracing.stop_writing()
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_trace(tracing: ModuleType, tmp_path: Path) -> None:
+    @tracing.traced("child")
+    async def child(x: int) -> int:
+        tracing.set_tag("x", x)
+        await asyncio.sleep(0.01)
+        return x
+
+    @tracing.traced("root")
+    async def root() -> int:
+        total: int = await child(1) + await child(2)
+        return total
+
+    assert asyncio.run(root()) == 3
+
+    spans = _read(tracing, tmp_path / "traces.jsonl")
+    assert [s["name"] for s in spans] == ["child", "child", "root"]
+    c1, c2, r = spans
+    assert len({s["traceId"] for s in spans}) == 1
+    assert len(r["traceId"]) == 32
+    assert "parentId" not in r
+    assert c1["parentId"] == c2["parentId"] == r["id"]
+    assert c1["tags"] == {"x": "1"}
+    assert r["duration"] >= c1["duration"] + c2["duration"]
+    assert r["localEndpoint"] == {"serviceName": "starboard"}
+
+    assert tracing.SPAN_STATS["child"].count == 2
+    assert tracing.SPAN_STATS["root"].count == 1
+
+
+def test_error_tagged(tracing: ModuleType, tmp_path: Path) -> None:
+    with pytest.raises(ZeroDivisionError):
+        with tracing.span("root"):
+            1 / 0
+
+    (span,) = _read(tracing, tmp_path / "traces.jsonl")
+    assert span["tags"]["error"].startswith("ZeroDivisionError")
+
+
+def test_not_sampled(
+    tracing: ModuleType, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from starboard.config import CONFIG
+
+    monkeypatch.setattr(CONFIG, "trace_sample_rate", 0)
+    with tracing.span("root"):
+        with tracing.span("child"):
+            tracing.set_tag("x", 1)
+
+    assert _read(tracing, tmp_path / "traces.jsonl") == []
+    # still aggregated
+    assert tracing.SPAN_STATS["root"].count == 1
+    assert tracing.SPAN_STATS["child"].count == 1
+
+
+def test_concurrent_traces(tracing: ModuleType, tmp_path: Path) -> None:
+    @tracing.traced("child")
+    async def child() -> None:
+        await asyncio.sleep(0.01)
+
+    @tracing.traced("root")
+    async def root() -> None:
+        await child()
+
+    async def _run() -> None:
+        await asyncio.gather(root(), root(), root())
+
+    asyncio.run(_run())
+
+    spans = _read(tracing, tmp_path / "traces.jsonl")
+    roots = {s["id"]: s["traceId"] for s in spans if s["name"] == "root"}
+    assert len(set(roots.values())) == 3
+    for s in spans:
+        if s["name"] == "child":
+            assert roots[s["parentId"]] == s["traceId"]
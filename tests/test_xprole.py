@@ -0,0 +1,62 @@
+# MIT License
+#
+# Copyright (c) 2022 TrigonDev
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import asyncio
+from types import ModuleType
+from typing import Any
+
+import pytest
+
+
+@pytest.fixture
+def xprole(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    from pycooldown import FixedCooldown
+
+    from starboard.core import xprole
+
+    refreshed: list[tuple[int, int]] = []
+
+    async def _refresh(bot: Any, guild_id: int, user_id: int) -> None:
+        refreshed.append((guild_id, user_id))
+
+    monkeypatch.setattr(xprole, "_refresh", _refresh)
+    monkeypatch.setattr(xprole, "COOLDOWN", FixedCooldown(1, 0.05))
+    monkeypatch.setattr(xprole, "refreshed", refreshed, raising=False)
+    return xprole
+
+
+def test_deferred_refresh(xprole: ModuleType) -> None:
+    async def _run() -> None:
+        assert await xprole.refresh_xpr(None, 1, 10)
+        # these hit the cooldown, and are covered by one deferred refresh
+        assert not await xprole.refresh_xpr(None, 1, 10)
+        assert not await xprole.refresh_xpr(None, 1, 10)
+        assert xprole.refreshed == [(1, 10)]
+
+        await asyncio.gather(*xprole._DEFERRED.values())
+        assert xprole.refreshed == [(1, 10), (1, 10)]
+        assert not xprole._DEFERRED
+
+    asyncio.run(_run())